@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+In-process chart renderer for the model comparison toolkit.
+
+Builds a chart model (title, per-metric task labels and values, legend) directly from
+the loaded results and draws every task/mode chart in one process. Fonts are loaded
+once per process, canvases of the same size are reused, and charts can be rendered
+in parallel with a process pool. Text is measured and rasterized through text_layout.
+
+Each chart is laid out once into drawing primitives; the PNG backend rasterizes them
+at any scale and the SVG backend writes them as vector elements.
+"""
+
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from xml.sax.saxutils import escape
+from text_layout import PIL_AVAILABLE, get_font, font_ascent, text_width, wrap_text, draw_text
+
+if PIL_AVAILABLE:
+    from PIL import Image, ImageDraw
+
+# 任务类型 -> (结果文件前缀, 图表标题)
+TASK_SOURCES = {
+    'classification': ('cla', 'Classification Task Performance'),
+    'measurement': ('mea', 'Measurement Task Performance'),
+    'segmentation': ('seg', 'Segmentation Task Performance'),
+    'report': ('report', 'Report Generation Performance'),
+}
+
+# 图表样式
+SUBPLOT_WIDTH, SUBPLOT_HEIGHT = 600, 400
+MARGIN = 60
+TITLE_HEIGHT = 100
+BG_COLOR = (255, 255, 255)
+V1_COLOR = (46, 134, 171)     # 模型1：蓝色
+V2_COLOR = (162, 59, 114)     # 模型2：紫红色
+TEXT_COLOR = (51, 51, 51)
+GRID_COLOR = (200, 200, 200)
+SVG_FONT_FAMILY = "DejaVu Sans, Verdana, sans-serif"
+
+# 各类文字的 (字体文件, 字号)，字体文件相对 text_layout.FONT_DIR
+FONT_SPECS = {
+    'title': ("DejaVuSans-Bold.ttf", 24),
+    'subtitle': ("DejaVuSans-Bold.ttf", 14),
+    'label': ("DejaVuSans.ttf", 11),
+    'small': ("DejaVuSans.ttf", 9),
+}
+
+# 画布按尺寸复用
+_CANVASES = {}
+
+
+def chart_slug(task_type, mode_name):
+    """图表和报告文件名前缀，如 classification_standard_mode"""
+    return f"{task_type}_{mode_name.lower().replace(' ', '_')}"
+
+
+def extract_metrics_data(v1_data, v2_data, metrics):
+    """两个模型共同任务的各指标数值：{指标: {task_labels, v1_values, v2_values, metric_name}}"""
+    v1_tasks = {row['task_id']: row for row in v1_data}
+    v2_tasks = {row['task_id']: row for row in v2_data}
+    common_tasks = sorted(set(v1_tasks.keys()) & set(v2_tasks.keys()))
+
+    metrics_data = {}
+    for metric, metric_name in metrics:
+        task_labels = []
+        v1_values = []
+        v2_values = []
+
+        for task_id in common_tasks:
+            try:
+                v1_val = float(v1_tasks[task_id].get(metric, 0))
+                v2_val = float(v2_tasks[task_id].get(metric, 0))
+                task_labels.append(task_id)
+                v1_values.append(v1_val)
+                v2_values.append(v2_val)
+            except (ValueError, TypeError):
+                continue
+
+        if task_labels:
+            metrics_data[metric] = {
+                'task_labels': task_labels,
+                'v1_values': v1_values,
+                'v2_values': v2_values,
+                'metric_name': metric_name
+            }
+    return metrics_data
+
+
+def build_chart(data_dict, task_type, metrics, mode_name, model1_name, model2_name):
+    """由加载好的结果构建一张任务图表的数据模型，没有可对比的数据时返回None"""
+    if task_type not in TASK_SOURCES:
+        return None
+    source, title = TASK_SOURCES[task_type]
+    v1_data = data_dict['model1'].get(source)
+    v2_data = data_dict['model2'].get(source)
+    if not v1_data or not v2_data:
+        return None
+
+    metrics_data = extract_metrics_data(v1_data, v2_data, metrics)
+    if not metrics_data:
+        return None
+
+    return {
+        'title': f'{title} ({mode_name})',
+        'metrics_data': metrics_data,
+        'model1_name': model1_name,
+        'model2_name': model2_name,
+        'filename': f"{chart_slug(task_type, mode_name)}_comprehensive_comparison.png",
+    }
+
+
+def load_fonts():
+    """加载图表字体（每个进程只加载一次），返回 {用途: (字体文件, 字号)}，字体不可用的用途为None"""
+    return {name: spec if get_font(*spec) is not None else None for name, spec in FONT_SPECS.items()}
+
+
+def subplot_grid(num_metrics):
+    """按指标数确定子图的行列数"""
+    if num_metrics == 1:
+        return 1, 1
+    elif num_metrics <= 2:
+        return 1, 2
+    elif num_metrics <= 4:
+        return 2, 2
+    elif num_metrics <= 6:
+        return 2, 3
+    return 3, 3
+
+
+def _canvas(size):
+    """取得指定尺寸的白色画布，同一进程中相同尺寸的图表复用同一块画布"""
+    img = _CANVASES.get(size)
+    if img is None:
+        img = _CANVASES[size] = Image.new('RGB', size, BG_COLOR)
+    else:
+        img.paste(BG_COLOR, (0, 0) + size)
+    return img
+
+
+def _layout_subplot(items, fonts, data, subplot_x, subplot_y):
+    """排版一个指标的子图：标题、网格和纵轴刻度、两个模型的柱子、任务标签"""
+    subtitle_font, label_font, small_font = fonts['subtitle'], fonts['label'], fonts['small']
+    task_labels = data['task_labels']
+    v1_values = data['v1_values']
+    v2_values = data['v2_values']
+    metric_name = data['metric_name']
+
+    chart_left = subplot_x + 60
+    chart_right = subplot_x + SUBPLOT_WIDTH - 20
+    chart_top = subplot_y + 40
+    chart_bottom = subplot_y + SUBPLOT_HEIGHT - 60
+    chart_width = chart_right - chart_left
+    chart_height = chart_bottom - chart_top
+
+    # 子图标题，过长时截断
+    display_title = metric_name
+    if len(display_title) > 25:
+        display_title = display_title[:22] + "..."
+
+    if subtitle_font:
+        subtitle_x = subplot_x + (SUBPLOT_WIDTH - text_width(*subtitle_font, display_title)) // 2
+        items.append(('text', (subtitle_x, subplot_y + 5), display_title, subtitle_font, TEXT_COLOR))
+
+    max_value = max(max(v1_values) if v1_values else [0], max(v2_values) if v2_values else [0])
+    if max_value == 0:
+        max_value = 1
+
+    # 网格线和纵轴刻度
+    for i in range(6):
+        y = chart_bottom - (i * chart_height // 5)
+        items.append(('line', (chart_left, y, chart_right, y), GRID_COLOR, 1))
+        value = (i * max_value) / 5
+        if small_font:
+            items.append(('text', (chart_left - 50, y - 6), f"{value:.2f}", small_font, TEXT_COLOR))
+
+    num_tasks = len(task_labels)
+    if num_tasks > 0:
+        bar_group_width = chart_width // num_tasks
+        bar_width = max(8, bar_group_width // 3)
+        bar_spacing = max(2, bar_width // 4)
+
+        for i, (task_id, v1_val, v2_val) in enumerate(zip(task_labels, v1_values, v2_values)):
+            group_center = chart_left + (i + 0.5) * bar_group_width
+            v1_bar_left = int(group_center - bar_width - bar_spacing // 2)
+            v2_bar_left = int(group_center + bar_spacing // 2)
+            v1_bar_top = chart_bottom - int((v1_val / max_value) * chart_height)
+            v2_bar_top = chart_bottom - int((v2_val / max_value) * chart_height)
+
+            items.append(('rect', (v1_bar_left, v1_bar_top, v1_bar_left + bar_width, chart_bottom), V1_COLOR))
+            items.append(('rect', (v2_bar_left, v2_bar_top, v2_bar_left + bar_width, chart_bottom), V2_COLOR))
+
+            # 横轴显示所有任务ID
+            if small_font:
+                label_x = group_center - len(task_id) * 2
+                items.append(('text', (label_x, chart_bottom + 5), task_id, small_font, TEXT_COLOR))
+
+    # 纵轴名称
+    if label_font:
+        y_label = metric_name[:15] + "..." if len(metric_name) > 15 else metric_name
+        items.append(('text', (subplot_x + 5, chart_top + chart_height // 2), y_label, label_font, TEXT_COLOR))
+
+
+def layout_chart(chart):
+    """排版一张图表，返回 {'size': (宽, 高), 'items': 绘制元素列表}，坐标为1倍尺寸下的像素
+
+    绘制元素（PNG和SVG后端共用，各尺寸的PNG都由同一份排版结果绘制）:
+        ('rect', (x0, y0, x1, y1), 颜色)              填充矩形，包含右下边界（与PIL一致）
+        ('line', (x0, y0, x1, y1), 颜色, 线宽)
+        ('text', (x, y), 文字, (字体文件, 字号), 颜色)  (x, y) 为文字左上角
+    """
+    fonts = load_fonts()
+    metrics_data = chart['metrics_data']
+    rows, cols = subplot_grid(len(metrics_data))
+    width = cols * SUBPLOT_WIDTH + (cols + 1) * MARGIN
+    height = rows * SUBPLOT_HEIGHT + (rows + 1) * MARGIN + TITLE_HEIGHT
+    items = []
+
+    # 主标题，超过50个字符时按每行40个字符换行
+    title_text = chart['title']
+    title_font = fonts['title']
+    if title_font:
+        lines = wrap_text(title_text, 40) if len(title_text) > 50 else [title_text]
+        for i, line in enumerate(lines):
+            title_x = (width - text_width(*title_font, line)) // 2
+            title_y = 15 + i * 30 if len(title_text) > 50 else 25
+            items.append(('text', (title_x, title_y), line, title_font, TEXT_COLOR))
+
+    for idx, data in enumerate(list(metrics_data.values())[:rows * cols]):
+        row, col = divmod(idx, cols)
+        subplot_x = MARGIN + col * (SUBPLOT_WIDTH + MARGIN)
+        subplot_y = TITLE_HEIGHT + MARGIN + row * (SUBPLOT_HEIGHT + MARGIN)
+        _layout_subplot(items, fonts, data, subplot_x, subplot_y)
+
+    # 图例
+    legend_y = height - 40
+    legend_x = MARGIN
+    for name, color in ((chart['model1_name'], V1_COLOR), (chart['model2_name'], V2_COLOR)):
+        items.append(('rect', (legend_x, legend_y, legend_x + 20, legend_y + 15), color))
+        if fonts['label']:
+            items.append(('text', (legend_x + 30, legend_y), name, fonts['label'], TEXT_COLOR))
+        legend_x += 150
+
+    return {'size': (width, height), 'items': items}
+
+
+def rasterize(layout, scale=1):
+    """按 scale 倍尺寸把排版结果画到画布上并返回画布（画布会被同尺寸的下一张图表复用，需要先保存）
+
+    1倍时与逐个调用PIL绘制的结果逐像素一致；其他倍数时字体按放大后的字号重新栅格化，不是放大位图。
+    """
+    width, height = layout['size']
+    img = _canvas((round(width * scale), round(height * scale)))
+    draw = ImageDraw.Draw(img)
+
+    for item in layout['items']:
+        kind = item[0]
+        if kind == 'rect':
+            (x0, y0, x1, y1), color = item[1], item[2]
+            # 覆盖1倍时 [x0, x1] 的像素范围
+            box = [round(x0 * scale), round(y0 * scale), round((x1 + 1) * scale) - 1, round((y1 + 1) * scale) - 1]
+            draw.rectangle(box, fill=color, outline=color)
+        elif kind == 'line':
+            (x0, y0, x1, y1), color, line_width = item[1], item[2], item[3]
+            points = [(round((x + 0.5) * scale - 0.5), round((y + 0.5) * scale - 0.5)) for x, y in ((x0, y0), (x1, y1))]
+            draw.line(points, fill=color, width=max(1, round(line_width * scale)))
+        else:
+            (x, y), text, (font_file, size), color = item[1], item[2], item[3], item[4]
+            draw_text(draw, (x * scale, y * scale), text, (font_file, round(size * scale)), color)
+    return img
+
+
+def to_svg(layout):
+    """把排版结果转换为SVG文本（矢量，任意缩放都清晰）"""
+    width, height = layout['size']
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+             f'viewBox="0 0 {width} {height}">',
+             f'<rect width="100%" height="100%" fill="{_svg_color(BG_COLOR)}"/>',
+             '<g shape-rendering="crispEdges">']
+
+    texts = []
+    for item in layout['items']:
+        kind = item[0]
+        if kind == 'rect':
+            (x0, y0, x1, y1), color = item[1], item[2]
+            parts.append(f'<rect x="{x0}" y="{y0}" width="{x1 - x0 + 1}" height="{y1 - y0 + 1}" '
+                         f'fill="{_svg_color(color)}"/>')
+        elif kind == 'line':
+            (x0, y0, x1, y1), color, line_width = item[1], item[2], item[3]
+            parts.append(f'<line x1="{x0}" y1="{y0 + 0.5}" x2="{x1 + 1}" y2="{y1 + 0.5}" '
+                         f'stroke="{_svg_color(color)}" stroke-width="{line_width}"/>')
+        else:
+            (x, y), text, (font_file, size), color = item[1], item[2], item[3], item[4]
+            # PIL以文字左上角（字体上沿）定位，SVG以基线定位
+            weight = ' font-weight="bold"' if 'Bold' in font_file else ''
+            texts.append(f'<text x="{x:g}" y="{y + font_ascent(font_file, size):g}" font-size="{size}"{weight} '
+                         f'fill="{_svg_color(color)}">{escape(text)}</text>')
+    parts.append('</g>')
+    parts.append(f'<g font-family="{SVG_FONT_FAMILY}">')
+    parts.extend(texts)
+    parts.append('</g>')
+    parts.append('</svg>')
+    return '\n'.join(parts) + '\n'
+
+
+def _svg_color(color):
+    return '#{:02x}{:02x}{:02x}'.format(*color)
+
+
+def output_name(chart, fmt, scale=1):
+    """输出文件名：1倍PNG沿用原文件名，其他倍数加 @2x 等后缀，SVG改扩展名"""
+    stem = os.path.splitext(chart['filename'])[0]
+    if fmt == 'svg':
+        return f"{stem}.svg"
+    return chart['filename'] if scale == 1 else f"{stem}@{scale:g}x.png"
+
+
+def render_chart(chart, output_dir, formats=('png',), scales=(1,)):
+    """排版一次，按 formats 和 scales 输出PNG（每个倍数一张）和SVG，返回输出文件路径列表"""
+    layout = layout_chart(chart)
+    paths = []
+    for fmt in formats:
+        if fmt == 'svg':
+            output_file = os.path.join(output_dir, output_name(chart, 'svg'))
+            with open(output_file, 'w', encoding='utf-8') as f:
+                f.write(to_svg(layout))
+            paths.append(output_file)
+            continue
+        for scale in scales:
+            output_file = os.path.join(output_dir, output_name(chart, 'png', scale))
+            rasterize(layout, scale).save(output_file)
+            paths.append(output_file)
+    return paths
+
+
+def draw_chart(chart, scale=1):
+    """排版并绘制一张图表，返回画布（画布会被复用，需要先保存）"""
+    return rasterize(layout_chart(chart), scale)
+
+
+def _render_isolated(chart, output_dir, formats, scales):
+    try:
+        return render_chart(chart, output_dir, formats, scales), None
+    except Exception:
+        return None, traceback.format_exc()
+
+
+def render_charts(charts, output_dir, workers=1, formats=('png',), scales=(1,)):
+    """绘制所有图表到 output_dir，按输入顺序返回每张图表的输出文件路径列表（失败的为None）
+
+    workers > 1 时用进程池并行绘制；字体在主进程中先加载，fork出的子进程直接继承。
+    PNG和SVG都需要Pillow：SVG的排版（文字宽度、换行、基线）同样使用Pillow的字体度量。
+    """
+    if any(scale <= 0 for scale in scales):
+        raise ValueError(f"PNG scales must be greater than 0, got: {list(scales)}")
+    if not PIL_AVAILABLE:
+        print(f"PIL (Pillow) not available, cannot render {'/'.join(fmt.upper() for fmt in formats)} charts "
+              f"(SVG layout also needs its font metrics). Please install with: pip install Pillow")
+        return [None] * len(charts)
+
+    os.makedirs(output_dir, exist_ok=True)
+    load_fonts()
+    results = [None] * len(charts)
+
+    def record(idx, paths, error):
+        results[idx] = paths
+        if error:
+            print(f"Failed to render {charts[idx]['filename']}\n{error}")
+        else:
+            print(f"Chart saved to: {', '.join(paths)}")
+
+    if workers is None or workers <= 1 or len(charts) <= 1:
+        for idx, chart in enumerate(charts):
+            record(idx, *_render_isolated(chart, output_dir, formats, scales))
+        return results
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(charts))) as executor:
+        futures = {executor.submit(_render_isolated, chart, output_dir, formats, scales): idx
+                   for idx, chart in enumerate(charts)}
+        for future in as_completed(futures):
+            try:
+                paths, error = future.result()
+            except Exception:
+                paths, error = None, traceback.format_exc()
+            record(futures[future], paths, error)
+    return results
@@ -121,9 +121,8 @@ echo "=== Example completed ==="
 echo ""
 echo "Next steps:"
 echo "1. Navigate to the generated output directory"
-echo "2. Run './generate_all_charts.sh' to create PNG charts"
-echo "3. Check the 'charts/' directory for generated images"
-echo "4. Review the 'reports/' directory for detailed analysis"
+echo "2. Check the 'charts/' directory for generated images"
+echo "3. Review the 'reports/' directory for detailed analysis"
 echo ""
 echo "For other model comparisons, modify the paths and model names in this script"
 echo "or use the toolkit directly with your own parameters." 
\ No newline at end of file
@@ -3,10 +3,39 @@
 
 import os
 import csv
-import json
 import argparse
-import shutil
 from datetime import datetime
+from chart_renderer import TASK_SOURCES, build_chart, chart_slug, render_charts
+from results_table import load_results_table, pairwise_comparison, create_n_model_report
+from snapshot_store import snapshot_files
+
+# 所有任务和指标 (移除failed_items)
+TASK_METRICS = {
+    'classification': [
+        ('acc', 'Accuracy'),
+        ('precision', 'Precision'),
+        ('recall', 'Recall'),
+        ('f1', 'F1-Score')
+    ],
+    'measurement': [
+        ('RMSE', 'Root Mean Square Error'),
+        ('MAE', 'Mean Absolute Error'),
+        ('%_within_tolerance', 'Percentage within Tolerance')
+    ],
+    'segmentation': [
+        ('acc', 'Accuracy')
+    ],
+    'report': [
+        ('Bleu-1', 'BLEU-1'),
+        ('Bleu-2', 'BLEU-2'),
+        ('Bleu-3', 'BLEU-3'),
+        ('Bleu-4', 'BLEU-4'),
+        ('Rouge', 'Rouge'),
+        ('BERTScore', 'BERTScore')
+    ]
+}
+
+RESULT_TASKS = ['cla', 'mea', 'seg', 'report']
 
 def load_results_txt(file_path):
     """从txt文件加载结果数据"""
@@ -92,337 +121,151 @@ def create_task_analysis_report(v1_data, v2_data, task_type, metrics, mode_name,
     
     return report
 
-def generate_task_subplot_png_script(data_dict, task_type, metrics, mode_name, output_dir, model1_name, model2_name):
-    """为每个任务生成包含所有指标子图的PNG脚本"""
-    
-    # 根据任务类型获取数据
-    if task_type == 'classification':
-        v1_data = data_dict['model1']['cla']
-        v2_data = data_dict['model2']['cla']
-        chart_title = f'Classification Task Performance ({mode_name})'
-    elif task_type == 'measurement':
-        v1_data = data_dict['model1']['mea']
-        v2_data = data_dict['model2']['mea']
-        chart_title = f'Measurement Task Performance ({mode_name})'
-    elif task_type == 'segmentation':
-        v1_data = data_dict['model1']['seg']
-        v2_data = data_dict['model2']['seg']
-        chart_title = f'Segmentation Task Performance ({mode_name})'
-    elif task_type == 'report':
-        v1_data = data_dict['model1']['report']
-        v2_data = data_dict['model2']['report']
-        chart_title = f'Report Generation Performance ({mode_name})'
-    else:
+def write_task_analysis_report(data_dict, task_type, metrics, mode_name, output_dir, model1_name, model2_name):
+    """生成并保存任务分析报告，没有可对比的数据时返回None"""
+    if task_type not in TASK_SOURCES:
         return None
-    
-    if not v1_data or not v2_data:
+    source = TASK_SOURCES[task_type][0]
+    analysis_report = create_task_analysis_report(data_dict['model1'].get(source), data_dict['model2'].get(source),
+                                                  task_type, metrics, mode_name, model1_name, model2_name)
+    if not analysis_report:
         return None
-    
-    # 创建任务ID映射
-    v1_tasks = {row['task_id']: row for row in v1_data}
-    v2_tasks = {row['task_id']: row for row in v2_data}
-    
-    # 找到共同的任务
-    common_tasks = sorted(set(v1_tasks.keys()) & set(v2_tasks.keys()))
-    
-    if not common_tasks:
-        return None
-    
-    # 为每个指标提取数据
-    metrics_data = {}
-    for metric, metric_name in metrics:
-        task_labels = []
-        v1_values = []
-        v2_values = []
-        
-        for task_id in common_tasks:
-            try:
-                v1_val = float(v1_tasks[task_id].get(metric, 0))
-                v2_val = float(v2_tasks[task_id].get(metric, 0))
-                task_labels.append(task_id)
-                v1_values.append(v1_val)
-                v2_values.append(v2_val)
-            except (ValueError, TypeError):
-                continue
-        
-        if task_labels:
-            metrics_data[metric] = {
-                'task_labels': task_labels,
-                'v1_values': v1_values,
-                'v2_values': v2_values,
-                'metric_name': metric_name
-            }
-    
-    if not metrics_data:
-        return None
-    
-    # 生成分析报告
-    analysis_report = create_task_analysis_report(v1_data, v2_data, task_type, metrics, mode_name, model1_name, model2_name)
-    
-    # 保存分析报告
-    report_file = os.path.join(output_dir, f"{task_type}_{mode_name.lower().replace(' ', '_')}_analysis_report.md")
+
+    report_file = os.path.join(output_dir, f"{chart_slug(task_type, mode_name)}_analysis_report.md")
     with open(report_file, 'w', encoding='utf-8') as f:
         f.write(analysis_report)
-    
-    print(f"Generated analysis report: {report_file}")
-    
-    # 生成Python脚本
-    script_content = f'''#!/usr/bin/env python3
-# -*- coding: utf-8 -*-
-"""
-Comprehensive PNG Chart Generator for {chart_title}
-This script creates subplots for all metrics in one chart
-"""
-
-try:
-    from PIL import Image, ImageDraw, ImageFont
-    PIL_AVAILABLE = True
-except ImportError:
-    PIL_AVAILABLE = False
-    print("PIL not available, will create text-based chart")
 
-import os
-import math
-
-def create_comprehensive_png_chart():
-    """Create comprehensive PNG chart with subplots for all metrics"""
-    
-    if not PIL_AVAILABLE:
-        print("PIL (Pillow) not available. Please install with: pip install Pillow")
-        return False
-    
-    # Chart data
-    metrics_data = {json.dumps(metrics_data, indent=4)}
-    
-    num_metrics = len(metrics_data)
-    if num_metrics == 0:
-        print("No data to chart")
-        return False
-    
-    # Calculate subplot layout
-    if num_metrics == 1:
-        rows, cols = 1, 1
-    elif num_metrics <= 2:
-        rows, cols = 1, 2
-    elif num_metrics <= 4:
-        rows, cols = 2, 2
-    elif num_metrics <= 6:
-        rows, cols = 2, 3
-    else:
-        rows, cols = 3, 3
-    
-    # Image settings - adjusted for better title display
-    subplot_width, subplot_height = 600, 400
-    margin = 60
-    title_height = 100  # Increased for better title space
-    width = cols * subplot_width + (cols + 1) * margin
-    height = rows * subplot_height + (rows + 1) * margin + title_height
-    
-    bg_color = (255, 255, 255)  # White background
-    
-    # Create image
-    img = Image.new('RGB', (width, height), bg_color)
-    draw = ImageDraw.Draw(img)
-    
-    # Try to load fonts
+    print(f"Generated analysis report: {report_file}")
+    return report_file
+
+def snapshot_result_files(data_sources, data_dir, store_dir=None, hardlink=False):
+    """把各结果目录中的 {task}_results.txt 快照到 data_dir/<标签>/（内容寻址存储，写时复制/可选硬链接，写出清单）"""
+    return snapshot_files(data_sources, data_dir, [f"{task}_results.txt" for task in RESULT_TASKS], store_dir,
+                          hardlink=hardlink)
+
+def parse_model_dirs(items, option):
+    """解析 NAME=DIR 形式的模型列表，返回按输入顺序的 {模型名: 结果目录}"""
+    model_dirs = {}
+    for item in items or []:
+        name, sep, path = item.partition('=')
+        if not sep or not name or not path:
+            raise SystemExit(f"{option} expects NAME=DIR, got: {item}")
+        if name in model_dirs:
+            raise SystemExit(f"{option}: duplicate model name {name}")
+        model_dirs[name] = path
+    return model_dirs
+
+def positive_scale(value):
+    """--scales 的参数类型：大于0的倍数"""
     try:
-        title_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 24)  # Reduced size
-        subtitle_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 14)  # Reduced size
-        label_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 11)
-        small_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 9)
-    except:
-        try:
-            title_font = ImageFont.load_default()
-            subtitle_font = ImageFont.load_default()
-            label_font = ImageFont.load_default()
-            small_font = ImageFont.load_default()
-        except:
-            print("Could not load fonts")
-            title_font = subtitle_font = label_font = small_font = None
-    
-    # Colors
-    v1_color = (46, 134, 171)    # Blue for Model 1
-    v2_color = (162, 59, 114)    # Purple for Model 2
-    text_color = (51, 51, 51)     # Dark gray for text
-    grid_color = (200, 200, 200)  # Light gray for grid
-    
-    # Main title - adjusted for better fit
-    title_text = "{chart_title}"
-    if title_font:
-        # Split long titles into multiple lines
-        if len(title_text) > 50:
-            words = title_text.split()
-            lines = []
-            current_line = []
-            for word in words:
-                current_line.append(word)
-                if len(' '.join(current_line)) > 40:
-                    if len(current_line) > 1:
-                        current_line.pop()
-                        lines.append(' '.join(current_line))
-                        current_line = [word]
-                    else:
-                        lines.append(' '.join(current_line))
-                        current_line = []
-            if current_line:
-                lines.append(' '.join(current_line))
-            
-            for i, line in enumerate(lines):
-                title_bbox = draw.textbbox((0, 0), line, font=title_font)
-                title_width = title_bbox[2] - title_bbox[0]
-                title_x = (width - title_width) // 2
-                draw.text((title_x, 15 + i * 30), line, fill=text_color, font=title_font)
-        else:
-            title_bbox = draw.textbbox((0, 0), title_text, font=title_font)
-            title_width = title_bbox[2] - title_bbox[0]
-            title_x = (width - title_width) // 2
-            draw.text((title_x, 25), title_text, fill=text_color, font=title_font)
-    
-    # Draw subplots
-    metric_idx = 0
-    for row in range(rows):
-        for col in range(cols):
-            if metric_idx >= num_metrics:
-                break
-                
-            metric = list(metrics_data.keys())[metric_idx]
-            data = metrics_data[metric]
-            
-            task_labels = data['task_labels']
-            v1_values = data['v1_values']
-            v2_values = data['v2_values']
-            metric_name = data['metric_name']
-            
-            # Calculate subplot position
-            subplot_x = margin + col * (subplot_width + margin)
-            subplot_y = title_height + margin + row * (subplot_height + margin)
-            
-            # Subplot area
-            chart_left = subplot_x + 60
-            chart_right = subplot_x + subplot_width - 20
-            chart_top = subplot_y + 40
-            chart_bottom = subplot_y + subplot_height - 60
-            chart_width = chart_right - chart_left
-            chart_height = chart_bottom - chart_top
-            
-            # Subplot title - truncate if too long
-            display_title = metric_name
-            if len(display_title) > 25:
-                display_title = display_title[:22] + "..."
-            
-            if subtitle_font:
-                subtitle_bbox = draw.textbbox((0, 0), display_title, font=subtitle_font)
-                subtitle_width = subtitle_bbox[2] - subtitle_bbox[0]
-                subtitle_x = subplot_x + (subplot_width - subtitle_width) // 2
-                draw.text((subtitle_x, subplot_y + 5), display_title, fill=text_color, font=subtitle_font)
-            
-            # Find max value for this subplot
-            max_value = max(max(v1_values) if v1_values else [0], max(v2_values) if v2_values else [0])
-            if max_value == 0:
-                max_value = 1
-            
-            # Draw grid lines
-            for i in range(6):
-                y = chart_bottom - (i * chart_height // 5)
-                draw.line([(chart_left, y), (chart_right, y)], fill=grid_color, width=1)
-                
-                # Y-axis labels
-                value = (i * max_value) / 5
-                if small_font:
-                    draw.text((chart_left - 50, y - 6), f"{{value:.2f}}", fill=text_color, font=small_font)
-            
-            # Calculate bar dimensions
-            num_tasks = len(task_labels)
-            if num_tasks > 0:
-                bar_group_width = chart_width // num_tasks
-                bar_width = max(8, bar_group_width // 3)
-                bar_spacing = max(2, bar_width // 4)
-                
-                # Draw bars
-                for i, (task_id, v1_val, v2_val) in enumerate(zip(task_labels, v1_values, v2_values)):
-                    # Calculate positions
-                    group_center = chart_left + (i + 0.5) * bar_group_width
-                    
-                    v1_bar_left = int(group_center - bar_width - bar_spacing//2)
-                    v2_bar_left = int(group_center + bar_spacing//2)
-                    
-                    # Calculate heights
-                    v1_height = int((v1_val / max_value) * chart_height)
-                    v2_height = int((v2_val / max_value) * chart_height)
-                    
-                    # Draw bars
-                    v1_bar_top = chart_bottom - v1_height
-                    v2_bar_top = chart_bottom - v2_height
-                    
-                    # Model 1 bar
-                    draw.rectangle([v1_bar_left, v1_bar_top, v1_bar_left + bar_width, chart_bottom], 
-                                  fill=v1_color, outline=v1_color)
-                    
-                    # Model 2 bar
-                    draw.rectangle([v2_bar_left, v2_bar_top, v2_bar_left + bar_width, chart_bottom], 
-                                  fill=v2_color, outline=v2_color)
-                    
-                    # Task label (show all labels, rotate if needed)
-                    if small_font:
-                        label_x = group_center - len(task_id) * 2
-                        draw.text((label_x, chart_bottom + 5), task_id, fill=text_color, font=small_font)
-            
-            # Y-axis label for this subplot
-            if label_font:
-                y_label = metric_name[:15] + "..." if len(metric_name) > 15 else metric_name
-                draw.text((subplot_x + 5, chart_top + chart_height//2), y_label, fill=text_color, font=label_font)
-            
-            metric_idx += 1
+        scale = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid scale: {value}")
+    if not scale > 0:
+        raise argparse.ArgumentTypeError(f"scale must be greater than 0, got: {value}")
+    return scale
+
+def safe_name(name):
+    return name.replace(' ', '_').replace('.', '_')
+
+def run_n_model_comparison(args):
+    """N个模型的对比：每个结果文件只读一次，所有模型对的差异一次计算，输出一份报告"""
+    modes = [("Standard Mode", parse_model_dirs(args.models, '--models'))]
+    if args.include_deep:
+        deep_dirs = parse_model_dirs(args.deep_models, '--deep-models')
+        modes.append(("Deep Reasoning Mode", deep_dirs))
+    models = list(modes[0][1])
+    if len(models) < 2:
+        raise SystemExit("--models needs at least two NAME=DIR entries")
     
-    # Global legend
-    legend_y = height - 40
-    legend_x = margin
+    print(f"=== Model Performance Comparison Toolkit ===")
+    print(f"Comparing {len(models)} models: {', '.join(models)}")
     
-    # Model 1 legend
-    draw.rectangle([legend_x, legend_y, legend_x + 20, legend_y + 15], fill=v1_color)
-    if label_font:
-        draw.text((legend_x + 30, legend_y), "{model1_name}", fill=text_color, font=label_font)
+    if args.output_dir:
+        output_dir = args.output_dir
+    else:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_dir = f"{len(models)}_Models_Analysis_{timestamp}"
+    reports_dir = os.path.join(output_dir, "reports")
+    data_dir = os.path.join(output_dir, "data")
+    for subdir in [reports_dir, data_dir]:
+        os.makedirs(subdir, exist_ok=True)
+    print(f"Output directory: {output_dir}")
     
-    # Model 2 legend
-    legend_x += 150
-    draw.rectangle([legend_x, legend_y, legend_x + 20, legend_y + 15], fill=v2_color)
-    if label_font:
-        draw.text((legend_x + 30, legend_y), "{model2_name}", fill=text_color, font=label_font)
+    print("\n1. Loading data and computing pairwise comparisons...")
+    sections = []
+    for mode_name, model_dirs in modes:
+        for task_type, metrics in TASK_METRICS.items():
+            table = load_results_table(model_dirs, TASK_SOURCES[task_type][0], metrics)
+            if table is None:
+                continue
+            sections.append(create_n_model_report(table, pairwise_comparison(table), task_type, mode_name))
     
-    # Save image
-    output_file = "{task_type}_{mode_name.lower().replace(' ', '_')}_comprehensive_comparison.png"
-    img.save(output_file)
-    print(f"Comprehensive PNG chart saved to: {{output_file}}")
-    return True
+    report = f"""# {len(models)}-Model Performance Comparison
 
-if __name__ == "__main__":
-    success = create_comprehensive_png_chart()
-    if not success:
-        print("Failed to create comprehensive PNG chart")
-'''
+Models: {', '.join(f'**{model}**' for model in models)}  
+Modes: {' and '.join(mode_name for mode_name, _ in modes)}  
+Pairs compared: {len(models) * (len(models) - 1) // 2}  
+Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+""" + ''.join(sections)
+    
+    report_file = os.path.join(reports_dir, "n_model_comparison_report.md")
+    with open(report_file, 'w', encoding='utf-8') as f:
+        f.write(report)
+    print(f"Generated comparison report: {report_file}")
     
-    # 保存Python脚本
-    script_file = os.path.join(output_dir, f"{task_type}_{mode_name.lower().replace(' ', '_')}_comprehensive_png_generator.py")
-    with open(script_file, 'w', encoding='utf-8') as f:
-        f.write(script_content)
+    print("\n2. Snapshotting original data files...")
+    data_sources = [(model_dir, f"{safe_name(model)}_{'deep' if mode_name.startswith('Deep') else 'standard'}")
+                    for mode_name, model_dirs in modes for model, model_dir in model_dirs.items()]
+    snapshot_result_files(data_sources, data_dir, args.snapshot_store, args.snapshot_hardlink)
     
-    print(f"Generated comprehensive PNG script: {script_file}")
-    return script_file
+    print(f"\n{'='*80}")
+    print("N-model comparison completed!")
+    print(f"Report: {report_file}")
 
 def main():
     """主函数"""
     parser = argparse.ArgumentParser(description='Model Performance Comparison Toolkit')
-    parser.add_argument('--model1-name', required=True, help='Name of the first model (e.g., Dolphin-1.6)')
-    parser.add_argument('--model2-name', required=True, help='Name of the second model (e.g., Dolphin-1.9)')
-    parser.add_argument('--model1-standard-dir', required=True, help='Directory containing model1 standard mode results')
+    parser.add_argument('--model1-name', help='Name of the first model (e.g., Dolphin-1.6)')
+    parser.add_argument('--model2-name', help='Name of the second model (e.g., Dolphin-1.9)')
+    parser.add_argument('--model1-standard-dir', help='Directory containing model1 standard mode results')
     parser.add_argument('--model1-deep-dir', help='Directory containing model1 deep reasoning mode results')
-    parser.add_argument('--model2-standard-dir', required=True, help='Directory containing model2 standard mode results')
+    parser.add_argument('--model2-standard-dir', help='Directory containing model2 standard mode results')
     parser.add_argument('--model2-deep-dir', help='Directory containing model2 deep reasoning mode results')
     parser.add_argument('--output-dir', help='Output directory (default: auto-generated)')
     parser.add_argument('--include-deep', action='store_true', help='Include deep reasoning mode comparison')
+    parser.add_argument('--snapshot-store', default=None,
+                        help='Snapshot store for the data/ files (default: SNAPSHOT_STORE_DIR or .snapshot_store next to the toolkit)')
+    parser.add_argument('--snapshot-hardlink', action='store_true',
+                        help='Hard-link data/ files to the snapshot store instead of cloning or copying them')
+    parser.add_argument('--models', nargs='+', metavar='NAME=DIR',
+                        help='N-model mode: standard mode result directories of all models, e.g. --models A=/path/a B=/path/b C=/path/c')
+    parser.add_argument('--deep-models', nargs='+', metavar='NAME=DIR',
+                        help='N-model mode: deep reasoning mode result directories (required together with --include-deep)')
+    parser.add_argument('--workers', type=int, default=1, help='Number of processes used to render charts in parallel')
+    parser.add_argument('--formats', nargs='+', default=['png'], choices=['png', 'svg'],
+                        help='Chart output formats (default: png); both need Pillow, SVG layout uses its font metrics')
+    parser.add_argument('--scales', nargs='+', type=positive_scale, default=[1.0],
+                        help='PNG scales rendered from one layout, e.g. --scales 1 2 (default: 1)')
     
     args = parser.parse_args()
     
+    if args.deep_models and not args.models:
+        parser.error("--deep-models is only used with --models")
+    if args.models:
+        # 深度推理模式需要同时给出 --include-deep 和 --deep-models，只给其一时报错而不是静默跳过
+        if args.deep_models and not args.include_deep:
+            parser.error("--deep-models requires --include-deep")
+        if args.include_deep and not args.deep_models:
+            parser.error("--include-deep with --models requires --deep-models")
+        run_n_model_comparison(args)
+        return
+    missing = [option for option in ('model1_name', 'model2_name', 'model1_standard_dir', 'model2_standard_dir')
+               if not getattr(args, option)]
+    if missing:
+        parser.error(f"the following arguments are required without --models: "
+                     f"{', '.join('--' + option.replace('_', '-') for option in missing)}")
+    
     print(f"=== Model Performance Comparison Toolkit ===")
     print(f"Comparing {args.model1_name} vs {args.model2_name}")
     
@@ -431,8 +274,8 @@ def main():
         output_dir = args.output_dir
     else:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        safe_model1 = args.model1_name.replace(' ', '_').replace('.', '_')
-        safe_model2 = args.model2_name.replace(' ', '_').replace('.', '_')
+        safe_model1 = safe_name(args.model1_name)
+        safe_model2 = safe_name(args.model2_name)
         output_dir = f"{safe_model1}_vs_{safe_model2}_Analysis_{timestamp}"
     
     os.makedirs(output_dir, exist_ok=True)
@@ -442,9 +285,8 @@ def main():
     charts_dir = os.path.join(output_dir, "charts")
     reports_dir = os.path.join(output_dir, "reports")
     data_dir = os.path.join(output_dir, "data")
-    scripts_dir = os.path.join(output_dir, "scripts")
     
-    for subdir in [charts_dir, reports_dir, data_dir, scripts_dir]:
+    for subdir in [charts_dir, reports_dir, data_dir]:
         os.makedirs(subdir, exist_ok=True)
     
     print("\n1. Loading data...")
@@ -453,7 +295,7 @@ def main():
     data_standard = {'model1': {}, 'model2': {}}
     data_deep = {'model1': {}, 'model2': {}}
     
-    for task in ['cla', 'mea', 'seg', 'report']:
+    for task in RESULT_TASKS:
         # Standard mode
         data_standard['model1'][task] = load_results_txt(os.path.join(args.model1_standard_dir, f"{task}_results.txt"))
         data_standard['model2'][task] = load_results_txt(os.path.join(args.model2_standard_dir, f"{task}_results.txt"))
@@ -465,57 +307,30 @@ def main():
     
     print("\n2. Generating comprehensive task charts with subplots...")
     
-    # 定义所有任务和指标 (移除failed_items)
-    task_metrics = {
-        'classification': [
-            ('acc', 'Accuracy'),
-            ('precision', 'Precision'),
-            ('recall', 'Recall'),
-            ('f1', 'F1-Score')
-        ],
-        'measurement': [
-            ('RMSE', 'Root Mean Square Error'),
-            ('MAE', 'Mean Absolute Error'),
-            ('%_within_tolerance', 'Percentage within Tolerance')
-        ],
-        'segmentation': [
-            ('acc', 'Accuracy')
-        ],
-        'report': [
-            ('Bleu-1', 'BLEU-1'),
-            ('Bleu-2', 'BLEU-2'),
-            ('Bleu-3', 'BLEU-3'),
-            ('Bleu-4', 'BLEU-4'),
-            ('Rouge', 'Rouge'),
-            ('BERTScore', 'BERTScore')
-        ]
-    }
-    
-    generated_scripts = []
-    
-    # 生成标准模式的任务图表
-    print("\nGenerating Standard Mode comprehensive charts...")
-    for task_type, metrics in task_metrics.items():
-        print(f"  Processing {task_type} task...")
-        script_file = generate_task_subplot_png_script(
-            data_standard, task_type, metrics, "Standard Mode", scripts_dir, args.model1_name, args.model2_name
-        )
-        if script_file:
-            generated_scripts.append(script_file)
-    
-    # 生成深度推理模式的任务图表
+    modes = [("Standard Mode", data_standard)]
     if args.include_deep and args.model1_deep_dir and args.model2_deep_dir:
-        print("\nGenerating Deep Reasoning Mode comprehensive charts...")
-        for task_type, metrics in task_metrics.items():
+        modes.append(("Deep Reasoning Mode", data_deep))
+    
+    # 生成各模式各任务的分析报告和图表数据
+    charts = []
+    for mode_name, data_dict in modes:
+        print(f"\nPreparing {mode_name} comprehensive charts...")
+        for task_type, metrics in TASK_METRICS.items():
             print(f"  Processing {task_type} task...")
-            script_file = generate_task_subplot_png_script(
-                data_deep, task_type, metrics, "Deep Reasoning Mode", scripts_dir, args.model1_name, args.model2_name
+            write_task_analysis_report(
+                data_dict, task_type, metrics, mode_name, reports_dir, args.model1_name, args.model2_name
             )
-            if script_file:
-                generated_scripts.append(script_file)
+            chart = build_chart(data_dict, task_type, metrics, mode_name, args.model1_name, args.model2_name)
+            if chart:
+                charts.append(chart)
+    
+    # 在当前进程中直接绘制所有图表
+    print(f"\nRendering {len(charts)} charts...")
+    generated_charts = [paths for paths in render_charts(charts, charts_dir, workers=args.workers,
+                                                         formats=args.formats, scales=args.scales) if paths]
     
-    # 复制原始数据到data目录
-    print("\n3. Copying original data files...")
+    # 把原始数据快照到data目录
+    print("\n3. Snapshotting original data files...")
     
     data_sources = [
         (args.model1_standard_dir, "model1_standard"),
@@ -528,59 +343,7 @@ def main():
             (args.model2_deep_dir, "model2_deep")
         ])
     
-    for source_dir, label in data_sources:
-        target_subdir = os.path.join(data_dir, label)
-        os.makedirs(target_subdir, exist_ok=True)
-        
-        for task in ['cla', 'mea', 'seg', 'report']:
-            source_file = os.path.join(source_dir, f"{task}_results.txt")
-            if os.path.exists(source_file):
-                target_file = os.path.join(target_subdir, f"{task}_results.txt")
-                shutil.copy2(source_file, target_file)
-                print(f"  Copied {source_file} -> {target_file}")
-    
-    # 创建批量运行脚本
-    batch_script = f"""#!/bin/bash
-# Comprehensive PNG Generator for Model Comparison
-
-echo "=== Generating Comprehensive Model Comparison Charts ==="
-echo "Comparing {args.model1_name} vs {args.model2_name}"
-echo "Output directory: {output_dir}"
-
-cd "{scripts_dir}"
-
-# Check if PIL is available
-python3 -c "from PIL import Image; print('PIL available')" 2>/dev/null
-if [ $? -eq 0 ]; then
-    echo "PIL (Pillow) is available, generating comprehensive PNG charts..."
-    
-    # Run all comprehensive PNG generators
-"""
-    
-    for script_file in generated_scripts:
-        script_name = os.path.basename(script_file)
-        batch_script += f"    echo \"Generating {script_name}...\"\n"
-        batch_script += f"    python3 {script_name}\n"
-        batch_script += f"    mv *.png ../{os.path.basename(charts_dir)}/\n"
-    
-    batch_script += f"""
-    echo "All comprehensive charts generated!"
-    echo "Generated $(ls -1 ../{os.path.basename(charts_dir)}/*.png 2>/dev/null | wc -l) PNG files"
-    ls -la ../{os.path.basename(charts_dir)}/*.png 2>/dev/null
-else
-    echo "PIL (Pillow) not available. Please install with:"
-    echo "pip install Pillow"
-fi
-
-echo "Done!"
-"""
-    
-    batch_file = os.path.join(output_dir, "generate_all_charts.sh")
-    with open(batch_file, 'w', encoding='utf-8') as f:
-        f.write(batch_script)
-    
-    # 使脚本可执行
-    os.chmod(batch_file, 0o755)
+    snapshot_result_files(data_sources, data_dir, args.snapshot_store, args.snapshot_hardlink)
     
     # 创建主报告
     modes_text = "Standard Mode"
@@ -597,7 +360,7 @@ This analysis compares the performance of **{args.model1_name}** and **{args.mod
 
 ✅ **Complete Dataset Labels**: All task IDs shown on x-axis  
 ✅ **Subplot Organization**: Each task has all metrics in one chart  
-✅ **Comprehensive Integration**: Charts, reports, data, and scripts in one folder  
+✅ **Comprehensive Integration**: Charts, reports, and data in one folder  
 ✅ **Measurement Task Fix**: Removed failed_items metric  
 ✅ **Title Optimization**: Fixed title overflow issues  
 ✅ **Command Line Tool**: Extensible for testing other models  
@@ -608,12 +371,11 @@ This analysis compares the performance of **{args.model1_name}** and **{args.mod
 {os.path.basename(output_dir)}/
 ├── charts/           # PNG chart files
 ├── reports/          # Analysis reports (.md files)
-├── data/            # Original data files
+├── data/            # Original data files (read-only snapshots, see data/manifest.json)
 │   ├── model1_standard/
 │   ├── model2_standard/
 {"│   ├── model1_deep/" if args.include_deep else ""}
 {"│   └── model2_deep/" if args.include_deep else ""}
-└── scripts/         # Python generation scripts
 ```
 
 ## Generated Charts
@@ -635,13 +397,12 @@ Each chart contains subplots for all metrics of that task:
 
 ## Usage
 
-### Generate All Charts
-```bash
-./generate_all_charts.sh
-```
+### Regenerate All Charts
+Charts are rendered directly by the toolkit; rerun it with the same arguments (add `--workers N` to render in parallel,
+`--formats png svg` for vector charts, `--scales 1 2` for high-DPI PNGs from the same layout).
 
 ### Chart Specifications
-- **Format**: PNG
+- **Format**: {', '.join(args.formats).upper()}{f" (PNG scales: {', '.join(f'{scale:g}x' for scale in args.scales)})" if 'png' in args.formats else ""}
 - **Layout**: Subplots for each metric within task
 - **X-axis**: Complete task ID labels
 - **Colors**: {args.model1_name} (Blue) vs {args.model2_name} (Purple)
@@ -667,7 +428,7 @@ python3 model_comparison_toolkit.py \\
 
 Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}  
 Models: {args.model1_name} vs {args.model2_name}  
-Total Charts: {len(generated_scripts)}  
+Total Charts: {len(generated_charts)}  
 """
     
     main_report_file = os.path.join(output_dir, "README.md")
@@ -677,18 +438,12 @@ Total Charts: {len(generated_scripts)}
     print(f"\n{'='*80}")
     print("Model comparison analysis setup completed!")
     print(f"Main directory: {output_dir}")
-    print(f"Generated {len(generated_scripts)} comprehensive chart scripts")
-    print(f"Total charts to be generated: {len(generated_scripts)}")
+    print(f"Generated {len(generated_charts)} comprehensive charts")
     
     print(f"\n📁 Directory structure:")
     print(f"  📊 charts/     - PNG chart files")
     print(f"  📋 reports/    - Analysis reports")
-    print(f"  📁 data/       - Original data files")
-    print(f"  🔧 scripts/    - Generation scripts")
-    
-    print(f"\n🎯 To generate all charts:")
-    print(f"1. cd {output_dir}")
-    print(f"2. ./generate_all_charts.sh")
+    print(f"  📁 data/       - Original data file snapshots (manifest.json)")
     
     print(f"\n✨ Key improvements:")
     print(f"  ✅ Removed failed_items from measurement task")
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Columnar results table and N-model comparison.
+
+Each model's `{task}_results.txt` is read once into a float array indexed by
+(model, task_id, metric); missing tasks and unparseable values are NaN. All pairwise
+deltas, average changes and win/loss counts are then computed for every model pair in
+one vectorized pass, so the cost grows with the number of models rather than pairs.
+"""
+
+import os
+import csv
+import numpy as np
+
+# 数值越小越好的指标，统计胜负时反向比较
+LOWER_IS_BETTER = {'RMSE', 'MAE'}
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return np.nan
+
+
+def read_columns(file_path):
+    """读取TSV结果文件为 {列名: 字符串列表}，文件不存在或读取失败时返回None"""
+    if not os.path.exists(file_path):
+        return None
+    try:
+        with open(file_path, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.reader(f, delimiter='\t')
+            header = next(reader, None)
+            if not header:
+                return None
+            rows = [row for row in reader if row]
+    except Exception as e:
+        print(f"Failed to load {file_path}: {e}")
+        return None
+    print(f"Loaded {file_path}: {len(rows)} records")
+    return {name: [row[i] if i < len(row) else '' for row in rows] for i, name in enumerate(header)}
+
+
+def load_results_table(model_dirs, task, metrics):
+    """加载所有模型某类任务的结果文件，每个文件只读一次
+
+    model_dirs: {模型名: 结果目录}，task: 结果文件前缀（cla/mea/seg/report），
+    metrics: [(列名, 显示名)]。返回 {'models', 'task_ids', 'metrics', 'metric_names', 'values'}，
+    values 形状为 (模型数, 任务数, 指标数)，缺失的任务或无法解析的数值为 NaN；没有任何数据时返回None。
+    """
+    models = list(model_dirs)
+    loaded = {}
+    for model, result_dir in model_dirs.items():
+        columns = read_columns(os.path.join(result_dir, f"{task}_results.txt"))
+        if columns and 'task_id' in columns:
+            loaded[model] = columns
+    if not loaded:
+        return None
+
+    task_ids = sorted(set().union(*(columns['task_id'] for columns in loaded.values())))
+    task_index = {task_id: i for i, task_id in enumerate(task_ids)}
+    values = np.full((len(models), len(task_ids), len(metrics)), np.nan)
+
+    for m, model in enumerate(models):
+        columns = loaded.get(model)
+        if columns is None:
+            continue
+        # 同一任务出现多次时保留最后一行（与按任务ID建字典一致）
+        last_row = {task_id: r for r, task_id in enumerate(columns['task_id'])}
+        targets = np.array([task_index[task_id] for task_id in last_row], dtype=np.intp)
+        for k, (metric, _) in enumerate(metrics):
+            if metric in columns:
+                column = columns[metric]
+                values[m, targets, k] = [_to_float(column[r]) for r in last_row.values()]
+
+    return {
+        'models': models,
+        'task_ids': task_ids,
+        'metrics': [metric for metric, _ in metrics],
+        'metric_names': [name for _, name in metrics],
+        'values': values,
+    }
+
+
+def pairwise_comparison(table):
+    """一次向量化计算所有模型对 (基准i, 对比j) 的差异，数组形状均为 (模型数, 模型数, ...)
+
+    delta[i, j, t, k]:   任务t上指标k的 j - i（任一方缺失时为NaN）
+    base_avg/other_avg:  两个模型都有数值的任务上，i 和 j 的平均值 (模型数, 模型数, 指标数)
+    change/change_pct:   平均值之差及其相对 i 的百分比（i 的平均值不大于0时为0，与两模型对比报告一致）
+    wins/losses:         j 优于/劣于 i 的任务数（RMSE、MAE 越小越好）
+    """
+    values = table['values']
+    valid = ~np.isnan(values)
+    both = valid[:, None] & valid[None, :]
+    filled = np.where(valid, values, 0.0)
+
+    delta = values[None, :] - values[:, None]
+    count = both.sum(axis=2)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        base_avg = np.where(both, filled[:, None], 0.0).sum(axis=2) / count
+        other_avg = np.where(both, filled[None, :], 0.0).sum(axis=2) / count
+        change = other_avg - base_avg
+        change_pct = np.where(base_avg > 0, change / base_avg * 100, 0.0)
+
+    sign = np.array([-1.0 if metric in LOWER_IS_BETTER else 1.0 for metric in table['metrics']])
+    better = np.where(both, delta * sign, 0.0)
+    return {
+        'delta': delta,
+        'count': count,
+        'base_avg': base_avg,
+        'other_avg': other_avg,
+        'change': change,
+        'change_pct': change_pct,
+        'wins': (better > 0).sum(axis=2),
+        'losses': (better < 0).sum(axis=2),
+    }
+
+
+def create_n_model_report(table, comparison, task_type, mode_name):
+    """N个模型某类任务的对比报告：各模型平均值、逐任务数值和两两对比矩阵"""
+    models = table['models']
+    values = table['values']
+    valid = ~np.isnan(values)
+
+    report = f"""
+## {task_type.capitalize()} Task Analysis ({mode_name})
+
+### Performance Summary
+
+Averages over the tasks shared by all {len(models)} models.
+
+| Model | {' | '.join(table['metric_names'])} |
+|-------|{'|'.join('-' * (len(name) + 2) for name in table['metric_names'])}|
+"""
+    shared = valid.all(axis=0)
+    with np.errstate(invalid='ignore'):
+        shared_avg = np.where(shared, values, 0.0).sum(axis=1) / shared.sum(axis=0)
+    for m, model in enumerate(models):
+        cells = ' | '.join('-' if np.isnan(v) else f"{v:.4f}" for v in shared_avg[m])
+        report += f"| {model} | {cells} |\n"
+
+    for k, metric_name in enumerate(table['metric_names']):
+        direction = 'lower is better' if table['metrics'][k] in LOWER_IS_BETTER else 'higher is better'
+        report += f"""
+### {metric_name}: Pairwise Comparison ({direction})
+
+Each cell compares the column model against the row model on their common tasks:
+average change, change %, and tasks won/lost.
+
+| Baseline \\ Compared | {' | '.join(models)} |
+|---------------------|{'|'.join('-' * (len(model) + 2) for model in models)}|
+"""
+        for i, base in enumerate(models):
+            cells = []
+            for j in range(len(models)):
+                if i == j or comparison['count'][i, j, k] == 0:
+                    cells.append('-')
+                else:
+                    cells.append(f"{comparison['change'][i, j, k]:+.4f} ({comparison['change_pct'][i, j, k]:+.2f}%) "
+                                 f"{comparison['wins'][i, j, k]}W/{comparison['losses'][i, j, k]}L")
+            report += f"| {base} | {' | '.join(cells)} |\n"
+
+    report += f"""
+### Task-by-Task Values
+
+| Task ID | Metric | {' | '.join(models)} |
+|---------|--------|{'|'.join('-' * (len(model) + 2) for model in models)}|
+"""
+    for t, task_id in enumerate(table['task_ids']):
+        for k, metric_name in enumerate(table['metric_names']):
+            column = values[:, t, k]
+            if np.isnan(column).all():
+                continue
+            report += f"| {task_id} | {metric_name} | {' | '.join('-' if np.isnan(v) else f'{v:.4f}' for v in column)} |\n"
+
+    return report
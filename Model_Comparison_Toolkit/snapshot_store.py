@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Content-addressed snapshot store for the comparison data files.
+
+Each results file is stored once under objects/<sha256[:2]>/<sha256> (read-only) and
+materialized into a comparison's data/ folder as a reflink (copy-on-write clone),
+falling back to a plain copy when the file system cannot clone; hard links are used
+only when asked for. Every comparison records a manifest.json listing the
+snapshotted files and their hashes. An index of file stamps (size, mtime, ctime,
+inode) lets unchanged source files and store objects skip re-hashing, so archiving
+many comparison runs of the same results costs almost no extra disk space or time.
+"""
+
+import os
+import sys
+import json
+import errno
+import shutil
+import hashlib
+import argparse
+from datetime import datetime
+
+# 快照库目录，可通过环境变量 SNAPSHOT_STORE_DIR 覆盖；与输出目录在同一文件系统时才能硬链接
+SNAPSHOT_STORE_DIR = os.environ.get(
+    'SNAPSHOT_STORE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.snapshot_store')
+)
+
+MANIFEST_NAME = 'manifest.json'
+# 哈希索引：sources 为 源文件 -> [大小, 修改时间, 状态改变时间, inode, sha256]，
+# objects 为 sha256 -> 对象上次校验时的 [大小, 修改时间, 状态改变时间, inode]；记录未变时不必重新计算哈希
+INDEX_NAME = 'index.json'
+
+# Linux 的 FICLONE ioctl：在支持的文件系统（btrfs、xfs等）上创建共享数据块的副本
+_FICLONE = 0x40049409
+# 已知不能克隆的 (源文件设备, 目标目录设备)，之后直接复制，不再每个文件先尝试一次克隆
+_NO_REFLINK = set()
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """文件内容的 sha256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def object_path(digest, store_dir=None):
+    return os.path.join(store_dir or SNAPSHOT_STORE_DIR, 'objects', digest[:2], digest)
+
+
+def _load_index(store_dir):
+    try:
+        with open(os.path.join(store_dir, INDEX_NAME), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = {}
+    # 旧格式（只记录源文件）的索引直接丢弃，所有文件重新计算一次哈希
+    if not isinstance(index.get('sources'), dict) or not isinstance(index.get('objects'), dict):
+        return {'sources': {}, 'objects': {}}
+    return index
+
+
+def _stamp(st):
+    """文件的 [大小, 修改时间, 状态改变时间, inode]；内容被改写（包括改回原修改时间）时至少有一项变化"""
+    return [st.st_size, st.st_mtime_ns, st.st_ctime_ns, st.st_ino]
+
+
+def _save_index(store_dir, index):
+    os.makedirs(store_dir, exist_ok=True)
+    tmp_file = os.path.join(store_dir, f"{INDEX_NAME}.{os.getpid()}.tmp")
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(index, f)
+    os.replace(tmp_file, os.path.join(store_dir, INDEX_NAME))
+
+
+def _reflink(src, dst):
+    """写时复制克隆，不支持时抛出 OSError"""
+    if not sys.platform.startswith('linux'):
+        raise OSError(errno.EOPNOTSUPP, 'reflink not supported on this platform')
+    import fcntl
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        try:
+            fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+        except OSError:
+            fdst.close()
+            os.remove(dst)
+            raise
+
+
+def _place(src, dst, allow_hardlink=False):
+    """把 src 放到 dst：（允许时）硬链接 -> 写时复制克隆 -> 复制，返回实际使用的方式"""
+    if allow_hardlink:
+        try:
+            os.link(src, dst)
+            return 'hardlink'
+        except OSError:
+            pass
+    devices = (os.stat(src).st_dev, os.stat(os.path.dirname(os.path.abspath(dst))).st_dev)
+    if devices not in _NO_REFLINK:
+        try:
+            _reflink(src, dst)
+            return 'reflink'
+        except OSError:
+            _NO_REFLINK.add(devices)
+    shutil.copy2(src, dst)
+    return 'copy'
+
+
+def object_intact(digest, store_dir=None, index=None):
+    """快照库中的对象存在且内容仍与哈希一致
+
+    data/ 中的快照是对象的硬链接时，有人改写了某个快照对象也随之改变，复用前必须确认对象未被改动。
+    index 为 _load_index 得到的字典时，对象的大小、修改时间、状态改变时间和 inode 与上次校验时相同则不重新计算哈希，
+    否则重新计算并更新索引。
+    """
+    obj = object_path(digest, store_dir)
+    try:
+        stamp = _stamp(os.stat(obj))
+    except OSError:
+        return False
+    if index is not None and index['objects'].get(digest) == stamp:
+        return True
+    if file_digest(obj) != digest:
+        return False
+    if index is not None:
+        index['objects'][digest] = stamp
+    return True
+
+
+def add_file(path, store_dir=None, index=None):
+    """把文件内容存入快照库（内容相同的只存一份），返回 (sha256, 是否写入了对象)
+
+    index 为 _load_index 得到的字典时，记录未变的源文件直接使用记录的哈希，记录未变的对象不重新校验，并更新索引。
+    已有对象的内容与哈希不一致（快照被改写）时用源文件重新写入该对象。
+    """
+    key = os.path.abspath(path)
+    stamp = _stamp(os.stat(path))
+    cached = index['sources'].get(key) if index is not None else None
+    if cached and cached[:-1] == stamp and object_intact(cached[-1], store_dir, index):
+        return cached[-1], False
+
+    digest = file_digest(path)
+    if index is not None:
+        index['sources'][key] = stamp + [digest]
+    obj = object_path(digest, store_dir)
+    if os.path.exists(obj):
+        if object_intact(digest, store_dir, index):
+            return digest, False
+        print(f"  Warning: snapshot object {obj} was modified, rewriting it from {path}")
+
+    os.makedirs(os.path.dirname(obj), exist_ok=True)
+    tmp_file = f"{obj}.{os.getpid()}.tmp"
+    try:
+        # 不直接硬链接源文件：源文件之后被原地修改时会连带改掉库中的对象
+        _place(path, tmp_file, allow_hardlink=False)
+        shutil.copystat(path, tmp_file)
+        os.chmod(tmp_file, 0o444)
+        # 写入新的 inode 后替换：已被改写的旧对象（及其硬链接）不再被之后的快照使用
+        os.replace(tmp_file, obj)
+    finally:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+    if index is not None:
+        index['objects'][digest] = _stamp(os.stat(obj))
+    return digest, True
+
+
+def materialize(digest, target, store_dir=None, hardlink=False, index=None):
+    """在 target 处放置快照库中对象的只读副本，返回使用的方式（hardlink/reflink/copy）
+
+    hardlink=True 时优先硬链接。硬链接会改变对象的状态改变时间，index 不为空时随之更新索引中的记录
+    （调用方须刚确认过对象完好），否则下次快照会重新计算该对象的哈希。
+    """
+    if os.path.lexists(target):
+        os.remove(target)
+    obj = object_path(digest, store_dir)
+    method = _place(obj, target, allow_hardlink=hardlink)
+    if method != 'hardlink':
+        os.chmod(target, 0o444)
+    elif index is not None:
+        index['objects'][digest] = _stamp(os.stat(obj))
+    return method
+
+
+def snapshot_files(data_sources, data_dir, file_names, store_dir=None, hardlink=False):
+    """把各结果目录中的文件快照到 data_dir/<标签>/，并写出 data_dir/manifest.json
+
+    data_sources: [(源目录, 标签)]，file_names: 每个源目录中要快照的文件名（不存在的跳过）。
+    默认以写时复制克隆（不支持时复制）放入 data/；hardlink=True 时优先硬链接，data/ 不再占用额外空间，
+    但快照与库中对象共用 inode，改写快照会连带改写对象（下次快照时发现并重写）。
+    返回清单 {'created', 'store', 'files': [{path, sha256, size, source, method}]}。
+    """
+    store_dir = os.path.abspath(store_dir or SNAPSHOT_STORE_DIR)
+    index = _load_index(store_dir)
+    # 索引中的记录只会被整体替换，浅复制即可在结束时判断索引是否有变化
+    loaded = {name: dict(records) for name, records in index.items()}
+    entries = []
+    new_bytes = 0
+    for source_dir, label in data_sources:
+        target_subdir = os.path.join(data_dir, label)
+        os.makedirs(target_subdir, exist_ok=True)
+
+        for file_name in file_names:
+            source_file = os.path.join(source_dir, file_name)
+            if not os.path.exists(source_file):
+                continue
+            digest, is_new = add_file(source_file, store_dir, index)
+            size = os.path.getsize(source_file)
+            if is_new:
+                new_bytes += size
+            target_file = os.path.join(target_subdir, file_name)
+            method = materialize(digest, target_file, store_dir, hardlink=hardlink, index=index)
+            entries.append({
+                'path': os.path.join(label, file_name),
+                'sha256': digest,
+                'size': size,
+                'source': os.path.abspath(source_file),
+                'method': method,
+            })
+            print(f"  Snapshot {source_file} -> {target_file} ({method}{', new object' if is_new else ''})")
+
+    if index != loaded:
+        _save_index(store_dir, index)
+    manifest = {
+        'created': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'store': store_dir,
+        'files': entries,
+    }
+    os.makedirs(data_dir, exist_ok=True)
+    with open(os.path.join(data_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    total = sum(entry['size'] for entry in entries)
+    print(f"  {len(entries)} files ({total / 1e3:.1f}KB), new in snapshot store: {new_bytes / 1e3:.1f}KB ({store_dir})")
+    return manifest
+
+
+def verify_manifest(data_dir, restore=False):
+    """检查 data_dir 中的文件与清单中的哈希一致；restore=True 时从快照库恢复缺失或不一致的文件
+
+    返回有问题（且未能恢复）的文件路径列表。
+    """
+    with open(os.path.join(data_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    problems = []
+    for entry in manifest['files']:
+        path = os.path.join(data_dir, entry['path'])
+        if os.path.exists(path) and file_digest(path) == entry['sha256']:
+            continue
+        # 硬链接的文件被改写时库中对象也会变化，只从内容仍与哈希一致的对象恢复
+        if restore and object_intact(entry['sha256'], manifest['store']):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            method = materialize(entry['sha256'], path, manifest['store'])
+            print(f"Restored {path} ({method})")
+            continue
+        print(f"Missing or modified: {path}")
+        problems.append(path)
+    return problems
+
+
+def store_stats(store_dir=None):
+    """快照库中的对象数和总大小"""
+    objects_dir = os.path.join(store_dir or SNAPSHOT_STORE_DIR, 'objects')
+    count = size = 0
+    for root, _, files in os.walk(objects_dir):
+        for name in files:
+            count += 1
+            size += os.path.getsize(os.path.join(root, name))
+    return count, size
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Content-addressed snapshot store for comparison data files')
+    parser.add_argument('command', choices=['verify', 'stats'],
+                        help='verify: check a comparison data/ folder against its manifest; stats: store usage')
+    parser.add_argument('data_dir', nargs='?', help='data/ folder of a comparison (for verify)')
+    parser.add_argument('--store', default=None, help='Snapshot store directory (default: SNAPSHOT_STORE_DIR)')
+    parser.add_argument('--restore', action='store_true', help='verify: restore missing or modified files from the store')
+    args = parser.parse_args()
+
+    if args.command == 'verify':
+        if not args.data_dir:
+            parser.error('verify needs the data/ folder of a comparison')
+        problems = verify_manifest(args.data_dir, restore=args.restore)
+        print(f"{'OK' if not problems else f'{len(problems)} problem file(s)'}: {args.data_dir}")
+        sys.exit(1 if problems else 0)
+    else:
+        count, size = store_stats(args.store)
+        print(f"{count} objects, {size / 1e6:.2f}MB in {args.store or SNAPSHOT_STORE_DIR}")
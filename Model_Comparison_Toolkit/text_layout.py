@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shared text layout for the comparison charts.
+
+Fonts are identified by (font file, size) and loaded once per process. Text widths
+and rasterized text masks are memoized per (font file, size, string), so titles, axis
+labels and the task IDs repeated across subplots and charts are measured and
+rendered by FreeType only once. wrap_text breaks lines using cumulative word widths
+instead of re-measuring the growing line after every word.
+"""
+
+import os
+import math
+from functools import lru_cache
+
+try:
+    from PIL import Image, ImageDraw, ImageFont
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+FONT_DIR = "/usr/share/fonts/truetype/dejavu"
+
+# 已栅格化文字四周留出的空白（像素），容纳亚像素起点和字形超出边界框的部分
+_MASK_PAD = 2
+
+
+@lru_cache(maxsize=None)
+def get_font(font_file, size):
+    """字体注册表：(字体文件, 字号) 只加载一次，找不到字体时用PIL默认字体，都失败时返回None"""
+    try:
+        return ImageFont.truetype(font_file if os.path.isabs(font_file) else os.path.join(FONT_DIR, font_file), size)
+    except Exception:
+        try:
+            return ImageFont.load_default()
+        except Exception:
+            print("Could not load fonts")
+            return None
+
+
+@lru_cache(maxsize=65536)
+def text_width(font_file, size, text):
+    """文字宽度（像素），与 draw.textbbox 的 right - left 相同"""
+    font = get_font(font_file, size)
+    if font is None:
+        return 0
+    left, _, right, _ = font.getbbox(text)
+    return right - left
+
+
+@lru_cache(maxsize=None)
+def font_ascent(font_file, size):
+    """字体上沿到基线的距离（像素），用于把左上角定位的文字换算为基线定位（如SVG）"""
+    font = get_font(font_file, size)
+    if not hasattr(font, 'getmetrics'):
+        # 找不到字体时的位图默认字体没有字形度量，按字号估计
+        return size
+    return font.getmetrics()[0]
+
+
+def wrap_text(text, max_width, font_key=None):
+    """按单词换行，返回行列表
+
+    font_key 为 (字体文件, 字号) 时 max_width 为像素宽度，否则为字符数。每个单词和空格只测量一次，
+    行宽按累计宽度计算；单个单词超过 max_width 时单独成行。
+    """
+    if font_key is None:
+        measure = len
+    else:
+        def measure(s):
+            return text_width(font_key[0], font_key[1], s)
+
+    space = measure(' ')
+    lines = []
+    current = []
+    current_width = 0
+    for word in text.split():
+        word_width = measure(word)
+        if current and current_width + space + word_width <= max_width:
+            current.append(word)
+            current_width += space + word_width
+            continue
+        if current:
+            lines.append(' '.join(current))
+        if word_width > max_width:
+            lines.append(word)
+            current, current_width = [], 0
+        else:
+            current, current_width = [word], word_width
+    if current:
+        lines.append(' '.join(current))
+    return lines
+
+
+@lru_cache(maxsize=8192)
+def _text_mask(font_file, size, text, start):
+    """栅格化一段文字，返回 (灰度蒙版, 文字起点在蒙版中的偏移)；start 为起点坐标的小数部分"""
+    font = get_font(font_file, size)
+    left, top, right, bottom = font.getbbox(text)
+    offset = (_MASK_PAD - left, _MASK_PAD - top)
+    mask = Image.new('L', (right - left + 2 * _MASK_PAD + 1, bottom - top + 2 * _MASK_PAD + 1), 0)
+    ImageDraw.Draw(mask).text((offset[0] + start[0], offset[1] + start[1]), text, fill=255, font=font)
+    return mask, offset
+
+
+def draw_text(draw, xy, text, font_key, fill):
+    """在 xy 处绘制文字，结果与 draw.text 逐像素一致；相同文字、字体和亚像素起点只栅格化一次"""
+    x, y = xy
+    start = (math.modf(x)[0], math.modf(y)[0])
+    mask, offset = _text_mask(font_key[0], font_key[1], text, start)
+    draw.bitmap((int(x) - offset[0], int(y) - offset[1]), mask, fill=fill)
+
+
+def clear_cache():
+    """清空字体、宽度、上沿和文字蒙版缓存"""
+    _text_mask.cache_clear()
+    text_width.cache_clear()
+    font_ascent.cache_clear()
+    get_font.cache_clear()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""BERTScore基准：逐模型调用 bert_score.score vs bertscore_cache 中缓存参考报告向量的实现
+
+后者只加载一次模型并按token数动态分批编码。构造一个任务的合成参考报告和多个模型的生成报告，
+模拟 batch_bertscore 逐模型评分，对比总耗时，并检查每个模型的 F1 与 bert_score.score 的最大差异（应在浮点误差范围内）。
+缓存目录使用临时目录，第一个模型会编码并写入参考报告，之后的模型直接读取缓存。
+
+用法:
+    python3 benchmarks/bench_bertscore_cache.py --samples 200 --models 5
+    python3 benchmarks/bench_bertscore_cache.py --model-type /path/to/bert-base-multilingual-cased --num-layers 9
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+NEW_RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'new_results')
+sys.path.insert(0, NEW_RESULTS_DIR)
+
+VOCAB = ('the liver is normal in size and echotexture no focal lesion seen gallbladder wall thickened '
+         'thyroid nodule hypoechoic margin irregular calcification left right lobe cm mm measuring '
+         'consolidation pleural line b-lines lung sliding absent present mild moderate severe').split()
+
+
+def make_task(samples, models, seed=0):
+    rng = random.Random(seed)
+    refs = [' '.join(rng.choice(VOCAB) for _ in range(rng.randint(20, 120))) for _ in range(samples)]
+    cands_per_model = []
+    for _ in range(models):
+        cands = []
+        for ref in refs:
+            kept = [w for w in ref.split() if rng.random() < 0.6]
+            cands.append(' '.join(kept + [rng.choice(VOCAB) for _ in range(rng.randint(1, 30))]))
+        cands_per_model.append(cands)
+    return refs, cands_per_model
+
+
+def main():
+    parser = argparse.ArgumentParser(description='BERTScore参考报告缓存基准测试')
+    parser.add_argument('--samples', type=int, default=200, help='任务中的样本数')
+    parser.add_argument('--models', type=int, default=5, help='共用参考报告的模型数')
+    parser.add_argument('--model-type', default='bert-base-multilingual-cased', help='模型名称或本地路径')
+    parser.add_argument('--num-layers', type=int, default=None, help='使用的层数（默认按 bert_score 的推荐值）')
+    parser.add_argument('--batch-size', type=int, default=8, help='bert_score.score 的批大小')
+    parser.add_argument('--max-tokens', type=int, default=None, help='按长度动态分批时每批的token预算（默认 BERTSCORE_MAX_TOKENS）')
+    parser.add_argument('--threads', type=int, default=None, help='torch CPU线程数')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        os.environ['BERTSCORE_CACHE_DIR'] = cache_dir
+        import bert_score
+        from bert_score.utils import get_model, get_tokenizer, model2layers
+        from bertscore_cache import cached_bertscore, BERTSCORE_MAX_TOKENS
+        if args.threads:
+            import torch
+            torch.set_num_threads(args.threads)
+
+        num_layers = args.num_layers or model2layers[args.model_type]
+        refs, cands_per_model = make_task(args.samples, args.models)
+        print(f"样本数: {args.samples}, 模型数: {args.models}, 模型: {args.model_type} (前{num_layers}层)")
+
+        start = time.perf_counter()
+        old = [bert_score.score(cands, refs, model_type=args.model_type, num_layers=num_layers,
+                                device='cpu', batch_size=args.batch_size)[2]
+               for cands in cands_per_model]
+        old_time = time.perf_counter() - start
+        print(f"bert_score.score: {old_time:.2f}s")
+
+        start = time.perf_counter()
+        tokenizer = get_tokenizer(args.model_type)
+        model = get_model(args.model_type, num_layers)
+        new = [cached_bertscore(cands, refs, model, tokenizer, 'cpu', f'bench_L{num_layers}',
+                                max_tokens=args.max_tokens or BERTSCORE_MAX_TOKENS)[2]
+               for cands in cands_per_model]
+        new_time = time.perf_counter() - start
+        print(f"常驻模型 + 按长度分批 + 缓存参考报告向量: {new_time:.2f}s")
+
+        diff = max((a - b).abs().max().item() for a, b in zip(old, new))
+        print(f"加速比: {old_time / max(new_time, 1e-9):.1f}x, F1最大差异: {diff:.2e}")
+
+
+if __name__ == "__main__":
+    main()
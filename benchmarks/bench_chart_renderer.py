@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""对比图表渲染基准：原工具包生成的绘图脚本逐个运行（generate_all_charts.sh 的方式）vs chart_renderer 在一个进程中绘制
+
+构造两个模型标准/深度推理两种模式下四类任务的合成结果，生成8张对比图表：
+原方式从git历史中取出引入 chart_renderer 之前的 model_comparison_toolkit.py（可用 --baseline-rev 指定版本），
+用其中的 generate_task_subplot_png_script 为每张图表生成绘图脚本，再逐个启动新的解释器运行；
+新方式在当前进程中加载一次字体、复用画布，可用 --workers 并行绘制。检查新方式输出的PNG与原脚本逐像素一致。
+最后从同一份排版输出 --scales 指定倍数的PNG和SVG，报告耗时和文件总大小。
+
+用法:
+    python3 benchmarks/bench_chart_renderer.py --tasks 23 --workers 4 --scales 1 2 3
+"""
+
+import os
+import io
+import sys
+import time
+import random
+import argparse
+import tempfile
+import subprocess
+import contextlib
+import importlib.util
+
+REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+TOOLKIT_DIR = os.path.join(REPO_DIR, 'Model_Comparison_Toolkit')
+sys.path.insert(0, TOOLKIT_DIR)
+from PIL import Image, ImageChops
+from chart_renderer import TASK_SOURCES, build_chart, render_charts, output_name
+
+TASK_METRICS = {
+    'classification': [('acc', 'Accuracy'), ('precision', 'Precision'), ('recall', 'Recall'), ('f1', 'F1-Score')],
+    'measurement': [('RMSE', 'Root Mean Square Error'), ('MAE', 'Mean Absolute Error'),
+                    ('%_within_tolerance', 'Percentage within Tolerance')],
+    'segmentation': [('acc', 'Accuracy')],
+    'report': [('Bleu-1', 'BLEU-1'), ('Bleu-2', 'BLEU-2'), ('Bleu-3', 'BLEU-3'), ('Bleu-4', 'BLEU-4'),
+               ('Rouge', 'Rouge'), ('BERTScore', 'BERTScore')],
+}
+
+
+def baseline_rev():
+    """默认的原版本：引入 chart_renderer.py 的提交的父提交"""
+    added = subprocess.run(['git', 'log', '--diff-filter=A', '--format=%H', '--',
+                            'Model_Comparison_Toolkit/chart_renderer.py'],
+                           cwd=REPO_DIR, capture_output=True, text=True, check=True).stdout.split()
+    return f"{added[-1]}^"
+
+
+def load_baseline_toolkit(rev, tmp_dir):
+    """从git历史中取出原版本的 model_comparison_toolkit.py 并导入"""
+    source = subprocess.run(['git', 'show', f'{rev}:Model_Comparison_Toolkit/model_comparison_toolkit.py'],
+                            cwd=REPO_DIR, capture_output=True, text=True, check=True).stdout
+    path = os.path.join(tmp_dir, 'baseline_toolkit.py')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(source)
+    spec = importlib.util.spec_from_file_location('baseline_toolkit', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_data(tasks, seed=0):
+    rng = random.Random(seed)
+    data = {}
+    for model in ('model1', 'model2'):
+        data[model] = {}
+        for task_type, metrics in TASK_METRICS.items():
+            source = TASK_SOURCES[task_type][0]
+            data[model][source] = [{'task_id': f'{t + 1:02d}', **{m: str(round(rng.random(), 4)) for m, _ in metrics}}
+                                   for t in range(tasks)]
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description='对比图表渲染基准测试')
+    parser.add_argument('--tasks', type=int, default=23, help='每类任务的数据集数（横轴标签数）')
+    parser.add_argument('--workers', type=int, default=4, help='并行绘制的进程数')
+    parser.add_argument('--scales', nargs='+', type=float, default=[1, 2, 3], help='输出的PNG倍数')
+    parser.add_argument('--baseline-rev', default=None,
+                        help='原工具包的git版本（默认为引入 chart_renderer.py 之前的提交）')
+    args = parser.parse_args()
+
+    datasets = [(mode_name, make_data(args.tasks, seed))
+                for mode_name, seed in (("Standard Mode", 0), ("Deep Reasoning Mode", 1))]
+    charts = [build_chart(data, task_type, metrics, mode_name, 'Model-A', 'Model-B')
+              for mode_name, data in datasets for task_type, metrics in TASK_METRICS.items()]
+    print(f"图表数: {len(charts)}, 每个子图 {args.tasks} 个任务")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        old_dir, new_dir, par_dir = (os.path.join(tmp_dir, d) for d in ('old', 'new', 'parallel'))
+        os.makedirs(old_dir)
+        rev = args.baseline_rev or baseline_rev()
+        baseline = load_baseline_toolkit(rev, tmp_dir)
+
+        # 原方式：为每张图表生成绘图脚本（同时写出分析报告），再逐个启动解释器在脚本目录中运行
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            scripts = [baseline.generate_task_subplot_png_script(data, task_type, metrics, mode_name, old_dir,
+                                                                 'Model-A', 'Model-B')
+                       for mode_name, data in datasets for task_type, metrics in TASK_METRICS.items()]
+        for script in scripts:
+            subprocess.run([sys.executable, os.path.basename(script)], cwd=old_dir,
+                           stdout=subprocess.DEVNULL, check=True)
+        old_time = time.perf_counter() - start
+        print(f"原工具包（{rev}）生成的绘图脚本逐个运行: {old_time * 1000:.0f}ms")
+
+        start = time.perf_counter()
+        render_charts(charts, new_dir, workers=1)
+        new_time = time.perf_counter() - start
+        print(f"同一进程中绘制: {new_time * 1000:.0f}ms")
+
+        start = time.perf_counter()
+        render_charts(charts, par_dir, workers=args.workers)
+        par_time = time.perf_counter() - start
+        print(f"同一进程 + {args.workers}进程并行: {par_time * 1000:.0f}ms")
+
+        same = all(ImageChops.difference(Image.open(os.path.join(old_dir, c['filename'])).convert('RGB'),
+                                         Image.open(os.path.join(d, c['filename'])).convert('RGB')).getbbox() is None
+                   for c in charts for d in (new_dir, par_dir))
+        print(f"加速比: {old_time / max(new_time, 1e-9):.1f}x（并行 {old_time / max(par_time, 1e-9):.1f}x）, 与原脚本的图表一致: {same}")
+
+        fmt_dir = os.path.join(tmp_dir, 'formats')
+        start = time.perf_counter()
+        render_charts(charts, fmt_dir, workers=1, formats=('png', 'svg'), scales=args.scales)
+        fmt_time = time.perf_counter() - start
+        sizes = {f'png {scale:g}x': sum(os.path.getsize(os.path.join(fmt_dir, output_name(c, 'png', scale))) for c in charts)
+                 for scale in args.scales}
+        sizes['svg'] = sum(os.path.getsize(os.path.join(fmt_dir, output_name(c, 'svg'))) for c in charts)
+        print(f"同一份排版输出PNG {', '.join(f'{s:g}x' for s in args.scales)} 和SVG: {fmt_time * 1000:.0f}ms")
+        print("文件总大小: " + ', '.join(f"{k} {v / 1e3:.0f}KB" for k, v in sizes.items()))
+
+
+if __name__ == "__main__":
+    main()
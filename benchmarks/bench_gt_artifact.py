@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""参考答案加载基准：读取原始TSV并逐行解析 vs 内存映射读取 build-gt 生成的参考答案文件
+
+构造带base64图像列的分割任务和测量任务TSV，分别按评估程序原来的方式（流式读取答案列，
+逐行 json 解析 keypoints / measurement 后计算位置类别、测量值）和读取参考答案文件的方式加载，
+对比耗时，并检查两种方式得到的位置类别和测量值完全一致。
+
+用法:
+    python3 benchmarks/bench_gt_artifact.py --rows 5000 --image-kb 20
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'new_results'))
+from gt_loader import (read_tsv_columns, build_gt_artifact, load_gt_artifact, clear_memory_cache,
+                       extract_coordinates, extract_measurement, _measurement_values)
+from scoring_core import bbox_locations
+
+MEASURE_RULE = {'measurement_key': 'fat value'}
+
+
+def make_tsvs(directory, rows, image_kb, seed=0):
+    rng = random.Random(seed)
+    image = 'A' * (image_kb * 1024)
+    keypoints = [str([{'lesion': [round(rng.random(), 4), round(rng.random(), 4)]}]) for _ in range(rows)]
+    measurements = [str({'fat value': round(rng.uniform(0, 85), 2)}) if rng.random() > 0.05 else 'invalid'
+                    for _ in range(rows)]
+    seg_tsv = os.path.join(directory, 'seg.tsv')
+    mea_tsv = os.path.join(directory, 'measure.tsv')
+    pd.DataFrame({'index': range(rows), 'image': image, 'keypoints': keypoints}).to_csv(seg_tsv, sep='\t', index=False)
+    pd.DataFrame({'index': range(rows), 'image': image, 'measurement': measurements}).to_csv(mea_tsv, sep='\t', index=False)
+    return seg_tsv, mea_tsv
+
+
+def parse_tsv(seg_tsv, mea_tsv):
+    df_seg, _ = read_tsv_columns(seg_tsv, ('keypoints',), verbose=False)
+    locations = bbox_locations(df_seg['keypoints'].apply(extract_coordinates))
+    df_mea, _ = read_tsv_columns(mea_tsv, ('measurement',), verbose=False)
+    values, skip, _ = _measurement_values(df_mea['measurement'].apply(extract_measurement, rule=MEASURE_RULE).tolist())
+    return locations, values, skip
+
+
+def load_artifacts(seg_artifact, mea_artifact):
+    clear_memory_cache()
+    seg = load_gt_artifact(seg_artifact, verbose=False)
+    mea = load_gt_artifact(mea_artifact, verbose=False)
+    return seg['seg_location'].to_numpy(dtype=object), mea['measurement_value'].to_numpy(), mea['measurement_skip'].to_numpy()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='参考答案文件加载基准测试')
+    parser.add_argument('--rows', type=int, default=5000, help='每个TSV的行数')
+    parser.add_argument('--image-kb', type=int, default=20, help='每行base64图像列的大小（KB）')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        seg_tsv, mea_tsv = make_tsvs(tmp_dir, args.rows, args.image_kb)
+        tsv_mb = (os.path.getsize(seg_tsv) + os.path.getsize(mea_tsv)) / 1e6
+        print(f"行数: {args.rows}, 两个TSV共 {tsv_mb:.1f}MB")
+
+        start = time.perf_counter()
+        old = parse_tsv(seg_tsv, mea_tsv)
+        old_time = time.perf_counter() - start
+        print(f"读取TSV并逐行解析: {old_time * 1000:.1f}ms")
+
+        seg_artifact = os.path.join(tmp_dir, 'seg_gt')
+        mea_artifact = os.path.join(tmp_dir, 'measure_gt')
+        start = time.perf_counter()
+        build_gt_artifact(seg_tsv, seg_artifact, 'seg', {})
+        build_gt_artifact(mea_tsv, mea_artifact, 'measure', MEASURE_RULE)
+        print(f"build-gt（只需运行一次）: {(time.perf_counter() - start) * 1000:.1f}ms")
+
+        start = time.perf_counter()
+        new = load_artifacts(seg_artifact, mea_artifact)
+        new_time = time.perf_counter() - start
+        print(f"内存映射读取参考答案文件: {new_time * 1000:.1f}ms")
+
+        same = (np.array_equal(old[0], new[0]) and np.array_equal(old[1], new[1], equal_nan=True)
+                and np.array_equal(old[2], new[2]))
+        print(f"加速比: {old_time / max(new_time, 1e-9):.0f}x, 结果一致: {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""模型结果JSONL读取基准：json.loads 整条记录 + pd.DataFrame vs jsonl_loader.read_jsonl_columns
+
+构造带base64图像question字段的合成结果文件，比较耗时和峰值内存（tracemalloc），
+并检查两种方式得到的 id/response/model 列完全一致。
+
+用法:
+    python3 benchmarks/bench_jsonl_loader.py --rows 20000 --image-kb 16
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'new_results'))
+from jsonl_loader import read_jsonl_columns, JSON_BACKEND
+
+
+def legacy_read(jsonl_path):
+    """原 read_jsonl_with_tsv 中的读取方式"""
+    with open(jsonl_path, 'r') as f:
+        jsonl_data = [json.loads(line) for line in f]
+    return pd.DataFrame(jsonl_data)
+
+
+def make_jsonl(path, rows, image_kb, seed=0):
+    rng = random.Random(seed)
+    image = 'A' * (image_kb * 1024)
+    with open(path, 'w') as f:
+        for idx in range(rows):
+            record = {
+                'index': idx,
+                'id': idx,
+                'question': [{'type': 'image', 'value': image},
+                             {'type': 'text', 'value': "options: 'fetal brain', 'fetal abdomen', 'other'"}],
+                'response': rng.choice(['fetal brain', 'fetal abdomen', 'other']),
+                'model': 'ModelA',
+            }
+            f.write(json.dumps(record) + '\n')
+
+
+def measure(func, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='模型结果JSONL读取基准测试')
+    parser.add_argument('--rows', type=int, default=20000, help='合成结果文件行数')
+    parser.add_argument('--image-kb', type=int, default=16, help='每行question中图像字段的大小(KB)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'results.jsonl')
+        make_jsonl(path, args.rows, args.image_kb)
+
+        old, old_time, old_peak = measure(legacy_read, path)
+        (new, _), new_time, new_peak = measure(read_jsonl_columns, path, ('id', 'response', 'model'), False)
+
+        same = all(old[c].tolist() == new[c].tolist() for c in ('id', 'response', 'model'))
+        print(f"行数: {args.rows}, 文件大小: {os.path.getsize(path) / 1e6:.1f}MB, 解析后端: {JSON_BACKEND}")
+        print(f"原读取方式: {old_time:.3f}s ({args.rows / old_time:.0f}行/秒), 峰值内存 {old_peak / 1e6:.1f}MB")
+        print(f"流式按列读取: {new_time:.3f}s ({args.rows / new_time:.0f}行/秒), 峰值内存 {new_peak / 1e6:.1f}MB")
+        print(f"加速比: {old_time / max(new_time, 1e-9):.1f}x, 结果一致: {same}")
+
+
+if __name__ == "__main__":
+    main()
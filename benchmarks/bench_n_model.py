@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""N模型对比基准：逐对运行两模型对比 vs results_table 一次加载、一次计算所有模型对
+
+构造 --models 个模型的合成结果文件（四类任务），原方式对每一对模型分别用 load_results_txt 读取两个模型的
+结果文件并生成两模型分析报告（N个模型需要 N(N-1)/2 次）；新方式每个结果文件只读一次，
+用 pairwise_comparison 一次算出所有模型对的差异并生成一份报告。检查两种方式的平均值变化百分比一致。
+
+用法:
+    python3 benchmarks/bench_n_model.py --models 10 --tasks 30
+"""
+
+import os
+import io
+import sys
+import time
+import random
+import argparse
+import tempfile
+import itertools
+import contextlib
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Model_Comparison_Toolkit'))
+from model_comparison_toolkit import TASK_METRICS, load_results_txt, create_task_analysis_report
+from chart_renderer import TASK_SOURCES
+from results_table import load_results_table, pairwise_comparison, create_n_model_report
+
+
+def make_results(directory, models, tasks, seed=0):
+    rng = random.Random(seed)
+    model_dirs = {}
+    for m in range(models):
+        model_dir = os.path.join(directory, f'model{m}')
+        os.makedirs(model_dir)
+        for task_type, metrics in TASK_METRICS.items():
+            with open(os.path.join(model_dir, f"{TASK_SOURCES[task_type][0]}_results.txt"), 'w') as f:
+                f.write('\t'.join(['task_id', 'model'] + [metric for metric, _ in metrics]) + '\n')
+                for t in range(tasks):
+                    f.write('\t'.join([f'{t + 1:02d}', f'model{m}'] +
+                                      [f'{rng.uniform(0.01, 1):.4f}' for _ in metrics]) + '\n')
+        model_dirs[f'model{m}'] = model_dir
+    return model_dirs
+
+
+def pairwise_runs(model_dirs):
+    """原方式：每一对模型各读一次结果文件并生成报告，返回 {(i, j, 任务类型): 报告}"""
+    names = list(model_dirs)
+    reports = {}
+    for i, j in itertools.combinations(range(len(names)), 2):
+        for task_type, metrics in TASK_METRICS.items():
+            source = TASK_SOURCES[task_type][0]
+            v1 = load_results_txt(os.path.join(model_dirs[names[i]], f"{source}_results.txt"))
+            v2 = load_results_txt(os.path.join(model_dirs[names[j]], f"{source}_results.txt"))
+            reports[(i, j, task_type)] = create_task_analysis_report(v1, v2, task_type, metrics, 'Standard Mode',
+                                                                     names[i], names[j])
+    return reports
+
+
+def n_model_run(model_dirs):
+    """新方式：每个结果文件只读一次，所有模型对一次计算，返回 {任务类型: (结果表, 对比结果)}"""
+    results = {}
+    sections = []
+    for task_type, metrics in TASK_METRICS.items():
+        table = load_results_table(model_dirs, TASK_SOURCES[task_type][0], metrics)
+        comparison = pairwise_comparison(table)
+        sections.append(create_n_model_report(table, comparison, task_type, 'Standard Mode'))
+        results[task_type] = (table, comparison)
+    return results, ''.join(sections)
+
+
+def summary_change_pcts(report):
+    """从两模型报告的 Performance Summary 表中取出各指标的 Change %"""
+    summary = report.split('### Task-by-Task')[0]
+    return [float(line.split('|')[5].strip().rstrip('%')) for line in summary.splitlines()
+            if line.startswith('| ') and not line.startswith('| Metric') and line.strip().endswith('% |')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='N模型对比基准测试')
+    parser.add_argument('--models', type=int, default=10, help='模型数')
+    parser.add_argument('--tasks', type=int, default=30, help='每类任务的数据集数')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model_dirs = make_results(tmp_dir, args.models, args.tasks)
+        pairs = args.models * (args.models - 1) // 2
+        print(f"模型数: {args.models}, 模型对: {pairs}, 每类任务 {args.tasks} 个数据集")
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            old = pairwise_runs(model_dirs)
+            old_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            new, report = n_model_run(model_dirs)
+            new_time = time.perf_counter() - start
+
+        print(f"逐对运行两模型对比（读取 {pairs * 2 * len(TASK_METRICS)} 个文件）: {old_time * 1000:.1f}ms")
+        print(f"一次加载 + 向量化计算所有模型对（读取 {args.models * len(TASK_METRICS)} 个文件）: {new_time * 1000:.1f}ms，"
+              f"报告 {len(report) / 1e3:.0f}KB")
+
+        same = all(np.allclose(summary_change_pcts(old[(i, j, task_type)]),
+                               np.round(new[task_type][1]['change_pct'][i, j], 2), atol=0.011)
+                   for (i, j, task_type) in old)
+        print(f"加速比: {old_time / max(new_time, 1e-9):.1f}x, 平均值变化百分比一致: {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""选项匹配基准：原逐个 re.search 实现 vs 预编译的 OptionMatcher
+
+构造覆盖各类匹配分支的合成回复语料（默认100万条），对比两种实现的吞吐量，
+并逐条检查提取的预测值完全一致。原实现较慢，默认只在前 --check-rows 条上运行。
+
+用法:
+    python3 benchmarks/bench_option_matcher.py --rows 1000000 --check-rows 200000
+"""
+
+import os
+import re
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+from extract_model_responses_final import normalize_text, extract_prediction_from_response
+
+OPTION_SETS = [
+    ['fetal brain', 'fetal abdomen', 'maternal cervix', 'fetal femur', 'fetal thorax', 'other'],
+    ['upper left', 'upper center', 'upper right', 'middle left', 'center', 'middle right',
+     'lower left', 'lower center', 'lower right', 'not visible'],
+    ['2', '3', '4A', '4B', '4C', '5'],
+    ['benign', 'malignant', 'normal'],
+    ['yes', 'no'],
+    ['optimal', 'suboptimal'],
+    ['Left', 'Right', 'left ventricle', 'right atrium'],
+]
+
+TEMPLATES = [
+    '{opt}',
+    '{OPT}',
+    "'{opt}'",
+    ' {opt}. ',
+    'The answer is {opt}.',
+    'This image is consistent with {opt}',
+    'The ultrasound shows a {opt} region.',
+    'It appears to be the {opt}',
+    'Classified as "{opt}" based on the findings',
+    'I think {first} but not sure',
+    '{First} is visible here',
+    'Maybe {opt}\n\nor {other}',
+    'the cervix looks maternal',
+    'fetal structures are seen',
+    'Brain and thorax are both visible',
+    'no clear answer',
+    'Based on the image, the lesion is located at the {opt} of the scan.',
+    '',
+]
+
+
+def legacy_extract_prediction(response, options):
+    """原 extract_prediction_from_response：每条回复重新构造并逐个执行正则"""
+    if not response or not options:
+        return ""
+        
+    # 标准化回复文本
+    response_normalized = normalize_text(response)
+    
+    # 标准化选项文本
+    normalized_options = [normalize_text(opt) for opt in options]
+    
+    # 1. 首先尝试直接匹配原始回复（不区分大小写）
+    for i, opt in enumerate(options):
+        if opt.lower() == response.lower().strip():
+            return opt
+   
+    
+    # 3. 检查多词选项的匹配
+    multi_word_options = [(opt, norm) for opt, norm in zip(options, normalized_options) if ' ' in norm]
+    if multi_word_options:
+        for opt, opt_norm in multi_word_options:
+            # 使用正则表达式匹配完整的短语（考虑词边界）
+            pattern = r'\b' + re.escape(opt_norm) + r'\b'
+            if re.search(pattern, response_normalized):
+                return opt
+            
+            # 检查引号中的选项
+            quote_pattern = r"['\"]" + re.escape(opt_norm) + r"['\"]"  
+            if re.search(quote_pattern, response_normalized):
+                return opt
+            
+            # 检查常见的上下文模式
+            context_patterns = [
+                r"is (?:a |an |the |)(?:typical for |indicative of |suggestive of |consistent with |compatible with |showing |demonstrates |revealing |)['\"]?" + re.escape(opt_norm) + r"['\"]?",
+                r"(?:appears to be|identified as|classified as|recognized as|interpreted as|diagnosed as|confirmed as|representing|shows|demonstrates) (?:a |an |the |)['\"]?" + re.escape(opt_norm) + r"['\"]?",
+                r"(?:the |)(?:image|ultrasound|scan|examination|visualization|assessment|analysis|interpretation|finding|result|picture|sonogram|sonographic features) (?:is |shows |demonstrates |reveals |indicates |suggests |points to |confirms |indicate |)(?:a |an |the |)['\"]?" + re.escape(opt_norm) + r"['\"]?"
+            ]
+            
+            for pattern in context_patterns:
+                if re.search(pattern, response_normalized):
+                    return opt
+    
+    # 4. 检查单词选项的匹配（只有在没有多词选项匹配的情况下）
+    single_word_options = [(opt, norm) for opt, norm in zip(options, normalized_options) if ' ' not in norm]
+    for opt, opt_norm in single_word_options:
+        pattern = r'\b' + re.escape(opt_norm) + r'\b'
+        if re.search(pattern, response_normalized):
+            # 检查这个单词选项是否是多词选项的一部分
+            is_part_of_multi_word = False
+            for _, multi_opt_norm in multi_word_options:
+                if opt_norm in multi_opt_norm.split():
+                    # 检查回复中是否包含完整的多词选项
+                    if any(re.search(r'\b' + re.escape(m_norm) + r'\b', response_normalized) for _, m_norm in multi_word_options):
+                        is_part_of_multi_word = True
+                        break
+            
+            if not is_part_of_multi_word:
+                return opt
+    
+    # 5. 如果以上都没有匹配到，尝试部分匹配
+    for i, opt_norm in enumerate(normalized_options):
+        if opt_norm in response_normalized:
+            return options[i]
+
+    
+    # 6. 特殊处理：检查首字母大写的情况
+    response_words = response.split()
+    for word in response_words:
+        word_lower = word.lower().strip(".,;:!?'\"")
+        for i, opt in enumerate(options):
+            if word_lower == opt.lower():
+                return opt
+            # 检查多词选项的第一个词
+            opt_parts = opt.lower().split()
+            if opt_parts and word_lower == opt_parts[0]:
+                # 检查是否后续词也匹配
+                if len(response_words) > response_words.index(word) + len(opt_parts) - 1:
+                    match = True
+                    for j, part in enumerate(opt_parts[1:], 1):
+                        next_word = response_words[response_words.index(word) + j].lower().strip(".,;:!?'\"")
+                        if next_word != part:
+                            match = False
+                            break
+                    if match:
+                        return opt
+    
+    # 7. 特殊处理：maternal cervix 和其他常见选项
+    common_mappings = {
+        'maternal': 'maternal cervix',
+        'cervix': 'maternal cervix',
+        'maternal cervical': 'maternal cervix',
+        'fetal': 'fetal brain',  # 默认映射，如果没有更具体的匹配
+        'abdomen': 'fetal abdomen',
+        'femur': 'fetal femur',
+        'thorax': 'fetal thorax',
+        'brain': 'fetal brain'
+    }
+    
+    for key, value in common_mappings.items():
+        if key in response_normalized and value in options:
+            # 检查是否有更具体的匹配
+            more_specific = False
+            for opt in options:
+                if key in opt.lower() and opt.lower() != value.lower() and opt.lower() in response_normalized:
+                    more_specific = True
+                    break
+            if not more_specific:
+                return value
+    
+    return ""
+
+
+def make_corpus(rows, seed=0):
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(rows):
+        options = rng.choice(OPTION_SETS)
+        opt = rng.choice(options)
+        other = rng.choice(options)
+        first = opt.split()[0]
+        response = rng.choice(TEMPLATES).format(
+            opt=opt, OPT=opt.upper(), other=other, first=first, First=first.capitalize())
+        corpus.append((response, options))
+    return corpus
+
+
+def run(func, corpus):
+    start = time.perf_counter()
+    predictions = [func(response, options) for response, options in corpus]
+    return predictions, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='选项匹配基准测试')
+    parser.add_argument('--rows', type=int, default=1000000, help='合成回复条数')
+    parser.add_argument('--check-rows', type=int, default=200000, help='运行原实现并逐条比对的条数')
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.rows)
+    check = corpus[:args.check_rows]
+
+    legacy, legacy_time = run(legacy_extract_prediction, check)
+    compiled, _ = run(extract_prediction_from_response, check)
+    mismatches = sum(1 for a, b in zip(legacy, compiled) if a != b)
+
+    _, new_time = run(extract_prediction_from_response, corpus)
+
+    print(f"回复条数: {args.rows}, 比对条数: {len(check)}")
+    print(f"原实现: {len(check) / max(legacy_time, 1e-9):.0f}条/秒")
+    print(f"OptionMatcher: {args.rows / max(new_time, 1e-9):.0f}条/秒, 总耗时 {new_time:.2f}s")
+    print(f"加速比: {(legacy_time / max(len(check), 1)) / (new_time / max(args.rows, 1)):.1f}x")
+    print(f"预测值不一致的条数: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
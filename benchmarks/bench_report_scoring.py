@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""报告评分基准：pycocoevalcap Bleu(4)/Rouge() vs report_scoring 中缓存参考报告的实现
+
+构造一个任务的合成参考报告和多个模型的生成报告，按 MedicalReportScorer 的方式逐模型评分，
+对比总耗时，并检查每个模型的 BLEU-1~4、ROUGE-L 及逐样本分数与 pycocoevalcap 完全一致。
+未安装 pycocoevalcap 时只运行缓存实现。
+
+用法:
+    python3 benchmarks/bench_report_scoring.py --samples 2000 --models 10
+"""
+
+import os
+import io
+import sys
+import time
+import random
+import argparse
+import contextlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'new_results'))
+from report_scoring import CachedBleu, CachedRouge, clear_reference_cache, reference_cache_stats
+
+try:
+    from pycocoevalcap.bleu.bleu import Bleu
+    from pycocoevalcap.rouge.rouge import Rouge
+except ImportError:
+    Bleu = Rouge = None
+
+VOCAB = ('the liver is normal in size and echotexture no focal lesion seen gallbladder wall thickened '
+         'thyroid nodule hypoechoic margin irregular calcification left right lobe cm mm measuring '
+         'consolidation pleural line b-lines lung sliding absent present mild moderate severe').split()
+
+
+def make_report(rng, length):
+    return ' '.join(rng.choice(VOCAB) for _ in range(length))
+
+
+def make_task(samples, models, seed=0):
+    rng = random.Random(seed)
+    refs = {str(i): [make_report(rng, rng.randint(20, 120))] for i in range(samples)}
+    hyps_per_model = []
+    for _ in range(models):
+        hyps = {}
+        for key, (ref,) in refs.items():
+            words = ref.split()
+            # 生成报告：参考报告的一部分加上随机词，与真实模型输出的重叠程度相近
+            kept = [w for w in words if rng.random() < 0.6]
+            hyps[key] = [' '.join(kept + [rng.choice(VOCAB) for _ in range(rng.randint(0, 30))])]
+        hyps_per_model.append(hyps)
+    return refs, hyps_per_model
+
+
+def score_all(bleu_cls, rouge_cls, refs, hyps_per_model):
+    outputs = []
+    start = time.perf_counter()
+    for hyps in hyps_per_model:
+        with contextlib.redirect_stdout(io.StringIO()):
+            bleu, bleu_list = bleu_cls(4).compute_score(refs, hyps)
+        rouge, rouge_list = rouge_cls().compute_score(refs, hyps)
+        outputs.append((bleu, bleu_list, rouge, list(rouge_list)))
+    return outputs, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='报告评分基准测试')
+    parser.add_argument('--samples', type=int, default=2000, help='任务中的样本数')
+    parser.add_argument('--models', type=int, default=10, help='共用参考报告的模型数')
+    args = parser.parse_args()
+
+    refs, hyps_per_model = make_task(args.samples, args.models)
+    print(f"样本数: {args.samples}, 模型数: {args.models}")
+
+    clear_reference_cache()
+    new, new_time = score_all(CachedBleu, CachedRouge, refs, hyps_per_model)
+    print(f"缓存参考报告: {new_time:.2f}s, 缓存统计 {reference_cache_stats()}")
+
+    if Bleu is None:
+        print("未安装 pycocoevalcap，跳过对比")
+        return
+
+    old, old_time = score_all(Bleu, Rouge, refs, hyps_per_model)
+    print(f"pycocoevalcap: {old_time:.2f}s")
+    print(f"加速比: {old_time / max(new_time, 1e-9):.1f}x, 结果一致: {old == new}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""评分核心基准：原 iterrows 逐行评分 vs scoring_core 按列评分
+
+分别对分类(model_eval)、分割(new_seg_eval)、测量(meaeval)构造合成结果文件，
+检查两种实现的指标完全一致并输出耗时。
+
+用法:
+    python3 benchmarks/bench_scoring_core.py --rows 100000
+"""
+
+import io
+import os
+import sys
+import math
+import time
+import random
+import argparse
+import contextlib
+import warnings
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'new_results'))
+from scoring_core import classification_pairs, segmentation_pairs, measurement_pairs
+from seg_eval import get_bounding_box_location_v1
+
+LOCATIONS = ['upper left', 'upper center', 'upper right', 'middle left', 'center',
+             'middle right', 'lower left', 'lower center', 'lower right', 'not visible']
+
+
+def legacy_classification_pairs(data, model_name):
+    """原 cla_eval.model_eval 的逐行清洗逻辑"""
+    failed_items = 0
+    y_true, y_pred = [], []
+    for _, row in data.iterrows():
+        if 'model' in data.columns and len(data['model']) > 0:
+            current_model = data['model'][0]
+        else:
+            current_model = model_name
+        if current_model == 'LLaVA-1.5-13B-HF':
+            pred = row['response'].replace(' ', '', 1)
+        else:
+            pred = row['response']
+        pred = pred.strip().strip("'\"")
+        if isinstance(row['cla_ans'], str):
+            true_ans = row['cla_ans']
+            if '[' in true_ans:
+                true_ans = true_ans.replace('[', '').replace(']', '')
+            y_true.append(true_ans.lower().strip().strip("'\""))
+            y_pred.append(pred.lower())
+        elif isinstance(row['cla_ans'], int):
+            try:
+                pred = int(pred)
+            except:
+                failed_items += 1
+                continue
+            y_true.append(row['cla_ans'])
+            y_pred.append(pred)
+        else:
+            y_true.append(row['cla_ans'])
+            y_pred.append(pred)
+    return y_true, y_pred, failed_items
+
+
+def legacy_segmentation_acc(data, model_name):
+    """原 seg_eval.new_seg_eval 的逐行逻辑"""
+    gt_list, pred_list = [], []
+    failed_items = 0
+    for _, row in data.iterrows():
+        gt = get_bounding_box_location_v1(row['seg_ans'])
+        if 'model' in data.columns and len(data['model']) > 0:
+            current_model = data['model'][0]
+        else:
+            current_model = model_name
+        if current_model == 'LLaVA-1.5-13B-HF':
+            raw_pred = row['response'].replace(' ', '', 1).lower()
+        else:
+            raw_pred = row.get('response').lower()
+        if pd.isna(raw_pred) or raw_pred == 'failed':
+            failed_items += 1
+            continue
+        gt_list.append(gt)
+        pred_list.append(raw_pred)
+    total_samples = len(data) - failed_items
+    return sum(g == p for g, p in zip(gt_list, pred_list)) / total_samples
+
+
+def legacy_measurement_pairs(data, model_name):
+    """原 measure_eval.meaeval 的逐行逻辑（去掉逐行打印）"""
+    y_true, y_pred = [], []
+    failed_items = 0
+    for _, row in data.iterrows():
+        gt = row['measurement_ans'][0] if isinstance(row['measurement_ans'], list) else row['measurement_ans']
+        if gt == 'nan':
+            continue
+        if 'model' in data.columns and len(data['model']) > 0:
+            current_model = data['model'][0]
+        else:
+            current_model = model_name
+        if current_model == 'LLaVA-1.5-13B-HF':
+            pred = row['response'].replace(' ', '', 1)
+        else:
+            pred = row['response']
+        try:
+            pred = float(pred)
+        except:
+            failed_items += 1
+            continue
+        y_true.append(float(gt))
+        y_pred.append(pred)
+    return np.array(y_true), np.array(y_pred), failed_items
+
+
+def classification_metrics(y_true, y_pred, failed_items, rows):
+    from sklearn.metrics import precision_score, recall_score, f1_score
+    total_samples = rows - failed_items
+    return {
+        'parser_rate': total_samples / rows,
+        'acc': sum(np.array(y_true) == np.array(y_pred)) / total_samples,
+        'precision': precision_score(y_true, y_pred, average='macro'),
+        'recall': recall_score(y_true, y_pred, average='macro'),
+        'f1': f1_score(y_true, y_pred, average='macro'),
+    }
+
+
+def measurement_metrics(y_true, y_pred, failed_items):
+    errors = y_true - y_pred
+    return {
+        'MAE': np.mean(np.abs(errors)),
+        'RMSE': np.sqrt(np.mean(errors ** 2)),
+        'Std': np.std(errors),
+        '%_within_tolerance': np.mean(np.abs(errors) <= 0.1) * 100,
+        'failed_items': failed_items,
+    }
+
+
+def make_frames(rows, model, seed=0):
+    rng = random.Random(seed)
+    labels = ['fetal brain', 'fetal abdomen', 'maternal cervix', 'other']
+    str_cla = pd.DataFrame({
+        'response': [rng.choice([' Fetal Brain', "'other'", 'fetal abdomen ', 'maternal cervix']) for _ in range(rows)],
+        'cla_ans': [rng.choice(labels + ["['Other']"]) for _ in range(rows)],
+        'model': model,
+    })
+    int_cla = pd.DataFrame({
+        'response': [rng.choice(['0', '1', ' 2', 'two', '3.0']) for _ in range(rows)],
+        'cla_ans': [rng.randint(0, 3) for _ in range(rows)],
+        'model': model,
+    })
+    seg = pd.DataFrame({
+        'response': [rng.choice(LOCATIONS + ['Upper Left', 'failed']) for _ in range(rows)],
+        'seg_ans': [[rng.random(), rng.random(), 0.1, 0.1] if rng.random() < 0.9 else 'nan' for _ in range(rows)],
+        'model': model,
+    })
+    mea = pd.DataFrame({
+        'response': [rng.choice([str(rng.randint(0, 85)), ' 12.5', 'abc', 'null']) for _ in range(rows)],
+        'measurement_ans': [rng.randint(0, 85) if rng.random() < 0.95 else 'nan' for _ in range(rows)],
+        'model': model,
+    })
+    return str_cla, int_cla, seg, mea
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def same_metrics(a, b):
+    for key in a:
+        x, y = a[key], b[key]
+        if isinstance(x, float) and math.isnan(x) and math.isnan(y):
+            continue
+        if x != y:
+            return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='评分核心基准测试')
+    parser.add_argument('--rows', type=int, default=100000, help='每个合成结果文件的行数')
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore')
+
+    for model in ['SomeModel', 'LLaVA-1.5-13B-HF']:
+        str_cla, int_cla, seg, mea = make_frames(args.rows, model)
+        print(f"\n模型: {model}, 行数: {args.rows}")
+
+        for name, frame in [('分类(字符串答案)', str_cla), ('分类(整数答案)', int_cla)]:
+            old, old_time = timed(legacy_classification_pairs, frame, model)
+            new, new_time = timed(classification_pairs, frame)
+            same = same_metrics(classification_metrics(*old, len(frame)), classification_metrics(*new, len(frame)))
+            print(f"  {name}: 逐行 {old_time:.3f}s, 按列 {new_time:.3f}s, "
+                  f"加速 {old_time / max(new_time, 1e-9):.1f}x, 指标一致: {same}")
+
+        old_acc, old_time = timed(legacy_segmentation_acc, seg, model)
+        (gt, pred, failed), new_time = timed(segmentation_pairs, seg)
+        new_acc = int(np.sum(gt == pred)) / (len(seg) - failed)
+        print(f"  分割: 逐行 {old_time:.3f}s, 按列 {new_time:.3f}s, "
+              f"加速 {old_time / max(new_time, 1e-9):.1f}x, 指标一致: {old_acc == new_acc}")
+
+        old, old_time = timed(legacy_measurement_pairs, mea, model)
+        new, new_time = timed(measurement_pairs, mea)
+        same = same_metrics(measurement_metrics(*old), measurement_metrics(*new))
+        print(f"  测量: 逐行 {old_time:.3f}s, 按列 {new_time:.3f}s, "
+              f"加速 {old_time / max(new_time, 1e-9):.1f}x, 指标一致: {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""对比数据归档基准：每次对比用 shutil.copy2 复制结果文件 vs snapshot_store 内容寻址快照
+
+构造两个模型标准/深度推理两种模式下四类任务的合成结果文件，模拟 --runs 次对比运行（结果文件不变）：
+原方式每次把全部结果文件复制到新的 data/ 目录；新方式每个文件内容只存入快照库一次，之后以写时复制克隆
+（不支持时复制）或硬链接（--snapshot-hardlink）放入 data/，源文件和库中对象未变时不重新计算哈希。
+比较两种放置方式的耗时和实际占用的磁盘空间（按 inode 去重统计；克隆共享的数据块无法统计，按复制计），
+并检查快照内容与源文件一致。
+
+用法:
+    python3 benchmarks/bench_snapshot_store.py --runs 20 --tasks 2000
+"""
+
+import os
+import io
+import sys
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import contextlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Model_Comparison_Toolkit'))
+from model_comparison_toolkit import TASK_METRICS, RESULT_TASKS
+from chart_renderer import TASK_SOURCES
+from snapshot_store import snapshot_files, verify_manifest
+
+
+def make_results(directory, tasks, seed=0):
+    rng = random.Random(seed)
+    data_sources = []
+    for label in ('model1_standard', 'model2_standard', 'model1_deep', 'model2_deep'):
+        source_dir = os.path.join(directory, label)
+        os.makedirs(source_dir)
+        for task_type, metrics in TASK_METRICS.items():
+            with open(os.path.join(source_dir, f"{TASK_SOURCES[task_type][0]}_results.txt"), 'w') as f:
+                f.write('\t'.join(['task_id', 'model'] + [metric for metric, _ in metrics]) + '\n')
+                for t in range(tasks):
+                    f.write('\t'.join([f'{t + 1:04d}', label] + [f'{rng.uniform(0.01, 1):.4f}' for _ in metrics]) + '\n')
+        data_sources.append((source_dir, label))
+    return data_sources
+
+
+def copy_run(data_sources, data_dir, file_names):
+    """原方式：逐个 shutil.copy2"""
+    for source_dir, label in data_sources:
+        target_subdir = os.path.join(data_dir, label)
+        os.makedirs(target_subdir, exist_ok=True)
+        for file_name in file_names:
+            shutil.copy2(os.path.join(source_dir, file_name), os.path.join(target_subdir, file_name))
+
+
+def disk_usage(*directories):
+    """目录中文件实际占用的字节数，同一 inode 的硬链接只计一次"""
+    seen = set()
+    total = 0
+    for directory in directories:
+        for root, _, files in os.walk(directory):
+            for name in files:
+                st = os.stat(os.path.join(root, name))
+                if (st.st_dev, st.st_ino) not in seen:
+                    seen.add((st.st_dev, st.st_ino))
+                    total += st.st_size
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description='对比数据归档基准测试')
+    parser.add_argument('--runs', type=int, default=20, help='对比运行次数')
+    parser.add_argument('--tasks', type=int, default=2000, help='每个结果文件的任务行数')
+    args = parser.parse_args()
+
+    file_names = [f"{task}_results.txt" for task in RESULT_TASKS]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_sources = make_results(os.path.join(tmp_dir, 'results'), args.tasks)
+        source_size = disk_usage(os.path.join(tmp_dir, 'results'))
+        print(f"结果文件: {len(data_sources) * len(file_names)} 个，共 {source_size / 1e6:.2f}MB，运行 {args.runs} 次")
+
+        copy_root = os.path.join(tmp_dir, 'copy')
+        start = time.perf_counter()
+        for run in range(args.runs):
+            copy_run(data_sources, os.path.join(copy_root, f'run{run}', 'data'), file_names)
+        copy_time = time.perf_counter() - start
+
+        print(f"shutil.copy2: {copy_time * 1000:.0f}ms, 占用 {disk_usage(copy_root) / 1e6:.2f}MB")
+
+        for mode, hardlink in (('snapshot', False), ('hardlink', True)):
+            snap_root = os.path.join(tmp_dir, mode)
+            store_dir = os.path.join(tmp_dir, f'{mode}_store')
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                for run in range(args.runs):
+                    manifest = snapshot_files(data_sources, os.path.join(snap_root, f'run{run}', 'data'), file_names,
+                                              store_dir, hardlink=hardlink)
+                snap_time = time.perf_counter() - start
+                ok = all(not verify_manifest(os.path.join(snap_root, f'run{run}', 'data')) for run in range(args.runs))
+
+            method = manifest['files'][0]['method'] if manifest['files'] else '-'
+            usage = disk_usage(snap_root, store_dir)
+            print(f"内容寻址快照（{method}，含哈希和清单）: {snap_time * 1000:.0f}ms ({copy_time / snap_time:.2f}x), "
+                  f"占用 {usage / 1e6:.2f}MB, 磁盘占用减少 {disk_usage(copy_root) / max(usage, 1):.1f}x, 快照校验通过: {ok}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""评估程序启动耗时基准：在新的解释器中用 python -X importtime 导入各评估程序
+
+对每个评估模块报告导入总耗时、是否加载了 torch/transformers/sklearn 等重量级依赖、
+以及自身耗时最多的几个导入，超过 --budget 秒的模块标记为超时。
+分类、分割、测量评估程序不应加载任何重量级依赖；报告评估程序在第一次计算BERTScore时才导入 torch。
+
+用法:
+    python3 benchmarks/bench_startup.py
+    python3 benchmarks/bench_startup.py --modules cla_eval report_eval --top 10
+"""
+
+import os
+import sys
+import argparse
+import subprocess
+
+NEW_RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'new_results')
+
+EVAL_MODULES = [
+    'cla_eval', 'qwen_cla_eval',
+    'seg_eval', 'qwen_seg_eval',
+    'measure_eval', 'qwen_measure_eval',
+    'report_eval', 'qwen_report_eval',
+    'fused_eval',
+]
+
+HEAVY_MODULES = ('torch', 'transformers', 'bert_score', 'sklearn', 'pingouin', 'pycocoevalcap')
+
+
+def import_profile(module):
+    """在子进程中导入模块，返回 (总耗时秒, 已加载的重量级依赖, [(自身耗时秒, 模块名)])"""
+    code = (f"import sys, {module}; "
+            f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                          cwd=NEW_RESULTS_DIR, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+
+    total = 0.0
+    entries = []
+    for line in proc.stderr.splitlines():
+        # 格式: "import time: self [us] | cumulative | imported package"
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        entries.append((int(self_us) / 1e6, name.strip()))
+        if name.strip() == module:
+            total = int(cumulative_us) / 1e6
+    heavy = [m for m in proc.stdout.strip().split(',') if m]
+    entries.sort(reverse=True)
+    return total, heavy, entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description='评估程序启动耗时基准测试')
+    parser.add_argument('--modules', nargs='*', default=EVAL_MODULES, help='要测试的评估模块')
+    parser.add_argument('--budget', type=float, default=1.0, help='导入耗时上限（秒）')
+    parser.add_argument('--top', type=int, default=3, help='显示自身耗时最多的几个导入')
+    args = parser.parse_args()
+
+    over_budget = []
+    for module in args.modules:
+        try:
+            total, heavy, entries = import_profile(module)
+        except RuntimeError as e:
+            print(f"{module}: 导入失败 ({e})")
+            over_budget.append(module)
+            continue
+        status = '超时' if total > args.budget else 'OK'
+        if total > args.budget:
+            over_budget.append(module)
+        slowest = ', '.join(f"{name} {sec * 1000:.0f}ms" for sec, name in entries[:args.top])
+        print(f"{module:<20} {total:6.2f}s  {status:<4} 重量级依赖: {heavy or '无'}  最慢: {slowest}")
+
+    print(f"共 {len(args.modules)} 个模块，超过 {args.budget:.1f}s 或导入失败: {over_budget or '无'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""图表文字排版基准：每次 draw.textbbox 测量 + draw.text 绘制 vs text_layout 的宽度缓存和文字蒙版缓存
+
+模拟一个对比图表看板：若干子图，每个子图有标题、纵轴刻度和 --labels 个任务ID标签，另有需要按像素宽度换行的
+长标题。原方式每次换行都用 draw.textbbox 重新测量逐渐变长的整行，每段文字都调用 draw.text 栅格化；
+新方式用 text_layout.wrap_text（按单词累计宽度）和 draw_text（相同文字只栅格化一次）。检查两种方式的换行结果和
+画出的图像逐像素一致。
+
+用法:
+    python3 benchmarks/bench_text_layout.py --subplots 6 --labels 23 --repeat 8
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Model_Comparison_Toolkit'))
+from PIL import Image, ImageDraw, ImageChops
+from text_layout import get_font, text_width, wrap_text, draw_text, clear_cache
+
+TITLE_FONT = ("DejaVuSans-Bold.ttf", 24)
+LABEL_FONT = ("DejaVuSans.ttf", 9)
+TEXT_COLOR = (51, 51, 51)
+WORDS = 'comparison of classification measurement segmentation report generation performance across tasks'.split()
+
+
+def make_titles(count, seed=0):
+    rng = random.Random(seed)
+    return [' '.join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))) for _ in range(count)]
+
+
+def wrap_textbbox(draw, text, font, max_width):
+    """原方式：每加一个单词就用 textbbox 重新测量整行"""
+    lines = []
+    current = []
+    for word in text.split():
+        bbox = draw.textbbox((0, 0), ' '.join(current + [word]), font=font)
+        if current and bbox[2] - bbox[0] > max_width:
+            lines.append(' '.join(current))
+            current = [word]
+        else:
+            current.append(word)
+    if current:
+        lines.append(' '.join(current))
+    return lines
+
+
+def layout(subplots, labels):
+    """看板中每段文字的 (x, y, 文字)：纵轴刻度和任务标签，按子图重复"""
+    items = []
+    for s in range(subplots):
+        x0, y0 = 60 + (s % 3) * 660, 160 + (s // 3) * 460
+        items += [(x0 + 10, y0 + 300 - i * 60 - 6, f"{i * 0.2:.2f}") for i in range(6)]
+        items += [(x0 + 60 + (i + 0.5) * (520 // labels) - 4, y0 + 345, f"{i + 1:02d}") for i in range(labels)]
+    return items
+
+
+def render(titles, items, fast):
+    img = Image.new('RGB', (2040, 1200), (255, 255, 255))
+    draw = ImageDraw.Draw(img)
+    title_font, label_font = get_font(*TITLE_FONT), get_font(*LABEL_FONT)
+    wrapped = []
+    for k, title in enumerate(titles):
+        lines = wrap_text(title, 900, TITLE_FONT) if fast else wrap_textbbox(draw, title, title_font, 900)
+        wrapped.append(lines)
+        for i, line in enumerate(lines[:2]):
+            if fast:
+                draw_text(draw, (40 + (k % 2) * 1000, 10 + i * 30), line, TITLE_FONT, TEXT_COLOR)
+            else:
+                draw.text((40 + (k % 2) * 1000, 10 + i * 30), line, fill=TEXT_COLOR, font=title_font)
+    for x, y, text in items:
+        if fast:
+            draw_text(draw, (x, y), text, LABEL_FONT, TEXT_COLOR)
+        else:
+            draw.text((x, y), text, fill=TEXT_COLOR, font=label_font)
+    return img, wrapped
+
+
+def main():
+    parser = argparse.ArgumentParser(description='图表文字排版基准测试')
+    parser.add_argument('--subplots', type=int, default=6, help='每张图表的子图数')
+    parser.add_argument('--labels', type=int, default=23, help='每个子图的任务标签数')
+    parser.add_argument('--titles', type=int, default=4, help='每张图表需要换行的长标题数')
+    parser.add_argument('--repeat', type=int, default=8, help='绘制的图表数')
+    args = parser.parse_args()
+
+    titles = make_titles(args.titles)
+    items = layout(args.subplots, args.labels)
+    print(f"图表数: {args.repeat}, 每张 {len(items)} 段标签文字 + {args.titles} 个长标题")
+
+    clear_cache()
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        old_img, old_wrapped = render(titles, items, fast=False)
+    old_time = time.perf_counter() - start
+    print(f"textbbox测量 + draw.text: {old_time * 1000:.1f}ms")
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        new_img, new_wrapped = render(titles, items, fast=True)
+    new_time = time.perf_counter() - start
+    print(f"text_layout 缓存宽度和文字蒙版: {new_time * 1000:.1f}ms")
+
+    same_wrap = old_wrapped == new_wrapped
+    same_img = ImageChops.difference(old_img, new_img).getbbox() is None
+    print(f"加速比: {old_time / max(new_time, 1e-9):.1f}x, 换行一致: {same_wrap}, 图像一致: {same_img}")
+    print(f"宽度缓存: {text_width.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import os
+import hashlib
+from collections import defaultdict
+import numpy as np
+import torch
+from torch.nn.utils.rnn import pad_sequence
+from bert_score.utils import sent_encode, padding, bert_encode, greedy_cos_idf
+
+# BERTScore 拆成参考报告侧和生成报告侧：参考报告的逐token向量和权重编码一次后按文本哈希存到磁盘，
+# 同一任务的其他模型直接内存映射读取，只有生成报告需要经过编码器。
+# 分词、编码和贪心匹配直接调用 bert_score 的 sent_encode / bert_encode / greedy_cos_idf，与 bert_score.score 的结果一致
+# （参考报告与生成报告分开按长度分批编码，padding不同带来的差异在浮点误差范围内）。
+
+# 参考报告向量缓存目录，可通过环境变量 BERTSCORE_CACHE_DIR 覆盖
+BERTSCORE_CACHE_DIR = os.environ.get(
+    'BERTSCORE_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.bertscore_cache')
+)
+
+# 编码时的动态批大小：按token数排序后切批，每批 句子数 × 批内最长token数 不超过该值
+BERTSCORE_MAX_TOKENS = 8192
+
+
+def idf_weights(tokenizer):
+    """与 bert_score.score(idf=False) 相同的token权重：[CLS]/[SEP] 为0，其余为1"""
+    idf_dict = defaultdict(lambda: 1.0)
+    idf_dict[tokenizer.sep_token_id] = 0
+    idf_dict[tokenizer.cls_token_id] = 0
+    return idf_dict
+
+
+def _cache_file(model_tag, text):
+    key = hashlib.sha1(text.encode('utf-8')).hexdigest()
+    return os.path.join(BERTSCORE_CACHE_DIR, model_tag.replace('/', '_'), key[:2], f'{key}.npy')
+
+
+def load_reference_stats(model_tag, text):
+    """读取缓存的参考报告 (逐token向量, 权重)，未缓存时返回None
+
+    文件按只读+写时复制方式内存映射，返回的张量与文件共享内存，后续计算不会改动缓存文件。
+    """
+    path = _cache_file(model_tag, text)
+    if not os.path.exists(path):
+        return None
+    try:
+        stats = np.load(path, mmap_mode='c')
+    except Exception as e:
+        print(f"警告：读取BERTScore缓存失败 {path}，重新编码，错误: {e}")
+        return None
+    stats = torch.from_numpy(stats)
+    return stats[:, :-1], stats[:, -1]
+
+
+def save_reference_stats(model_tag, text, emb, idf):
+    """把参考报告的 (逐token向量, 权重) 拼成一个 float32 数组原子写入缓存"""
+    path = _cache_file(model_tag, text)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        stats = torch.cat([emb.float(), idf.float().unsqueeze(-1)], dim=-1).numpy()
+        tmp_file = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_file, 'wb') as f:
+            np.save(f, stats)
+        os.replace(tmp_file, path)
+    except Exception as e:
+        print(f"警告：写入BERTScore缓存失败 {path}，错误: {e}")
+
+
+def length_buckets(lengths, max_tokens=BERTSCORE_MAX_TOKENS):
+    """按长度从长到短切批，返回下标列表；每批 句子数 × 最长长度 不超过 max_tokens，超长的单句单独成批"""
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True)
+    batches = []
+    batch = []
+    for i in order:
+        # 从长到短排列，批内第一句即最长的一句
+        if batch and (len(batch) + 1) * lengths[batch[0]] > max_tokens:
+            batches.append(batch)
+            batch = []
+        batch.append(i)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def encode_texts(texts, model, tokenizer, idf_dict, device, max_tokens=BERTSCORE_MAX_TOKENS):
+    """编码文本，返回 {文本: (逐token向量, 权重)}
+
+    先对去重后的全部文本分词，再按token数分批，长度相近的句子放在同一批，padding最少；
+    短句较多时一批可以放更多句子，取代原来固定的 batch_size。
+    """
+    sentences = list(dict.fromkeys(texts))
+    token_ids = [sent_encode(tokenizer, sen) for sen in sentences]
+    stats = {}
+    with torch.inference_mode():
+        for batch in length_buckets([len(ids) for ids in token_ids], max_tokens):
+            padded, _, mask = padding([token_ids[i] for i in batch], tokenizer.pad_token_id, dtype=torch.long)
+            embs = bert_encode(model, padded.to(device), attention_mask=mask.to(device)).cpu()
+            for row, i in enumerate(batch):
+                ids = token_ids[i]
+                idf = torch.tensor([idf_dict[t] for t in ids], dtype=torch.float)
+                stats[sentences[i]] = (embs[row, :len(ids)], idf)
+    return stats
+
+
+def reference_stats(refs, model, tokenizer, idf_dict, device, model_tag, max_tokens=BERTSCORE_MAX_TOKENS):
+    """参考报告的 {文本: (逐token向量, 权重)}：优先读缓存，只编码缓存中没有的并写回缓存"""
+    stats = {}
+    missing = []
+    for text in set(refs):
+        cached = load_reference_stats(model_tag, text)
+        if cached is None:
+            missing.append(text)
+        else:
+            stats[text] = cached
+
+    if missing:
+        encoded = encode_texts(missing, model, tokenizer, idf_dict, device, max_tokens)
+        for text, (emb, idf) in encoded.items():
+            save_reference_stats(model_tag, text, emb, idf)
+        stats.update(encoded)
+    print(f"BERTScore参考报告: {len(stats)} 条，缓存命中 {len(stats) - len(missing)} 条，新编码 {len(missing)} 条")
+    return stats
+
+
+def _pad_batch_stats(sen_batch, stats, device):
+    emb, idf = zip(*[stats[s] for s in sen_batch])
+    emb = [e.to(device) for e in emb]
+    idf = [i.to(device) for i in idf]
+    lens = torch.tensor([e.size(0) for e in emb], dtype=torch.long)
+    emb_pad = pad_sequence(emb, batch_first=True, padding_value=2.0)
+    idf_pad = pad_sequence(idf, batch_first=True)
+    pad_mask = torch.arange(int(lens.max()), dtype=torch.long).expand(len(lens), -1) < lens.unsqueeze(1)
+    return emb_pad, pad_mask.to(device), idf_pad
+
+
+def cached_bertscore(cands, refs, model, tokenizer, device, model_tag, batch_size=64, max_tokens=BERTSCORE_MAX_TOKENS):
+    """逐对计算 (P, R, F)，与 bert_score.score(cands, refs) 相同，参考报告的编码经由磁盘缓存复用
+
+    max_tokens 控制编码的动态批大小，batch_size 为贪心匹配时每批的句对数。
+    """
+    idf_dict = idf_weights(tokenizer)
+    ref_stats = reference_stats(refs, model, tokenizer, idf_dict, device, model_tag, max_tokens)
+    hyp_stats = encode_texts(cands, model, tokenizer, idf_dict, device, max_tokens)
+
+    preds = []
+    with torch.inference_mode():
+        for start in range(0, len(refs), batch_size):
+            ref_batch = _pad_batch_stats(refs[start:start + batch_size], ref_stats, device)
+            hyp_batch = _pad_batch_stats(cands[start:start + batch_size], hyp_stats, device)
+            P, R, F = greedy_cos_idf(*ref_batch, *hyp_batch)
+            preds.append(torch.stack((P, R, F), dim=-1).cpu())
+    preds = torch.cat(preds, dim=0)
+    return preds[..., 0], preds[..., 1], preds[..., 2]
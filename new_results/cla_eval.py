@@ -1,82 +1,60 @@
 import os
 import json
+import argparse
 import pandas as pd
 import numpy as np
-from sklearn.metrics import precision_score, recall_score, f1_score
 from datetime import datetime
+from dataset_manifest import tsv_paths, dataset_rule
+from gt_loader import load_ground_truth, merge_ground_truth, extract_anatomy_labels
+from jsonl_loader import RESPONSE_FIELDS, read_jsonl_columns
+from scoring_core import classification_pairs
+from result_store import run_pairs_incremental
 
 # 5月26日更新 - 修复anatomy任务评分为0的问题
-TSV_PATH = {
-        '03': '/media/ps/data-ssd/json_processing/ale_tsv_output/classification_tsv_output/3_FETAL_Planes_US.tsv',
-        '37': '/media/ps/data-ssd/json_processing/ale_tsv_output/37.tsv',
-        '50': '/media/ps/data-ssd/json_processing/ale_tsv_output/classification_tsv_output/50.ACOUSLIC_AI_Key_Frame_Classification_is_optimal_or_suboptimal.tsv',
-        '53': '/media/ps/data-ssd/json_processing/ale_tsv_output/53.tsv',
-        '69': '/media/ps/data-ssd/json_processing/ale_tsv_output/classification_tsv_output/69.tsv',
-        '10': '/media/ps/data-ssd/json_processing/ale_tsv_output/classification_tsv_output/10_FetusOrientation.tsv',
-        '18': '/media/ps/data-ssd/json_processing/ale_tsv_output/classification_tsv_output/18_1.Ultrasound_Heart_Segmentation_Dataset_view.tsv',
-        '21': '/media/ps/data-ssd/json_processing/ale_tsv_output/21.Breast_Ultrasound_Segmentation_Dataset.tsv',
-        '23': '/media/ps/data-ssd/json_processing/ale_tsv_output/23.tsv',
-        '25': '/media/ps/data-ssd/json_processing/ale_tsv_output/25.Dermatologic_Ultrasound_Classification_Dataset.tsv',
-        '28': '/media/ps/data-ssd/json_processing/ale_tsv_output/classification_tsv_output/28_1.Knee_Grading_Ultrasound_Classification_Dataset_Kellgren-Lawrence (KL) Grade.tsv',
-        '32': '/media/ps/data-ssd/json_processing/ale_tsv_output/32_image.tsv',
-        '40': '/media/ps/data-ssd/json_processing/ale_tsv_output/classification_tsv_output/40_birads.tsv',
-        '42': '/media/ps/data-ssd/json_processing/ale_tsv_output/42.tsv',
-        '44': '/media/ps/data-ssd/json_processing/ale_tsv_output/44.COVID-BLUES-frames.tsv',
-        '57': '/media/ps/data-ssd/json_processing/ale_tsv_output/57_1.Liver_Ultrasound_Segmentation_Dataset.tsv',
-        '66': '/media/ps/data-ssd/json_processing/ale_tsv_output/66.tsv',
-        '70': '/media/ps/data-ssd/json_processing/ale_tsv_output/70.tsv',
-        '75': '/media/ps/data-ssd/json_processing/ale_tsv_output/75.PCOS_Ultrasound_Classification_Dataset.tsv',
-        '74is_normal': '/media/ps/data-ssd/json_processing/ale_tsv_output/classification_tsv_output/74_is_normal.tsv',
-        '74is_visible': '/media/ps/data-ssd/json_processing/ale_tsv_output/classification_tsv_output/74_is_visible.tsv',
-        'anatomy': '/media/ps/data-ssd/json_processing/ale_tsv_output/classification_tsv_output/anatomy.tsv',
-        '28_class': '/media/ps/data-ssd/json_processing/ale_tsv_output/28.Knee_Classification.tsv'
-    }
+# TSV路径由数据集清单 datasets.json 生成（有精简参考答案文件时使用精简文件）
+TSV_PATH = tsv_paths('cla')
+
+# 分类任务只需要TSV中的答案列
+CLA_GT_COLUMNS = ('id', 'class', 'classes')
+
+# 模型结果中用到的字段；按ID合并时读取结果中的class字段
+CLA_JSONL_FIELDS = RESPONSE_FIELDS + ('class',)
+
+# 评估程序版本，评分逻辑变化时递增，使结果库中的旧结果全部失效
+EVAL_VERSION = 1
+
 
+def read_jsonl_with_tsv(jsonl_path, tsv_path, task_id=None, df_jsonl=None):
+    """读取JSONL文件并合并对应TSV文件的class值，增强对anatomy任务的处理
 
-def read_jsonl_with_tsv(jsonl_path, tsv_path, task_id=None):
-    """读取JSONL文件并合并对应TSV文件的class值，增强对anatomy任务的处理"""
+    df_jsonl 不为空时直接使用已读入的模型结果（如 fused_eval 边读边清洗得到的结果），不再读取jsonl_path。
+    """
     # 读取JSONL
-    jsonl_data = []
-    with open(jsonl_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            jsonl_data.append(json.loads(line.strip()))
-    df_jsonl = pd.DataFrame(jsonl_data)
+    if df_jsonl is None:
+        df_jsonl, _ = read_jsonl_columns(jsonl_path, CLA_JSONL_FIELDS)
 
-    # 读取TSV
-    df_tsv = pd.read_csv(tsv_path, sep='\t')
+    # 读取TSV（只保留答案列，同一任务的所有模型共用缓存）
+    df_tsv = load_ground_truth(tsv_path, CLA_GT_COLUMNS)
+
+    # 参考答案文件中标签已预先提取（anatomy任务为小写的Anatomy值）；anatomy任务总是按行号对应，
+    # 其余任务两边都有id时按下面的规则取结果中的class列（参考答案文件中原样保存了class/classes列）
+    is_anatomy = dataset_rule('cla', task_id).get('parse') == 'anatomy'
+    has_ids = 'id' in df_jsonl.columns and 'id' in df_tsv.columns
+    if 'cla_label' in df_tsv.columns and (is_anatomy or not has_ids):
+        return merge_ground_truth(df_jsonl, df_tsv, {'cla_label': 'cla_ans'})
     
     # 针对anatomy任务的特殊处理
-    if task_id == 'anatomy':
+    if is_anatomy:
         try:
-            # 尝试从classes字段中提取Anatomy值
-            classes_data = []
-            for _, row in df_tsv.iterrows():
-                if 'classes' in df_tsv.columns:
-                    classes_value = row['classes']
-                    if isinstance(classes_value, str):
-                        # 尝试解析JSON字符串
-                        try:
-                            classes_dict = json.loads(classes_value.replace("'", '"'))
-                            if isinstance(classes_dict, dict) and 'Anatomy' in classes_dict:
-                                classes_data.append(classes_dict['Anatomy'].lower())
-                            else:
-                                classes_data.append(classes_value.lower())
-                        except json.JSONDecodeError:
-                            # 如果解析失败，尝试使用正则表达式提取
-                            import re
-                            match = re.search(r'"Anatomy":\s*"([^"]+)"', classes_value)
-                            if match:
-                                classes_data.append(match.group(1).lower())
-                            else:
-                                classes_data.append(classes_value.lower())
-                    else:
-                        classes_data.append(str(classes_value).lower())
-                else:
-                    classes_data.append('')
+            # 从classes字段中批量提取Anatomy值
+            if 'classes' in df_tsv.columns:
+                classes_data, parse_status = extract_anatomy_labels(df_tsv['classes'])
+            else:
+                classes_data, parse_status = [''] * len(df_tsv), {}
             
             # 将提取的Anatomy值赋给df_jsonl
             df_jsonl['cla_ans'] = classes_data
-            print(f"成功处理anatomy任务，提取了{len(classes_data)}个解剖结构名称")
+            print(f"成功处理anatomy任务，提取了{len(classes_data)}个解剖结构名称，解析方式统计: {parse_status}")
             
         except Exception as e:
             print(f"处理anatomy任务时出错: {e}")
@@ -102,56 +80,8 @@ def read_jsonl_with_tsv(jsonl_path, tsv_path, task_id=None):
 
 def model_eval(data, jsonl_path=None):
     """更新后的评估函数，增强对不同格式回复的处理能力"""
-    failed_items = 0
-    y_true = []
-    y_pred = []
-    
-    # 从文件路径中提取模型名称
-    model_name = os.path.basename(os.path.dirname(jsonl_path)) if jsonl_path else None
-
-    for i, row in data.iterrows():
-        # 检查是否有 'model' 字段，如果没有，使用从路径中提取的模型名称
-        if 'model' in data.columns and len(data['model']) > 0:
-            current_model = data['model'][0]
-        else:
-            current_model = model_name
-        
-        # 处理预测结果，去除换行符和首尾空格
-        if current_model == 'LLaVA-1.5-13B-HF':
-            pred = row['response'].replace(' ', '', 1)
-        else:
-            pred = row['response']
-        
-        # 清理预测结果：去除换行符、首尾空格和引号
-        pred = pred.strip().strip("'\"")
-        
-        if isinstance(row['cla_ans'], str):
-            # 清理参考答案
-            true_ans = row['cla_ans']
-            if '[' in true_ans:
-                true_ans = true_ans.replace('[','').replace(']','')
-            
-            # 统一转为小写并去除首尾空格和引号
-            true_ans = true_ans.lower().strip().strip("'\"")
-            pred_ans = pred.lower()
-            
-            # 打印调试信息
-            # print(f"真实答案: '{true_ans}', 预测答案: '{pred_ans}'")
-            
-            y_true.append(true_ans)  
-            y_pred.append(pred_ans)
-        elif isinstance(row['cla_ans'], int):
-            try:
-                # 尝试将预测结果转为整数
-                pred = int(pred)
-            except:
-                failed_items += 1
-                continue
-            y_true.append(row['cla_ans']) 
-            y_pred.append(pred)
-        else:
-            y_true.append(row['cla_ans'])  
-            y_pred.append(pred)
+    # 按列完成回复清洗、LLaVA特殊处理和失败样本剔除
+    y_true, y_pred, failed_items = classification_pairs(data, jsonl_path=jsonl_path)
 
     # 计算指标
     total_samples = len(data) - failed_items
@@ -171,6 +101,8 @@ def model_eval(data, jsonl_path=None):
         print(f"前5个真实答案: {y_true[:5]}")
         print(f"前5个预测答案: {y_pred[:5]}")
     
+    # sklearn 导入较慢，只在真正计算宏平均指标时才导入
+    from sklearn.metrics import precision_score, recall_score, f1_score
     return {
         'parser_rate': total_samples / len(data),
         'acc': sum(np.array(y_true) == np.array(y_pred)) / total_samples,
@@ -206,16 +138,16 @@ def find_model_files(base_dir, task_id):
     
     return model_files
 
-def batch_evaluate_all_tasks():
+def batch_evaluate_all_tasks(workers=1, rescore=False):
     """批量处理所有任务的主函数"""
     base_dir = '/media/ps/data-ssd/benchmark/VLMEvalKit/outputs/dolphin-output/cla'
     output_file = f'cla_results_{datetime.now().strftime("%Y%m%d_%H%M")}.txt'
     
-    all_results = []
+    all_pairs = []
 
     # 遍历所有预定义的任务
     for task_id in TSV_PATH.keys():
-        print(f"正在评估任务 {task_id}...")
+        print(f"正在收集任务 {task_id}...")
         # 自动发现该任务下的所有模型文件
         task_pairs = find_model_files(base_dir, task_id)
         
@@ -223,51 +155,55 @@ def batch_evaluate_all_tasks():
             print(f"警告：任务 {task_id} 未找到任何模型结果文件")
             continue
         
-        # 执行评估
-        task_results = evaluate_task(task_pairs, task_id)
-        all_results.extend(task_results)
+        all_pairs.extend((task_id, jsonl_path, tsv_path) for jsonl_path, tsv_path in task_pairs)
+    
+    # 所有 (任务, 模型) 互相独立，统一调度执行；结果库中未过期的结果直接复用
+    all_results = run_pairs_incremental('cla', all_pairs, evaluate_pair, EVAL_VERSION,
+                                        workers=workers, prepare=_prepare_ground_truth, rescore=rescore,
+                                        kind='cla')
+    all_results = [res for res in all_results if res is not None]
     
     # 写入统一结果文件
     write_combined_results(all_results, output_file)
     print(f"评估完成，结果已保存到 {output_file}")
 
-def evaluate_task(file_pairs, task_id):
-    """评估单个任务下的所有模型"""
-    task_results = []
+def _prepare_ground_truth(tsv_path):
+    """启动进程池前在主进程中预先加载参考答案"""
+    load_ground_truth(tsv_path, CLA_GT_COLUMNS)
+
+def evaluate_pair(task_id, jsonl_path, tsv_path, df_jsonl=None):
+    """评估单个模型结果文件"""
+    # 从文件路径解析模型名称
+    model_name = jsonl_path.split('/')[-2]  # 根据实际路径结构调整索引
+    print(f"正在评估模型 {model_name}...")
     
-    for jsonl_path, tsv_path in file_pairs:
-        try:
-            # 从文件路径解析模型名称
-            model_name = jsonl_path.split('/')[-2]  # 根据实际路径结构调整索引
-            print(f"正在评估模型 {model_name}...")
-            
-            # 传递task_id参数，以便对anatomy任务进行特殊处理
-            data = read_jsonl_with_tsv(jsonl_path, tsv_path, task_id=task_id)
+    # 传递task_id参数，以便对anatomy任务进行特殊处理
+    data = read_jsonl_with_tsv(jsonl_path, tsv_path, task_id=task_id, df_jsonl=df_jsonl)
 
-            metrics = model_eval(data, jsonl_path=jsonl_path)
-            
-            # 记录附加信息
-            metrics.update({
-                'task_id': task_id,
-                'model': model_name,
-                'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            })
-            task_results.append(metrics)
-            
-            # 打印评估结果
-            print(f"模型 {model_name} 评估结果:")
-            print(f"  准确率: {metrics['acc']:.4f}")
-            print(f"  精确率: {metrics['precision']:.4f}")
-            print(f"  召回率: {metrics['recall']:.4f}")
-            print(f"  F1分数: {metrics['f1']:.4f}")
-            
-        except Exception as e:
-            print(f"处理文件失败：{jsonl_path}")
-            print(f"错误信息：{str(e)}")
-            import traceback
-            traceback.print_exc()
+    metrics = model_eval(data, jsonl_path=jsonl_path)
     
-    return task_results
+    # 记录附加信息
+    metrics.update({
+        'task_id': task_id,
+        'model': model_name,
+        'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    })
+    
+    # 打印评估结果
+    print(f"模型 {model_name} 评估结果:")
+    print(f"  准确率: {metrics['acc']:.4f}")
+    print(f"  精确率: {metrics['precision']:.4f}")
+    print(f"  召回率: {metrics['recall']:.4f}")
+    print(f"  F1分数: {metrics['f1']:.4f}")
+    return metrics
+
+def evaluate_task(file_pairs, task_id, workers=1, rescore=False):
+    """评估单个任务下的所有模型"""
+    pairs = [(task_id, jsonl_path, tsv_path) for jsonl_path, tsv_path in file_pairs]
+    task_results = run_pairs_incremental('cla', pairs, evaluate_pair, EVAL_VERSION,
+                                         workers=workers, prepare=_prepare_ground_truth, rescore=rescore,
+                                         kind='cla')
+    return [res for res in task_results if res is not None]
 
 def write_combined_results(results, output_file):
     """写入整合后的结果"""
@@ -294,7 +230,7 @@ def write_combined_results(results, output_file):
             ]) + "\n"
             f.write(line)
 
-def evaluate_single_task(task_id):
+def evaluate_single_task(task_id, workers=1, rescore=False):
     """评估单个指定的任务"""
     base_dir = '/media/ps/data-ssd/benchmark/VLMEvalKit/outputs/dolphin-output/cla'
     output_file = f'cla_{task_id}_results_{datetime.now().strftime("%Y%m%d_%H%M")}.txt'
@@ -313,15 +249,22 @@ def evaluate_single_task(task_id):
         return
     
     # 执行评估
-    task_results = evaluate_task(task_pairs, task_id)
+    task_results = evaluate_task(task_pairs, task_id, workers=workers, rescore=rescore)
     
     # 写入结果文件
     write_combined_results(task_results, output_file)
     print(f"评估完成，结果已保存到 {output_file}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='分类任务批量评估')
+    parser.add_argument('--all', action='store_true', help='评估所有任务（默认只评估 --task 指定的任务）')
+    parser.add_argument('--task', default='anatomy', help='单独评估的任务ID')
+    parser.add_argument('--workers', type=int, default=1, help='并行评估的进程数')
+    parser.add_argument('--rescore', action='store_true', help='忽略结果库，重新评估所有结果文件')
+    args = parser.parse_args()
+
     # 可以选择评估所有任务或单个任务
-    # batch_evaluate_all_tasks()
-    
-    # 或者只评估anatomy任务
-    evaluate_single_task('anatomy')
+    if args.all:
+        batch_evaluate_all_tasks(workers=args.workers, rescore=args.rescore)
+    else:
+        evaluate_single_task(args.task, workers=args.workers, rescore=args.rescore)
@@ -0,0 +1,146 @@
+import os
+import json
+import argparse
+from gt_loader import GT_ARTIFACT_VERSION, build_gt_artifact, gt_artifact_meta, tsv_fingerprint
+
+# 数据集清单：各任务类型下每个数据集的TSV路径、答案列、解析规则和参考答案文件，
+# 评估程序和案例提取脚本的 TSV_PATH 都由清单生成，新增或迁移数据集只需修改 datasets.json。
+#
+# 清单格式（datasets.json）:
+#   tsv_root:     相对TSV路径的根目录
+#   artifact_dir: 参考答案文件（build-gt 生成）的目录（相对清单所在目录）
+#   kinds.<任务类型>:  answer_column / source_columns / parse 等为该类型的默认值
+#   kinds.<任务类型>.datasets.<任务ID>:
+#       tsv:        TSV路径（相对 tsv_root 或绝对路径）
+#       artifact:   参考答案文件路径（可选，默认 <artifact_dir>/<任务类型>/<任务ID>）
+#       evaluate:   false 表示评估程序默认跳过（如单独测评的任务），案例提取等仍可使用
+#       其余字段覆盖任务类型的默认值，如测量任务的 measurement_key / first_item
+
+# 清单路径，可通过环境变量 DATASET_MANIFEST 覆盖
+DATASET_MANIFEST = os.environ.get(
+    'DATASET_MANIFEST',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'datasets.json')
+)
+
+# 已读取的清单：同一进程内只读一次
+_MANIFESTS = {}
+
+
+def load_manifest(path=None):
+    """读取数据集清单"""
+    path = os.path.abspath(path or DATASET_MANIFEST)
+    if path not in _MANIFESTS:
+        with open(path, 'r', encoding='utf-8') as f:
+            _MANIFESTS[path] = json.load(f)
+    return _MANIFESTS[path]
+
+
+def _resolve(root, path):
+    return path if os.path.isabs(path) else os.path.join(root, path)
+
+
+def dataset_entries(kind, include_disabled=False, manifest_path=None):
+    """某任务类型下的数据集，返回 {任务ID: 合并了类型默认值、路径已解析为绝对路径的条目}"""
+    manifest_path = os.path.abspath(manifest_path or DATASET_MANIFEST)
+    manifest = load_manifest(manifest_path)
+    manifest_dir = os.path.dirname(manifest_path)
+    artifact_dir = _resolve(manifest_dir, manifest.get('artifact_dir', '.gt_artifacts'))
+    kind_spec = manifest['kinds'][kind]
+    defaults = {k: v for k, v in kind_spec.items() if k != 'datasets'}
+
+    entries = {}
+    for task_id, spec in kind_spec['datasets'].items():
+        entry = {**defaults, **spec}
+        if not include_disabled and not entry.get('evaluate', True):
+            continue
+        entry['tsv'] = _resolve(manifest.get('tsv_root', ''), entry['tsv'])
+        entry['artifact'] = _resolve(manifest_dir, entry.get('artifact') or
+                                     os.path.join(artifact_dir, kind, task_id))
+        entries[task_id] = entry
+    return entries
+
+
+def dataset_rule(kind, task_id, manifest_path=None):
+    """任务的解析规则；清单中没有该任务时返回任务类型的默认规则"""
+    manifest = load_manifest(manifest_path)
+    kind_spec = manifest['kinds'][kind]
+    defaults = {k: v for k, v in kind_spec.items() if k != 'datasets'}
+    return {**defaults, **kind_spec['datasets'].get(task_id, {})}
+
+
+def parse_rule(entry):
+    """条目中决定参考答案解析方式的字段（不含路径），写入参考答案文件，变化后需要重新生成"""
+    return {k: v for k, v in entry.items() if k not in ('tsv', 'artifact', 'evaluate')}
+
+
+def artifact_usable(entry):
+    """参考答案文件存在、格式版本和解析规则与清单一致，且原始TSV不在本机或与生成时相同（修改时间、大小一致）"""
+    meta = gt_artifact_meta(entry['artifact'])
+    if meta is None or meta.get('version') != GT_ARTIFACT_VERSION or meta.get('rule') != parse_rule(entry):
+        return False
+    if not os.path.exists(entry['tsv']):
+        return True
+    _, mtime_ns, size = tsv_fingerprint(entry['tsv'])
+    return meta.get('mtime_ns') == mtime_ns and meta.get('size') == size
+
+
+def tsv_paths(kind, include_disabled=False, manifest_path=None, use_artifacts=True):
+    """评估程序使用的 {任务ID: 参考答案路径}：有可用的参考答案文件时用它，否则用原始TSV
+
+    use_artifacts=False 时总是返回原始TSV（需要TSV原始列的脚本，如案例提取）。
+    """
+    return {task_id: entry['artifact'] if use_artifacts and artifact_usable(entry) else entry['tsv']
+            for task_id, entry in dataset_entries(kind, include_disabled, manifest_path).items()}
+
+
+def build_gt(kinds=None, tasks=None, force=False, manifest_path=None):
+    """解析清单中各数据集的TSV，生成参考答案文件；已是最新的和原始TSV不在本机的数据集跳过"""
+    kinds = kinds or list(load_manifest(manifest_path)['kinds'])
+    for kind in kinds:
+        for task_id, entry in dataset_entries(kind, True, manifest_path).items():
+            if tasks and task_id not in tasks:
+                continue
+            if not os.path.exists(entry['tsv']):
+                print(f"{kind}/{task_id}: 原始TSV不存在，跳过 {entry['tsv']}")
+                continue
+            if not force and artifact_usable(entry):
+                print(f"{kind}/{task_id}: 参考答案文件已是最新")
+                continue
+            try:
+                meta = build_gt_artifact(entry['tsv'], entry['artifact'], kind, parse_rule(entry))
+            except Exception as e:
+                print(f"{kind}/{task_id}: 生成参考答案文件失败，错误: {e}")
+                continue
+            size = sum(os.path.getsize(os.path.join(entry['artifact'], f)) for f in os.listdir(entry['artifact']))
+            print(f"{kind}/{task_id}: 已生成 {entry['artifact']} ({meta['rows']}行, {size / 1e3:.1f}KB，"
+                  f"原始TSV {meta['size'] / 1e6:.1f}MB)")
+
+
+def list_datasets(kinds=None, manifest_path=None):
+    """列出清单中的数据集及评估时实际使用的参考答案文件"""
+    kinds = kinds or list(load_manifest(manifest_path)['kinds'])
+    for kind in kinds:
+        for task_id, entry in dataset_entries(kind, True, manifest_path).items():
+            if artifact_usable(entry):
+                status, path = '参考答案文件', entry['artifact']
+            elif os.path.exists(entry['tsv']):
+                status, path = '原始TSV', entry['tsv']
+            else:
+                status, path = '缺失', entry['tsv']
+            skip = '' if entry.get('evaluate', True) else '（默认不评估）'
+            print(f"{kind:<8} {task_id:<14} {entry.get('parse', ''):<20} {status:<6} {path}{skip}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='数据集清单：列出数据集、生成参考答案文件')
+    parser.add_argument('command', choices=['list', 'build-gt'], help='list: 列出数据集；build-gt: 解析TSV生成参考答案文件')
+    parser.add_argument('--manifest', default=None, help='清单路径（默认 DATASET_MANIFEST）')
+    parser.add_argument('--kinds', nargs='*', default=None, help='只处理这些任务类型（默认全部）')
+    parser.add_argument('--tasks', nargs='*', default=None, help='只处理这些任务ID（默认全部）')
+    parser.add_argument('--force', action='store_true', help='build-gt 时忽略已有文件，全部重新生成')
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        list_datasets(args.kinds, args.manifest)
+    else:
+        build_gt(args.kinds, args.tasks, args.force, args.manifest)
@@ -0,0 +1,264 @@
+import os
+import json
+import argparse
+import importlib
+from datetime import datetime
+from gt_loader import load_ground_truth
+from parallel_eval import run_pairs
+from result_store import plan_incremental, commit_incremental
+
+# 统一的评估入口：按注册表找到各任务类型的评估程序，在一个进程（一个进程池）中评估任意任务和模型的组合，
+# 参考答案的解析缓存、BERTScore模型和进程池在不同任务类型之间共用，不再每个脚本各跑一遍。
+
+TASK_KINDS = ('cla', 'seg', 'measure', 'report')
+
+# 评估程序注册表：任务类型 -> 评估程序，每一项定义完整的评估流程
+#   module:     提供读取和评分函数的评估模块（同时也是可单独运行的脚本）
+#   store:      结果库名称，与单独运行该脚本时一致，两种方式共用缓存结果
+#   gt_columns: 模块中参考答案列名常量的名称，启动进程池前按这些列预先加载参考答案
+#   loader:     读取模型结果并合并参考答案的函数名，loader(jsonl_path, tsv_path[, task_id=...])
+#   scorer:     计算指标的函数名，scorer(data, jsonl_path=...[, task_id=...])，返回含 'error' 的字典时跳过该结果
+#   task_arg:   需要以 task_id 关键字传入任务ID的函数（'loader'、'scorer'）
+#   skip_tasks: 不评估的任务ID
+#   columns:    结果文件的列 (列名, 数值格式)，格式为 None 时原样写出
+#   base_dir:   默认的模型结果目录（<任务ID>/<模型>/*.jsonl）
+EVALUATORS = {
+    'cla': {
+        'module': 'cla_eval', 'store': 'cla', 'gt_columns': 'CLA_GT_COLUMNS',
+        'loader': 'read_jsonl_with_tsv', 'scorer': 'model_eval', 'task_arg': ('loader',),
+        'skip_tasks': (),
+        'columns': [('task_id', None), ('model', None), ('timestamp', None), ('parser_rate', '.4f'),
+                    ('acc', '.4f'), ('precision', '.4f'), ('recall', '.4f'), ('f1', '.4f')],
+        'base_dir': '/media/ps/data-ssd/benchmark/VLMEvalKit/outputs/dolphin-output/cla',
+    },
+    'seg': {
+        'module': 'seg_eval', 'store': 'seg', 'gt_columns': 'SEG_GT_COLUMNS',
+        'loader': 'read_jsonl_with_tsv', 'scorer': 'new_seg_eval', 'task_arg': (),
+        'skip_tasks': (),
+        'columns': [('task_id', None), ('model', None), ('acc', '.4f')],
+        'base_dir': '/media/ps/data-ssd/benchmark/VLMEvalKit/outputs/dolphin-output/seg',
+    },
+    'measure': {
+        'module': 'measure_eval', 'store': 'measure', 'gt_columns': 'MEA_GT_COLUMNS',
+        'loader': 'read_jsonl_with_tsv', 'scorer': 'meaeval', 'task_arg': ('loader', 'scorer'),
+        'skip_tasks': ('31',),
+        'columns': [('task_id', None), ('model', None), ('RMSE', '.4f'), ('MAE', '.4f'), ('Std', '.4f'),
+                    ('%_within_tolerance', '.4f'), ('failed_items', None)],
+        'base_dir': '/media/ps/data-ssd/benchmark/VLMEvalKit/outputs/dolphin-output/measurement',
+    },
+    'report': {
+        'module': 'report_eval', 'store': 'report', 'gt_columns': 'REPORT_GT_COLUMNS',
+        'loader': 'read_jsonl_with_tsv', 'scorer': 'report_eval', 'task_arg': (),
+        'skip_tasks': (),
+        'columns': [('task_id', None), ('model', None), ('Bleu-4', '.2f'), ('Rouge', '.2f'), ('BERTScore', '.2f')],
+        'base_dir': '/media/ps/data-ssd/benchmark/VLMEvalKit/outputs/dolphin-output/report',
+    },
+}
+
+# 档位：在默认评估程序上覆盖的配置。qwen 档位的读取和参考答案与默认相同，
+# 区别在于结果目录、结果库，以及分割（按位置关键词宽松匹配回复）、测量（从回复文本中提取数值）、
+# 报告（输出 Bleu-1~4 和时间戳）的评分函数，这些评分函数在 qwen_* 模块中实现
+PROFILES = {
+    'default': {},
+    'qwen': {
+        'cla': {'module': 'qwen_cla_eval', 'store': 'qwen_cla',
+                'base_dir': '/home/guohongcheng/DolphinV1.9p/cla'},
+        'seg': {'module': 'qwen_seg_eval', 'store': 'qwen_seg', 'base_dir': 'data/seg'},
+        'measure': {'module': 'qwen_measure_eval', 'store': 'qwen_measure',
+                    'base_dir': '/home/guohongcheng/DolphinV1.9p/measurement_processed'},
+        'report': {'module': 'qwen_report_eval', 'store': 'qwen_report', 'scorer': 'model_eval',
+                   'columns': [('task_id', None), ('model', None), ('timestamp', None),
+                               ('Bleu-1', '.4f'), ('Bleu-2', '.4f'), ('Bleu-3', '.4f'), ('Bleu-4', '.4f'),
+                               ('Rouge', '.4f'), ('BERTScore', '.4f')],
+                   'base_dir': 'data/report'},
+    },
+}
+
+
+def evaluator_spec(profile, kind):
+    """档位中某任务类型的完整评估程序配置"""
+    return {**EVALUATORS[kind], **PROFILES[profile].get(kind, {})}
+
+
+def evaluate_pair(spec, task_id, jsonl_path, tsv_path):
+    """按评估程序配置评估单个模型结果文件，跳过时返回None"""
+    module = importlib.import_module(spec['module'])
+    task_kwargs = {'task_id': task_id}
+    model_name = os.path.basename(os.path.dirname(jsonl_path))
+
+    data = getattr(module, spec['loader'])(
+        jsonl_path, tsv_path, **(task_kwargs if 'loader' in spec['task_arg'] else {}))
+    if data.empty:
+        print(f"Skipped {jsonl_path}: empty data")
+        return None
+
+    metrics = getattr(module, spec['scorer'])(
+        data, jsonl_path=jsonl_path, **(task_kwargs if 'scorer' in spec['task_arg'] else {}))
+    if 'error' in metrics:
+        print(f"Skipped {model_name}@{task_id}: {metrics['error']}")
+        return None
+
+    result = {'task_id': task_id, 'model': model_name}
+    if any(name == 'timestamp' for name, _ in spec['columns']):
+        result['timestamp'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return {**result, **metrics}
+
+
+def _evaluate_job(job, jsonl_path, tsv_path):
+    """进程池中执行的评估：job 为 (档位, 任务类型, 任务ID)"""
+    profile, kind, task_id = job
+    return evaluate_pair(evaluator_spec(profile, kind), task_id, jsonl_path, tsv_path)
+
+
+def write_results(results, output_file, columns):
+    """按评估程序的列定义写结果文件，缺失的指标记为0"""
+    with open(output_file, 'w') as f:
+        f.write('\t'.join(name for name, _ in columns) + '\n')
+        for res in results:
+            f.write('\t'.join(str(res[name]) if fmt is None else format(res.get(name, 0), fmt)
+                              for name, fmt in columns) + '\n')
+
+
+def load_tsv_overrides(path):
+    """读取TSV路径覆盖文件：{"任务类型": {"任务ID": "TSV路径"}}"""
+    if not path:
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def discover_pairs(base_dir, task_id, tsv_path, models=None):
+    """列出 <base_dir>/<task_id>/<模型>/*.jsonl，models 不为空时只保留这些模型"""
+    task_dir = os.path.join(base_dir, task_id)
+    if not os.path.isdir(task_dir):
+        print(f"警告：任务目录不存在 {task_dir}，跳过")
+        return []
+
+    pairs = []
+    for model_dir in os.listdir(task_dir):
+        model_path = os.path.join(task_dir, model_dir)
+        if not os.path.isdir(model_path) or (models and model_dir not in models):
+            continue
+        try:
+            for file in os.listdir(model_path):
+                if file.endswith('.jsonl'):
+                    pairs.append((task_id, os.path.join(model_path, file), tsv_path))
+        except OSError as e:
+            print(f"警告：无法读取模型目录 {model_path}，错误: {e}")
+    return pairs
+
+
+def evaluate(kinds=TASK_KINDS, profile='default', tasks=None, models=None, base_dirs=None,
+             tsv_overrides=None, output_dir='.', workers=1, rescore=False, threads=None):
+    """评估指定任务类型下的任务和模型，每种任务类型写出一个结果文件，返回 {任务类型: 结果列表}
+
+    threads 为报告任务 BERTScore 在CPU上推理的线程数，None 时使用评估模块中的设置
+    """
+    base_dirs = base_dirs or {}
+    tsv_overrides = tsv_overrides or {}
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M")
+
+    # 收集所有任务类型的 (任务, 模型) 结果文件，并对照各自的结果库找出需要重新评估的部分
+    plans = {}
+    jobs = []
+    known_tasks = set()
+    for kind in kinds:
+        spec = evaluator_spec(profile, kind)
+        module = importlib.import_module(spec['module'])
+        if kind == 'report' and threads is not None:
+            # 编码器在第一次计算BERTScore时才加载，此时设置对本进程和之后fork出的子进程都生效
+            module.BERTSCORE_NUM_THREADS = threads
+        tsv_paths = {**module.TSV_PATH, **tsv_overrides.get(kind, {})}
+        base_dir = base_dirs.get(kind) or spec['base_dir']
+
+        pairs = []
+        for task_id in (tasks or list(tsv_paths.keys())):
+            # 指定的任务ID只在属于该任务类型时评估，例如 --tasks 03 31 中 31 只属于分割
+            if task_id not in tsv_paths or task_id in spec['skip_tasks']:
+                continue
+            known_tasks.add(task_id)
+            task_pairs = discover_pairs(base_dir, task_id, tsv_paths[task_id], models)
+            if not task_pairs:
+                print(f"{kind} 任务 {task_id} 未找到模型结果文件")
+            pairs.extend(task_pairs)
+
+        results, stale, signatures, store = plan_incremental(
+            spec['store'], pairs, module.EVAL_VERSION, rescore, kind)
+        plans[kind] = (spec, module, pairs, results, stale, signatures, store)
+        jobs.extend((kind, idx) for idx in stale)
+
+    for task_id in (tasks or []):
+        if task_id not in known_tasks:
+            print(f"警告：任务 {task_id} 在 {', '.join(kinds)} 中都没有对应的TSV文件，跳过")
+
+    # 多进程时先在主进程加载所有用到的参考答案，fork出的子进程直接继承
+    if workers is not None and workers > 1:
+        prepared = set()
+        for kind, idx in jobs:
+            spec, module, pairs = plans[kind][:3]
+            key = (module.__name__, pairs[idx][2])
+            if key in prepared:
+                continue
+            prepared.add(key)
+            try:
+                load_ground_truth(pairs[idx][2], getattr(module, spec['gt_columns']))
+            except Exception as e:
+                print(f"警告：预加载参考答案失败 {pairs[idx][2]}，错误: {e}")
+
+    # 所有任务类型需要重新评估的结果文件放进同一个进程池
+    job_pairs = []
+    for kind, idx in jobs:
+        pairs = plans[kind][2]
+        task_id, jsonl_path, tsv_path = pairs[idx]
+        job_pairs.append(((profile, kind, task_id), jsonl_path, tsv_path))
+    fresh = run_pairs(job_pairs, _evaluate_job, workers=workers)
+
+    fresh_by_kind = {kind: [] for kind in kinds}
+    for (kind, _), res in zip(jobs, fresh):
+        fresh_by_kind[kind].append(res)
+
+    os.makedirs(output_dir, exist_ok=True)
+    prefix = '' if profile == 'default' else f'{profile}_'
+    all_results = {}
+    for kind in kinds:
+        spec, module, pairs, results, stale, signatures, store = plans[kind]
+        results = commit_incremental(spec['store'], pairs, results, stale,
+                                     signatures, store, fresh_by_kind[kind])
+        results = [res for res in results if res is not None]
+        all_results[kind] = results
+
+        output_file = os.path.join(output_dir, f'{prefix}{kind}_results_{timestamp}.txt')
+        write_results(results, output_file, spec['columns'])
+        print(f"{kind}: {len(results)} 个结果，已保存到 {output_file}")
+
+    if 'report' in kinds:
+        plans['report'][1].BertModelCache.clear_cache()
+    return all_results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='统一评估入口：分类、分割、测量、报告任务')
+    parser.add_argument('--kinds', nargs='*', default=list(TASK_KINDS), choices=TASK_KINDS, help='评估的任务类型（默认全部）')
+    parser.add_argument('--profile', default='default', choices=sorted(PROFILES), help='评估程序档位')
+    parser.add_argument('--tasks', nargs='*', default=None, help='只评估这些任务ID（默认全部）')
+    parser.add_argument('--models', nargs='*', default=None, help='只评估这些模型（结果目录名）')
+    parser.add_argument('--base-dir', action='append', default=None, metavar='KIND=DIR',
+                        help='覆盖某类任务的模型结果目录，可重复，如 --base-dir cla=/path/to/cla')
+    parser.add_argument('--tsv-map', default=None, help='TSV路径覆盖文件（JSON: {"任务类型": {"任务ID": "TSV路径"}}）')
+    parser.add_argument('--output-dir', default='.', help='结果文件目录')
+    parser.add_argument('--workers', type=int, default=1, help='并行评估的进程数')
+    parser.add_argument('--rescore', action='store_true', help='忽略结果库，重新评估所有结果文件')
+    parser.add_argument('--threads', type=int, default=None, help='报告任务BERTScore在CPU上推理的线程数（默认使用torch的设置）')
+    args = parser.parse_args()
+
+    base_dirs = {}
+    for item in args.base_dir or []:
+        kind, sep, path = item.partition('=')
+        if not sep or kind not in TASK_KINDS:
+            parser.error(f"--base-dir 格式应为 任务类型=目录，任务类型为 {', '.join(TASK_KINDS)} 之一: {item}")
+        base_dirs[kind] = path
+
+    evaluate(kinds=args.kinds, profile=args.profile, tasks=args.tasks, models=args.models,
+             base_dirs=base_dirs, tsv_overrides=load_tsv_overrides(args.tsv_map),
+             output_dir=args.output_dir, workers=args.workers, rescore=args.rescore,
+             threads=args.threads)
@@ -14,6 +14,8 @@ import pandas as pd
 import numpy as np
 import io
 from PIL import Image
+from dataset_manifest import tsv_paths
+from gt_loader import load_ground_truth, extract_anatomy_labels, ANSWER_COLUMN_TYPES
 
 # 基础目录
 BASE_DIR = '/home/guohongcheng/Dolphin0606_processed_results_final'
@@ -22,74 +24,13 @@ IMAGE_BASE_DIR = '/media/ps/data-ssd/benchmark/VLMEvalKit/data'
 # 输出报告路径
 OUTPUT_FILE = '/home/guohongcheng/dolphin_examples_report_improved.md'
 
-# TSV文件路径映射，使用嵌套结构避免重复
+# TSV文件路径映射，由数据集清单 datasets.json 生成（包括评估程序默认不评估的数据集，始终读取原始TSV）
 TSV_PATH = {
-    'cla': {
-        '03': '/media/ps/data-ssd/json_processing/ale_tsv_output/classification_tsv_output/3_FETAL_Planes_US.tsv',
-        '10': '/media/ps/data-ssd/json_processing/ale_tsv_output/classification_tsv_output/10_FetusOrientation.tsv',
-        '18': '/media/ps/data-ssd/json_processing/ale_tsv_output/classification_tsv_output/18_1.Ultrasound_Heart_Segmentation_Dataset_view.tsv',
-        '21': '/media/ps/data-ssd/json_processing/ale_tsv_output/21.Breast_Ultrasound_Segmentation_Dataset.tsv',
-        '23': '/media/ps/data-ssd/json_processing/ale_tsv_output/23.tsv',
-        '25': '/media/ps/data-ssd/json_processing/ale_tsv_output/25.Dermatologic_Ultrasound_Classification_Dataset.tsv',
-        '28': '/media/ps/data-ssd/json_processing/ale_tsv_output/classification_tsv_output/28_1.Knee_Grading_Ultrasound_Classification_Dataset_Kellgren-Lawrence (KL) Grade.tsv',
-        '28_class': '/media/ps/data-ssd/json_processing/ale_tsv_output/28.Knee_Classification.tsv',
-        '32': '/media/ps/data-ssd/json_processing/ale_tsv_output/32_image.tsv',
-        '37': '/media/ps/data-ssd/json_processing/ale_tsv_output/37.tsv',
-        '40': '/media/ps/data-ssd/json_processing/ale_tsv_output/classification_tsv_output/40_birads.tsv',
-        '42': '/media/ps/data-ssd/json_processing/ale_tsv_output/42.tsv',
-        '44': '/media/ps/data-ssd/json_processing/ale_tsv_output/44.COVID-BLUES-frames.tsv',
-        '50': '/media/ps/data-ssd/json_processing/ale_tsv_output/classification_tsv_output/50.ACOUSLIC_AI_Key_Frame_Classification_is_optimal_or_suboptimal.tsv',
-        '53': '/media/ps/data-ssd/json_processing/ale_tsv_output/53.tsv',
-        '57': '/media/ps/data-ssd/json_processing/ale_tsv_output/57_1.Liver_Ultrasound_Segmentation_Dataset.tsv',
-        '66': '/media/ps/data-ssd/json_processing/ale_tsv_output/66.tsv',
-        '69': '/media/ps/data-ssd/json_processing/ale_tsv_output/classification_tsv_output/69.tsv',
-        '70': '/media/ps/data-ssd/json_processing/ale_tsv_output/70.tsv',
-        '74is_normal': '/media/ps/data-ssd/json_processing/ale_tsv_output/classification_tsv_output/74_is_normal.tsv',
-        '74is_visible': '/media/ps/data-ssd/json_processing/ale_tsv_output/classification_tsv_output/74_is_visible.tsv',
-        '75': '/media/ps/data-ssd/json_processing/ale_tsv_output/75.PCOS_Ultrasound_Classification_Dataset.tsv',
-        'anatomy': '/media/ps/data-ssd/json_processing/ale_tsv_output/classification_tsv_output/anatomy.tsv',
-    },
-    'seg': {
-        '04': '/media/ps/data-ssd/json_processing/ale_tsv_output/04.tsv',
-        '09': '/media/ps/data-ssd/json_processing/ale_tsv_output/single_channel_seg/09.tsv',
-        '13': '/media/ps/data-ssd/json_processing/ale_tsv_output/single_channel_seg/13.tsv',
-        '16': '/media/ps/data-ssd/json_processing/ale_tsv_output/single_channel_seg/16.tsv',
-        '17': '/media/ps/data-ssd/json_processing/ale_tsv_output/17_1.tsv',
-        '18': '/media/ps/data-ssd/json_processing/ale_tsv_output/single_channel_seg/18_1.Ultrasound_Heart_Segmentation_Dataset.tsv',
-        '23': '/media/ps/data-ssd/json_processing/ale_tsv_output/23.tsv',
-        '31': '/media/ps/data-ssd/json_processing/ale_tsv_output/31.tsv',
-        '32': '/media/ps/data-ssd/json_processing/ale_tsv_output/32_image.tsv',
-        '37': '/media/ps/data-ssd/json_processing/ale_tsv_output/single_channel_seg/37.tsv',
-        '38': '/media/ps/data-ssd/json_processing/ale_tsv_output/38.tsv',
-        '47': '/media/ps/data-ssd/json_processing/ale_tsv_output/47.tsv',
-        '48': '/media/ps/data-ssd/json_processing/ale_tsv_output/single_keypoint/48.tsv',
-        '49': '/media/ps/data-ssd/json_processing/ale_tsv_output/49.tsv',
-        '50': '/media/ps/data-ssd/json_processing/ale_tsv_output/50.tsv',
-        '52': '/media/ps/data-ssd/json_processing/ale_tsv_output/single_channel_seg/52.tsv',
-        '53': '/media/ps/data-ssd/json_processing/ale_tsv_output/single_channel_seg/53.tsv',
-        '64': '/media/ps/data-ssd/json_processing/ale_tsv_output/64.BrEaST-Lesions_USG-images_and_masks-Dec-15-2023.tsv',
-        '67': '/media/ps/data-ssd/json_processing/ale_tsv_output/single_channel_seg/67.tsv',
-    },
-    'measurement': {
-        '18': '/media/ps/data-ssd/json_processing/ale_tsv_output/18_1.Ultrasound_Heart_Segmentation_Dataset.tsv',
-        '27': '/media/ps/data-ssd/json_processing/ale_tsv_output/27.tsv',
-        '31': '/media/ps/data-ssd/json_processing/ale_tsv_output/31.tsv',
-        '50': '/media/ps/data-ssd/json_processing/ale_tsv_output/50.tsv',
-        '57': '/media/ps/data-ssd/json_processing/ale_tsv_output/57_1.Liver_Ultrasound_Segmentation_Dataset.tsv',
-    },
-    'measurement_processed_fixed': {
-        '18': '/media/ps/data-ssd/json_processing/ale_tsv_output/18_1.Ultrasound_Heart_Segmentation_Dataset.tsv',
-        '27': '/media/ps/data-ssd/json_processing/ale_tsv_output/27.tsv',
-        '31': '/media/ps/data-ssd/json_processing/ale_tsv_output/31.tsv',
-        '50': '/media/ps/data-ssd/json_processing/ale_tsv_output/50.tsv',
-        '57': '/media/ps/data-ssd/json_processing/ale_tsv_output/57_1.Liver_Ultrasound_Segmentation_Dataset.tsv',
-    },
-    'report': {
-        '10': '/media/ps/data-ssd/json_processing/ale_tsv_output/10.tsv',
-        '11': '/media/ps/data-ssd/json_processing/ale_tsv_output/11.Thyroid_US_Images.tsv',
-        '39': '/media/ps/data-ssd/json_processing/ale_tsv_output/39_translated.tsv',
-        '44': '/media/ps/data-ssd/json_processing/ale_tsv_output/44.COVID-BLUES-frames.tsv',
-    }
+    'cla': tsv_paths('cla', include_disabled=True, use_artifacts=False),
+    'seg': tsv_paths('seg', include_disabled=True, use_artifacts=False),
+    'measurement': tsv_paths('measure', include_disabled=True, use_artifacts=False),
+    'measurement_processed_fixed': tsv_paths('measure', include_disabled=True, use_artifacts=False),
+    'report': tsv_paths('report', include_disabled=True, use_artifacts=False),
 }
 
 # 任务类型映射（英文）
@@ -299,7 +240,8 @@ def read_tsv_reference(task_type, task_id):
         return None
     
     try:
-        df_tsv = pd.read_csv(tsv_file, sep='\t')
+        # 只读取答案相关列；返回的是共享缓存，这里会追加列，所以复制一份
+        df_tsv = load_ground_truth(tsv_file, tuple(ANSWER_COLUMN_TYPES)).copy()
         
         # 根据任务类型进行不同的处理
         if task_type == 'cla':
@@ -307,29 +249,10 @@ def read_tsv_reference(task_type, task_id):
             if task_id == 'anatomy':
                 # 处理anatomy任务
                 try:
-                    classes_data = []
-                    for _, row in df_tsv.iterrows():
-                        if 'classes' in df_tsv.columns:
-                            classes_value = row['classes']
-                            if isinstance(classes_value, str):
-                                # 尝试解析JSON字符串
-                                try:
-                                    classes_dict = json.loads(classes_value.replace("'", '"'))
-                                    if isinstance(classes_dict, dict) and 'Anatomy' in classes_dict:
-                                        classes_data.append(classes_dict['Anatomy'])
-                                    else:
-                                        classes_data.append(classes_value)
-                                except json.JSONDecodeError:
-                                    # 如果解析失败，尝试使用正则表达式提取
-                                    match = re.search(r'"Anatomy":\s*"([^"]+)"', classes_value)
-                                    if match:
-                                        classes_data.append(match.group(1))
-                                    else:
-                                        classes_data.append(classes_value)
-                            else:
-                                classes_data.append(str(classes_value))
-                        else:
-                            classes_data.append('')
+                    if 'classes' in df_tsv.columns:
+                        classes_data, _ = extract_anatomy_labels(df_tsv['classes'], lower=False)
+                    else:
+                        classes_data = [''] * len(df_tsv)
                     
                     # 将提取的Anatomy值赋给df_tsv
                     df_tsv['reference_answer'] = classes_data
@@ -0,0 +1,139 @@
+import os
+import sys
+import json
+import argparse
+import importlib
+from functools import partial
+from datetime import datetime
+from jsonl_loader import RESPONSE_FIELDS, frame_from_records
+from parallel_eval import run_pairs
+
+# 回复清洗逻辑在 scripts/ 下的预处理脚本中
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+
+# 一次完成 "原始模型结果 -> 选项/数值提取 -> 合并参考答案 -> 计算指标"，不再写出再读回清洗后的JSONL
+# 任务类型 -> (评估程序模块, 清洗方式, 写结果文件的函数名, 默认的原始结果目录)
+FUSED_KINDS = {
+    'cla': ('cla_eval', 'choice', 'write_combined_results',
+            '/media/ps/data-ssd/benchmark/VLMEvalKit/outputs/dolphin-output/cla'),
+    'seg': ('seg_eval', 'choice', 'save_results',
+            '/media/ps/data-ssd/benchmark/VLMEvalKit/outputs/dolphin-output/seg'),
+    'measure': ('measure_eval', 'measurement', 'save_results',
+                '/media/ps/data-ssd/benchmark/VLMEvalKit/outputs/dolphin-output/measurement'),
+}
+
+# 每个文件最多打印的出错行数
+MAX_ERROR_PRINTS = 3
+
+
+def _clean_choice(data, task_id):
+    from extract_model_responses_final import clean_record
+    clean_record(data)
+
+
+def _clean_measurement(data, task_id):
+    from extract_measurement_values_improved import clean_measurement_record
+    clean_measurement_record(data, task_id)
+
+
+CLEANERS = {
+    'choice': _clean_choice,
+    'measurement': _clean_measurement,
+}
+
+
+def cleaned_records(jsonl_path, task_id, clean, side_output=None):
+    """逐行解析原始模型结果并清洗回复，边读边产出记录
+
+    与预处理脚本一致：解析或清洗出错的行打印后跳过；side_output 不为空时同时写出清洗后的JSONL，
+    内容与预处理脚本的输出相同。
+    """
+    errors = 0
+    with open(jsonl_path, 'r', encoding='utf-8') as f:
+        for line_num, line in enumerate(f):
+            try:
+                data = json.loads(line.strip())
+                clean(data, task_id)
+            except Exception as e:
+                errors += 1
+                if errors <= MAX_ERROR_PRINTS:
+                    print(f"处理文件 {jsonl_path} 行 {line_num+1} 时出错: {str(e)}")
+                continue
+            if side_output is not None:
+                side_output.write(json.dumps(data, ensure_ascii=False) + '\n')
+            yield data
+    if errors > MAX_ERROR_PRINTS:
+        print(f"文件 {jsonl_path} 共 {errors} 行出错，只打印了前 {MAX_ERROR_PRINTS} 行")
+
+
+def _side_output_path(jsonl_path, raw_dir, cleaned_dir):
+    """清洗后JSONL的输出路径，保持相对原始结果目录的路径结构"""
+    return os.path.join(cleaned_dir, os.path.relpath(jsonl_path, raw_dir))
+
+
+def fused_evaluate_pair(kind, raw_dir, cleaned_dir, task_id, jsonl_path, tsv_path):
+    """对单个原始结果文件完成清洗和评估，返回评估程序的结果记录（跳过时为None）"""
+    module_name, cleaner, _, _ = FUSED_KINDS[kind]
+    module = importlib.import_module(module_name)
+    clean = CLEANERS[cleaner]
+    fields = getattr(module, 'CLA_JSONL_FIELDS', RESPONSE_FIELDS)
+
+    if cleaned_dir is None:
+        df_jsonl = frame_from_records(cleaned_records(jsonl_path, task_id, clean), fields)
+    else:
+        output_file = _side_output_path(jsonl_path, raw_dir, cleaned_dir)
+        os.makedirs(os.path.dirname(output_file), exist_ok=True)
+        tmp_file = f"{output_file}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as side_output:
+                df_jsonl = frame_from_records(cleaned_records(jsonl_path, task_id, clean, side_output), fields)
+            os.replace(tmp_file, output_file)
+        finally:
+            # 清洗中途出错时删除写了一半的临时文件
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+
+    return module.evaluate_pair(task_id, jsonl_path, tsv_path, df_jsonl=df_jsonl)
+
+
+def fused_evaluate(kind, raw_dir=None, tasks=None, cleaned_dir=None, workers=1, output_file=None):
+    """对原始结果目录中指定任务（默认全部）的所有模型一次完成清洗和评估，并写出结果文件"""
+    module_name, _, writer_name, default_dir = FUSED_KINDS[kind]
+    module = importlib.import_module(module_name)
+    raw_dir = raw_dir or default_dir
+    output_file = output_file or f'fused_{kind}_results_{datetime.now().strftime("%Y%m%d_%H%M")}.txt'
+
+    all_pairs = []
+    for task_id in (tasks or list(module.TSV_PATH.keys())):
+        if task_id not in module.TSV_PATH:
+            print(f"警告：任务 {task_id} 没有对应的TSV文件，跳过")
+            continue
+        task_pairs = module.find_model_files(raw_dir, task_id)
+        if not task_pairs:
+            print(f"Task {task_id} skipped: no files found")
+            continue
+        all_pairs.extend((task_id, jsonl_path, tsv_path) for jsonl_path, tsv_path in task_pairs)
+
+    worker = partial(fused_evaluate_pair, kind, raw_dir, cleaned_dir)
+    all_results = run_pairs(all_pairs, worker, workers=workers, prepare=module._prepare_ground_truth)
+    all_results = [res for res in all_results if res is not None]
+
+    getattr(module, writer_name)(all_results, output_file)
+    print(f"评估完成，结果已保存到 {output_file}")
+    if cleaned_dir is not None:
+        print(f"清洗后的JSONL保存在: {cleaned_dir}")
+    return all_results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='从原始模型结果一次完成回复清洗和评估')
+    parser.add_argument('--kind', required=True, choices=sorted(FUSED_KINDS), help='任务类型')
+    parser.add_argument('--input', default=None, help='原始模型结果目录（<任务ID>/<模型>/*.jsonl）')
+    parser.add_argument('--tasks', nargs='*', default=None, help='只评估这些任务ID（默认全部）')
+    parser.add_argument('--cleaned-output', default=None, help='同时写出清洗后的JSONL到该目录（可选）')
+    parser.add_argument('--output', default=None, help='结果文件路径')
+    parser.add_argument('--workers', type=int, default=1, help='并行评估的进程数')
+    args = parser.parse_args()
+
+    fused_evaluate(args.kind, raw_dir=args.input, tasks=args.tasks, cleaned_dir=args.cleaned_output,
+                   workers=args.workers, output_file=args.output)
@@ -0,0 +1,444 @@
+import os
+import re
+import ast
+import json
+import hashlib
+import time
+import shutil
+import pickle
+import numpy as np
+import pandas as pd
+from scoring_core import bbox_centers, center_locations
+
+# 参考答案磁盘缓存目录，可通过环境变量 GT_CACHE_DIR 覆盖
+GT_CACHE_DIR = os.environ.get(
+    'GT_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.gt_cache')
+)
+
+# 磁盘缓存格式版本，解析逻辑变化时递增以淘汰旧缓存
+GT_CACHE_VERSION = 1
+
+# 进程内缓存：同一任务的所有模型文件共用一份解析结果
+_MEMORY_CACHE = {}
+
+# 流式读取TSV时每块的目标字节数；块行数按样本行长度自动换算，
+# 因此无论图像列多大，峰值内存都只与这个值有关
+CHUNK_BYTES = 16 * 1024 * 1024
+
+# 答案列的读取类型：'str' 按字符串保留；'infer' 读完后按整列推断数值类型，
+# 与一次性 pd.read_csv 整表得到的类型一致（分类任务依赖整数类型的 class 列）
+ANSWER_COLUMN_TYPES = {
+    'id': 'infer',
+    'class': 'infer',
+    'classes': 'infer',
+    'keypoints': 'str',
+    'gt_bbox': 'str',
+    'seg_ans': 'infer',
+    'measurement': 'infer',
+    'measurement_ans': 'infer',
+    'caption': 'str',
+}
+
+
+def tsv_fingerprint(tsv_path):
+    """TSV文件指纹：绝对路径 + 修改时间 + 文件大小（参考答案文件取其 meta.json，每次重新生成都会改变）"""
+    st = os.stat(os.path.join(tsv_path, GT_ARTIFACT_META) if is_gt_artifact(tsv_path) else tsv_path)
+    return (os.path.abspath(tsv_path), st.st_mtime_ns, st.st_size)
+
+
+def _infer_column(series):
+    """按整列推断数值类型，无法整体转换时保留字符串"""
+    try:
+        return pd.to_numeric(series)
+    except (ValueError, TypeError):
+        return series
+
+
+def _auto_chunksize(tsv_path, sample_lines=16):
+    """根据文件开头若干行的平均长度估算每块行数"""
+    sampled = 0
+    sampled_bytes = 0
+    with open(tsv_path, 'rb') as f:
+        f.readline()  # 跳过表头
+        for _ in range(sample_lines):
+            line = f.readline()
+            if not line:
+                break
+            sampled += 1
+            sampled_bytes += len(line)
+    if sampled == 0:
+        return 1000
+    return max(1, CHUNK_BYTES // max(1, sampled_bytes // sampled))
+
+
+def read_tsv_columns(tsv_path, columns, chunksize=None, verbose=True):
+    """按块流式读取TSV中的指定列，返回 (DataFrame, 读取统计)
+
+    所有列先以字符串读入，避免分块推断出不一致的类型；ANSWER_COLUMN_TYPES 中标记为
+    'infer' 的列在合并后再统一推断。统计信息中的 bytes_kept 为保留列按UTF-8编码的字节数
+    （不含分隔符和换行），bytes_skipped 为文件大小减去 bytes_kept，即被跳过的内容（主要是base64图像列）。
+    """
+    wanted = set(columns)
+    if chunksize is None:
+        chunksize = _auto_chunksize(tsv_path)
+    bytes_total = os.path.getsize(tsv_path)
+    bytes_kept = 0
+    chunks = []
+    reader = pd.read_csv(tsv_path, sep='\t', usecols=lambda c: c in wanted,
+                         dtype=str, chunksize=chunksize)
+    for chunk in reader:
+        for col in chunk.columns:
+            # 中文等多字节字符按编码后的字节数计，与文件大小的单位一致
+            bytes_kept += int(chunk[col].str.encode('utf-8').str.len().sum())
+        chunks.append(chunk)
+
+    if chunks:
+        df = pd.concat(chunks, ignore_index=True)
+    else:
+        df = pd.read_csv(tsv_path, sep='\t', usecols=lambda c: c in wanted, dtype=str, nrows=0)
+    for col in df.columns:
+        if ANSWER_COLUMN_TYPES.get(col, 'infer') == 'infer':
+            df[col] = _infer_column(df[col])
+
+    stats = {
+        'rows': len(df),
+        'columns': list(df.columns),
+        'bytes_total': bytes_total,
+        'bytes_kept': bytes_kept,
+        'bytes_skipped': max(bytes_total - bytes_kept, 0),
+    }
+    if verbose:
+        skipped_pct = stats['bytes_skipped'] / bytes_total * 100 if bytes_total else 0.0
+        print(f"读取TSV {os.path.basename(tsv_path)}: {stats['rows']}行, 保留列{stats['columns']}, "
+              f"读取 {bytes_total / 1e6:.1f}MB, 保留 {bytes_kept / 1e6:.2f}MB, 跳过 {skipped_pct:.1f}%")
+    return df, stats
+
+
+def _disk_cache_path(fingerprint, columns):
+    key = repr((GT_CACHE_VERSION, fingerprint, tuple(columns))).encode('utf-8')
+    return os.path.join(GT_CACHE_DIR, hashlib.sha1(key).hexdigest() + '.pkl')
+
+
+def load_ground_truth(tsv_path, columns, use_disk_cache=True):
+    """读取TSV中的参考答案列（只保留columns中实际存在的列）
+
+    结果按TSV指纹缓存在内存和磁盘上：同一进程内每个TSV只解析一次，
+    TSV未改动时重复运行直接读取磁盘缓存。返回的DataFrame被多个模型共用，调用方不要原地修改。
+    tsv_path 为 build-gt 生成的参考答案文件时直接内存映射读取，返回其中已解析好的全部列。
+    """
+    if is_gt_artifact(tsv_path):
+        return load_gt_artifact(tsv_path)
+
+    fingerprint = tsv_fingerprint(tsv_path)
+    mem_key = (fingerprint, tuple(columns))
+    if mem_key in _MEMORY_CACHE:
+        return _MEMORY_CACHE[mem_key]
+
+    cache_file = _disk_cache_path(fingerprint, columns)
+    df_gt = None
+    if use_disk_cache and os.path.exists(cache_file):
+        try:
+            with open(cache_file, 'rb') as f:
+                df_gt = pickle.load(f)
+        except Exception as e:
+            print(f"警告：读取参考答案缓存失败 {cache_file}，重新解析TSV，错误: {e}")
+            df_gt = None
+
+    if df_gt is None:
+        df_gt, _ = read_tsv_columns(tsv_path, columns)
+        if use_disk_cache:
+            try:
+                os.makedirs(GT_CACHE_DIR, exist_ok=True)
+                tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+                with open(tmp_file, 'wb') as f:
+                    pickle.dump(df_gt, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_file, cache_file)
+            except Exception as e:
+                print(f"警告：写入参考答案缓存失败 {cache_file}，错误: {e}")
+
+    _MEMORY_CACHE[mem_key] = df_gt
+    return df_gt
+
+
+ANATOMY_REGEX = re.compile(r'"Anatomy":\s*"([^"]+)"')
+
+
+def _parse_anatomy_value(value, lower):
+    """解析单个classes值，返回 (标签, 解析方式)"""
+    if not isinstance(value, str):
+        return str(value).lower() if lower else str(value), 'non_str'
+    raw = value.lower() if lower else value
+
+    try:
+        parsed = json.loads(value.replace("'", '"'))
+        if isinstance(parsed, dict) and 'Anatomy' in parsed:
+            label = parsed['Anatomy']
+            return (str(label).lower() if lower else label), 'json'
+        return raw, 'raw'
+    except json.JSONDecodeError:
+        pass
+
+    # 单双引号混用（如 it's）时直接替换引号会破坏JSON，按Python字面量再解析一次
+    try:
+        parsed = ast.literal_eval(value)
+        if isinstance(parsed, dict) and 'Anatomy' in parsed:
+            label = parsed['Anatomy']
+            return (str(label).lower() if lower else label), 'literal'
+    except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+        pass
+
+    match = ANATOMY_REGEX.search(value)
+    if match:
+        return (match.group(1).lower() if lower else match.group(1)), 'regex'
+    return raw, 'raw'
+
+
+def extract_anatomy_labels(classes, lower=True):
+    """从classes列中批量提取Anatomy标签，返回 (标签数组, 各解析方式的行数)
+
+    classes列通常只有少量不同取值，因此先按唯一值解析一次，再按编码广播回所有行。
+    解析顺序：引号替换后按JSON解析 -> Python字面量 -> 正则提取 -> 原值；
+    解析方式计数的键为 json / literal / regex / raw / non_str。
+    """
+    codes, uniques = pd.factorize(pd.Series(classes, dtype=object), use_na_sentinel=False)
+    parsed = [_parse_anatomy_value(v, lower) for v in uniques]
+
+    unique_labels = np.empty(len(parsed), dtype=object)
+    unique_labels[:] = [label for label, _ in parsed]
+    labels = unique_labels[codes]
+
+    rows_per_unique = np.bincount(codes, minlength=len(parsed))
+    status_counts = {}
+    for (_, status), n in zip(parsed, rows_per_unique):
+        status_counts[status] = status_counts.get(status, 0) + int(n)
+    return labels, status_counts
+
+
+# 参考答案文件（dataset_manifest.py build-gt 生成）：每个数据集一个目录，每列一个 .npy，
+# 评估时内存映射读取，不再逐行解析TSV中的JSON字符串。各任务类型写出的列：
+#   id:                    TSV中的id列（有时）
+#   cla_label:             分类标签（anatomy任务为提取并转为小写的Anatomy值，其余为classes/class列）
+#   seg_center_x/y, seg_location: 分割任务边界框中心坐标和位置类别（无效坐标为 nan / 'not visible'）
+#   measurement_value, measurement_skip: 测量值；skip 为原来解析失败（'nan'）、评估时跳过的样本
+#   caption:               报告任务的参考报告
+# 以上预先解析的列只用于按行号对应的情况；两边都有id时评估程序按id合并TSV中原有的答案列，
+# 因此TSV中有 class/classes、seg_ans、measurement_ans 列时也原样写出（RAW_ANSWER_COLUMNS）。
+GT_ARTIFACT_META = 'meta.json'
+
+# 参考答案文件格式版本，列的含义或解析逻辑变化时递增，旧文件需重新生成
+GT_ARTIFACT_VERSION = 2
+
+# 按id合并时使用的TSV原始答案列，存在时原样写入参考答案文件
+RAW_ANSWER_COLUMNS = {
+    'cla': ('class', 'classes'),
+    'seg': ('seg_ans',),
+    'measure': ('measurement_ans',),
+    'report': (),
+}
+
+
+def extract_coordinates(keypoints_str):
+    """从 keypoints / gt_bbox 字符串中取出第一组坐标，解析失败返回 'nan'"""
+    try:
+        fixed_str = keypoints_str.replace("'", '"')
+        data = json.loads(fixed_str)
+        if isinstance(data, dict):
+            return list(data.values())[0] # 这种情况下，默认只有一对坐标需要提取
+        else:
+            return list(data[0].values())[0] # 只取第一个
+    except:
+        return 'nan'
+
+
+def extract_measurement(measurements_str, rule):
+    """按数据集清单中的规则从 measurement 字符串中取出测量值，解析失败返回 'nan'
+
+    measurement_key 为要取的键，为None时保留整个字典；first_item 为真时取该值的第一个元素。
+    """
+    try:
+        fixed_str = measurements_str.replace("'", '"')
+        data = json.loads(fixed_str)
+        if isinstance(data, dict):
+            key = rule.get('measurement_key')
+            if key is None:
+                return data
+            return list(data[key])[0] if rule.get('first_item') else data[key]
+        elif isinstance(data, list):
+            return list(data[0].values())[0]
+    except:
+        return 'nan'
+
+
+def _measurement_values(answers):
+    """测量参考值转为 (数值, 跳过标记, 无法转换的个数)：列表取第一个元素，'nan' 跳过，无法转为数值的也跳过"""
+    values = np.full(len(answers), np.nan)
+    skip = np.zeros(len(answers), dtype=bool)
+    invalid = 0
+    for idx, v in enumerate(answers):
+        if isinstance(v, list):
+            v = v[0]
+        if isinstance(v, str) and v == 'nan':
+            skip[idx] = True
+            continue
+        try:
+            values[idx] = float(v)
+        except Exception:
+            skip[idx] = True
+            invalid += 1
+    return values, skip, invalid
+
+
+def _save_column(directory, name, values):
+    """写出一列，返回列格式：数值列保存为 <列名>.npy（'array'）；
+    字符串列（允许缺失）保存为UTF-8字节、字符偏移和缺失标记三个 .npy（'text'）"""
+    values = np.asarray(values)
+    if values.dtype != object:
+        np.save(os.path.join(directory, f'{name}.npy'), values)
+        return 'array'
+
+    na = np.fromiter((not isinstance(v, str) for v in values), dtype=bool, count=len(values))
+    for v in values[na]:
+        if not (v is None or (isinstance(v, float) and np.isnan(v))):
+            raise TypeError(f"列 {name} 中有无法保存的值: {v!r}")
+    texts = ['' if missing else v for v, missing in zip(values, na)]
+    offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+    np.cumsum([len(t) for t in texts], out=offsets[1:])
+    np.save(os.path.join(directory, f'{name}.text.npy'),
+            np.frombuffer(''.join(texts).encode('utf-8'), dtype=np.uint8))
+    np.save(os.path.join(directory, f'{name}.offsets.npy'), offsets)
+    np.save(os.path.join(directory, f'{name}.na.npy'), na)
+    return 'text'
+
+
+def _load_column(directory, name, fmt):
+    if fmt == 'array':
+        return np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r')
+    text = np.load(os.path.join(directory, f'{name}.text.npy'), mmap_mode='r').tobytes().decode('utf-8')
+    offsets = np.load(os.path.join(directory, f'{name}.offsets.npy'), mmap_mode='r').tolist()
+    na = np.load(os.path.join(directory, f'{name}.na.npy'), mmap_mode='r')
+    values = np.empty(len(offsets) - 1, dtype=object)
+    values[:] = [text[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+    values[na] = np.nan
+    return values
+
+
+def is_gt_artifact(path):
+    """path 是否为 build-gt 生成的参考答案文件目录"""
+    return os.path.isfile(os.path.join(path, GT_ARTIFACT_META))
+
+
+def gt_artifact_meta(path):
+    """读取参考答案文件的元信息，不存在或无法读取时返回None"""
+    try:
+        with open(os.path.join(path, GT_ARTIFACT_META), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def build_gt_artifact(tsv_path, artifact_path, kind, rule):
+    """解析一次TSV，把参考答案按列写成 artifact_path 目录下的 .npy 文件，返回元信息
+
+    rule 为数据集清单中该数据集的解析规则（parse / measurement_key / first_item 等），一并写入元信息。
+    先写到临时目录再整体替换，评估程序不会读到写了一半的文件。
+    """
+    df, _ = read_tsv_columns(tsv_path, tuple(ANSWER_COLUMN_TYPES))
+    columns = {}
+    stats = {}
+    if 'id' in df.columns:
+        columns['id'] = df['id'].to_numpy()
+    for col in RAW_ANSWER_COLUMNS.get(kind, ()):
+        if col in df.columns:
+            columns[col] = df[col].to_numpy()
+
+    if kind == 'cla':
+        if rule.get('parse') == 'anatomy':
+            if 'classes' in df.columns:
+                labels, stats = extract_anatomy_labels(df['classes'])
+            else:
+                labels = np.full(len(df), '', dtype=object)
+        else:
+            labels = (df['classes'] if 'classes' in df.columns else df['class']).to_numpy()
+        columns['cla_label'] = labels
+    elif kind == 'seg':
+        source = next((col for col in ('keypoints', 'gt_bbox') if col in df.columns), None)
+        if source is None:
+            raise ValueError(f"TSV中没有 keypoints 或 gt_bbox 列: {tsv_path}")
+        centers = bbox_centers(df[source].apply(extract_coordinates))
+        columns['seg_center_x'] = centers[:, 0]
+        columns['seg_center_y'] = centers[:, 1]
+        columns['seg_location'] = center_locations(centers)
+    elif kind == 'measure':
+        values, skip, invalid = _measurement_values(df['measurement'].apply(extract_measurement, rule=rule).tolist())
+        columns['measurement_value'] = values
+        columns['measurement_skip'] = skip
+        stats = {'skipped': int(skip.sum()), 'invalid': invalid}
+        if invalid:
+            print(f"警告：{tsv_path} 中有 {invalid} 个测量参考值无法转换为数值，评估时跳过")
+    elif kind == 'report':
+        columns['caption'] = df['caption'].to_numpy()
+    else:
+        raise ValueError(f"未知的任务类型: {kind}")
+
+    tmp_dir = f"{artifact_path}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    formats = {name: _save_column(tmp_dir, name, values) for name, values in columns.items()}
+    _, mtime_ns, size = tsv_fingerprint(tsv_path)
+    meta = {
+        'version': GT_ARTIFACT_VERSION,
+        'kind': kind,
+        'rule': rule,
+        'tsv': os.path.abspath(tsv_path),
+        'mtime_ns': mtime_ns,
+        'size': size,
+        'rows': len(df),
+        'columns': formats,
+        'stats': stats,
+    }
+    with open(os.path.join(tmp_dir, GT_ARTIFACT_META), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    old_dir = f"{artifact_path}.{os.getpid()}.old"
+    if os.path.exists(artifact_path):
+        os.replace(artifact_path, old_dir)
+    os.replace(tmp_dir, artifact_path)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return meta
+
+
+def load_gt_artifact(artifact_path, verbose=True):
+    """内存映射读取参考答案文件，返回DataFrame；同一进程内按元信息的修改时间缓存"""
+    meta_file = os.path.join(artifact_path, GT_ARTIFACT_META)
+    mem_key = ('artifact', os.path.abspath(artifact_path), os.stat(meta_file).st_mtime_ns)
+    if mem_key in _MEMORY_CACHE:
+        return _MEMORY_CACHE[mem_key]
+
+    start = time.perf_counter()
+    meta = gt_artifact_meta(artifact_path)
+    if meta is None or meta.get('version') != GT_ARTIFACT_VERSION:
+        raise ValueError(f"参考答案文件格式不符，请重新运行 build-gt: {artifact_path}")
+    df_gt = pd.DataFrame({name: _load_column(artifact_path, name, fmt)
+                          for name, fmt in meta['columns'].items()})
+    if verbose:
+        print(f"读取参考答案文件 {artifact_path}: {meta['rows']}行, 列{list(meta['columns'])}, "
+              f"耗时 {(time.perf_counter() - start) * 1000:.1f}ms")
+    _MEMORY_CACHE[mem_key] = df_gt
+    return df_gt
+
+
+def merge_ground_truth(df_jsonl, df_gt, columns):
+    """按行号把参考答案文件中的列并入模型结果，columns 为 {参考答案列: 合并后的列名}
+
+    与原来按行号赋值（.values）一致，两边行数不同时报错，不会静默错位或填充缺失值。
+    两边都有id时评估程序按id合并参考答案文件中的原始答案列（见 RAW_ANSWER_COLUMNS），不经过这里。
+    """
+    if len(df_gt) != len(df_jsonl):
+        raise ValueError(f"Length of values ({len(df_gt)}) does not match length of index ({len(df_jsonl)})")
+    return df_jsonl.assign(**{target: df_gt[name].to_numpy() for name, target in columns.items()})
+
+
+def clear_memory_cache():
+    """清空进程内的参考答案缓存"""
+    _MEMORY_CACHE.clear()
@@ -0,0 +1,82 @@
+import os
+import time
+import json
+import numpy as np
+import pandas as pd
+
+# 可选的快速JSON解析后端，未安装时回退到标准库json
+try:
+    import orjson
+    _loads = orjson.loads
+    JSON_BACKEND = 'orjson'
+except ImportError:
+    _loads = json.loads
+    JSON_BACKEND = 'json'
+
+# 评估程序只用到模型结果中的这几个字段；question 等包含base64图像的大字段直接丢弃
+RESPONSE_FIELDS = ('id', 'response', 'model')
+
+# 取值重复度高的字段按分类类型保存，整列只存一份字符串
+CATEGORY_FIELDS = ('model',)
+
+_MISSING = object()
+
+
+def _build_column(name, values):
+    """把逐行收集的值转换为有类型的列，缺失的行与 pd.DataFrame(记录列表) 一样为 NaN"""
+    values = [np.nan if v is _MISSING else v for v in values]
+    if name in CATEGORY_FIELDS:
+        return pd.Categorical(values)
+    return pd.Series(values)
+
+
+def iter_jsonl_records(jsonl_path):
+    """逐行解析JSONL，跳过空行"""
+    with open(jsonl_path, 'rb') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            yield _loads(line)
+
+
+def frame_from_records(records, fields=RESPONSE_FIELDS):
+    """从记录迭代器中只取出fields中的字段，一次遍历构造DataFrame
+
+    记录取完字段后立即丢弃，内存只与保留的字段有关。只为至少出现过一次的字段创建列
+    （列顺序与首次出现的顺序一致），与先构造记录列表再 pd.DataFrame 得到的列保持一致，
+    下游 'id' in df.columns 之类的判断不受影响。
+    """
+    wanted = tuple(fields)
+    columns = {name: [] for name in wanted}
+    seen = []
+    rows = 0
+    for record in records:
+        for name in wanted:
+            value = record.get(name, _MISSING)
+            if value is not _MISSING and name not in seen:
+                seen.append(name)
+            columns[name].append(value)
+        rows += 1
+    return pd.DataFrame({name: _build_column(name, columns[name]) for name in seen}, index=pd.RangeIndex(rows))
+
+
+def read_jsonl_columns(jsonl_path, fields=RESPONSE_FIELDS, verbose=True):
+    """流式读取模型结果JSONL，只保留fields中的字段，返回 (DataFrame, 读取统计)"""
+    start = time.perf_counter()
+    df = frame_from_records(iter_jsonl_records(jsonl_path), fields)
+    elapsed = time.perf_counter() - start
+    rows = len(df)
+    seen = list(df.columns)
+
+    stats = {
+        'rows': rows,
+        'columns': seen,
+        'bytes': os.path.getsize(jsonl_path),
+        'seconds': elapsed,
+        'backend': JSON_BACKEND,
+    }
+    if verbose:
+        rate = rows / elapsed if elapsed > 0 else float('inf')
+        print(f"读取JSONL {os.path.basename(jsonl_path)}: {rows}行, 保留字段{seen}, "
+              f"{stats['bytes'] / 1e6:.1f}MB, 耗时 {elapsed:.2f}s, {rate:.0f}行/秒 ({JSON_BACKEND})")
+    return df, stats
@@ -0,0 +1,59 @@
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _call_isolated(worker, pair):
+    """执行单个 (task_id, jsonl_path, tsv_path) 评估，异常只影响这一对"""
+    try:
+        return worker(*pair), None
+    except Exception:
+        return None, traceback.format_exc()
+
+
+def run_pairs(pairs, worker, workers=1, prepare=None):
+    """并行评估所有 (task_id, jsonl_path, tsv_path)，按输入顺序返回结果
+
+    worker 必须是模块级函数（进程池需要能pickle），返回该对的结果记录，跳过时返回None。
+    多进程时按JSONL文件大小从大到小提交，避免最大的文件最后才开始拖慢整体；
+    某一对失败只打印错误，对应位置返回None，不影响其他结果和输出顺序。
+    prepare(tsv_path) 会在启动进程池前对每个TSV在主进程中调用一次（用于预先加载参考答案），
+    fork出的子进程直接继承已加载的缓存。
+    """
+    results = [None] * len(pairs)
+    if not pairs:
+        return results
+
+    if workers is None or workers <= 1:
+        for idx, pair in enumerate(pairs):
+            results[idx], error = _call_isolated(worker, pair)
+            if error:
+                print(f"处理文件失败：{pair[1]}\n{error}")
+        return results
+
+    if prepare is not None:
+        for tsv_path in dict.fromkeys(pair[2] for pair in pairs):
+            try:
+                prepare(tsv_path)
+            except Exception as e:
+                print(f"警告：预加载参考答案失败 {tsv_path}，错误: {e}")
+
+    order = sorted(range(len(pairs)), key=lambda i: _file_size(pairs[i][1]), reverse=True)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(_call_isolated, worker, pairs[idx]): idx for idx in order}
+        for future in as_completed(futures):
+            idx = futures[future]
+            try:
+                results[idx], error = future.result()
+            except Exception:
+                results[idx], error = None, traceback.format_exc()
+            if error:
+                print(f"处理文件失败：{pairs[idx][1]}\n{error}")
+    return results
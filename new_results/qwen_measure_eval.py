@@ -1,20 +1,23 @@
 import os
 import json
+import argparse
 import pandas as pd
 import numpy as np
 import re
-from sklearn.metrics import precision_score, recall_score, f1_score
 from datetime import datetime
-import pingouin as pg
+from dataset_manifest import tsv_paths, dataset_rule
+from gt_loader import load_ground_truth, merge_ground_truth, extract_measurement
+from jsonl_loader import read_jsonl_columns
+from result_store import run_pairs_incremental
 #5月13日更新
-# 预定义的TSV路径映射, 31单独测评
-TSV_PATH = {
-        '18': '/media/ps/data-ssd/json_processing/ale_tsv_output/18_1.Ultrasound_Heart_Segmentation_Dataset.tsv',
-        '27': '/media/ps/data-ssd/json_processing/ale_tsv_output/27.tsv',
-        # '31': '/media/ps/data-ssd/json_processing/ale_tsv_output/31.tsv',
-        '50': '/media/ps/data-ssd/json_processing/ale_tsv_output/50.tsv',
-        '57': '/media/ps/data-ssd/json_processing/ale_tsv_output/57_1.Liver_Ultrasound_Segmentation_Dataset.tsv'
-    }
+# TSV路径由数据集清单 datasets.json 生成, 31单独测评（清单中标记为不评估）
+TSV_PATH = tsv_paths('measure')
+
+# 测量任务只需要TSV中的测量值列
+MEA_GT_COLUMNS = ('id', 'measurement_ans', 'measurement')
+
+# 评估程序版本，评分逻辑变化时递增，使结果库中的旧结果全部失效
+EVAL_VERSION = 1
 
 MIN_MAX_DICT = {
     '18': {'min': 10.0, 'max': 75.0},
@@ -52,36 +55,21 @@ def find_model_files(base_dir, task_id):
 
 def read_jsonl_with_tsv(jsonl_path, tsv_path, task_id):
     """读取JSONL文件并合并TSV中的ans"""
-    def extract_mea(measurements_str):
-        try:
-            fixed_str = measurements_str.replace("'", '"')
-            data = json.loads(fixed_str)
-            if isinstance(data, dict):
-                if task_id == '18':
-                    return data['EF']
-                elif task_id == '27':
-                    return list(data['IMT'])[0]
-                elif task_id == '31':
-                    return data
-                elif task_id == '50':
-                    return data['abdominal_circumference']
-                else:
-                    return data['fat value']
-            elif isinstance(data, list):
-                return list(data[0].values())[0]
-        except:
-            return 'nan' 
+    df_jsonl, _ = read_jsonl_columns(jsonl_path)
 
-    with open(jsonl_path, 'r') as f:
-        jsonl_data = [json.loads(line) for line in f]
-    df_jsonl = pd.DataFrame(jsonl_data)
-
-    df_tsv = pd.read_csv(tsv_path, sep='\t')
+    df_tsv = load_ground_truth(tsv_path, MEA_GT_COLUMNS)
 
+    # 按ID匹配TSV中的measurement_ans（参考答案文件中原样保存了该列）
     if 'id' in df_jsonl.columns and 'id' in df_tsv.columns:
         df_merged = pd.merge(df_jsonl, df_tsv[['id', 'measurement_ans']], on='id', how='left')
+    elif 'measurement_value' in df_tsv.columns:
+        # 参考答案文件中测量值已转换为数值，解析失败的样本还原为 'nan'，与逐行解析的结果一致
+        df_gt = df_tsv.assign(measurement_ans=df_tsv['measurement_value'].astype(object).where(
+            ~df_tsv['measurement_skip'], 'nan'))
+        df_merged = merge_ground_truth(df_jsonl, df_gt, {'measurement_ans': 'measurement_ans'})
     else:
-        df_merged = df_jsonl.assign(measurement_ans=df_tsv['measurement'].apply(extract_mea))
+        rule = dataset_rule('measure', task_id)
+        df_merged = df_jsonl.assign(measurement_ans=df_tsv['measurement'].apply(extract_measurement, rule=rule))
     return df_merged
 
 def extract_number(text):
@@ -190,6 +178,7 @@ def meaeval(data: pd.DataFrame, task_id: str, jsonl_path: str = None, **judge_kw
     #     })
     
     # try:
+    #     import pingouin as pg  # 导入较慢，恢复ICC计算时在此处按需导入
     #     icc_result = pg.intraclass_corr(
     #         data=icc_data,
     #         targets='target',
@@ -203,12 +192,40 @@ def meaeval(data: pd.DataFrame, task_id: str, jsonl_path: str = None, **judge_kw
             
     return metrics
 
-def batch_evaluate_all_tasks():
+def _prepare_ground_truth(tsv_path):
+    """启动进程池前在主进程中预先加载参考答案"""
+    load_ground_truth(tsv_path, MEA_GT_COLUMNS)
+
+def evaluate_pair(task_id, jsonl_path, tsv_path):
+    """评估单个模型结果文件，跳过时返回None"""
+    # 执行评估
+    if task_id == '31':
+        return None
+
+    # 读取数据
+    data = read_jsonl_with_tsv(jsonl_path, tsv_path, task_id)
+
+    # 从路径解析模型名称
+    model_name = jsonl_path.split('/')[-2]  # 根据实际路径结构调整
+    
+    metrics = meaeval(data, task_id, jsonl_path=jsonl_path)
+    if 'error' in metrics:
+        print(f"Skipped {model_name}@{task_id}: {metrics['error']}")
+        return None
+
+    print(f"Success to process {jsonl_path}")
+    return {
+        'task_id': task_id,
+        'model': model_name,
+        **metrics
+    }
+
+def batch_evaluate_all_tasks(workers=1, rescore=False):
     """批量处理所有任务的主函数"""
     base_dir = '/home/guohongcheng/DolphinV1.9p/measurement_processed'
     output_file = '/home/guohongcheng/DolphinV1.9p_results/mea_results.txt'
     
-    all_results = []
+    all_pairs = []
     
     for task_id in TSV_PATH:
         task_pairs = find_model_files(base_dir, task_id)
@@ -216,31 +233,13 @@ def batch_evaluate_all_tasks():
             print(f"Task {task_id} skipped: no files found")
             continue
         
-        for jsonl_path, tsv_path in task_pairs:
-            # try:
-            # 读取数据
-                data = read_jsonl_with_tsv(jsonl_path, tsv_path, task_id)
-
-                # 从路径解析模型名称
-                model_name = jsonl_path.split('/')[-2]  # 根据实际路径结构调整
-                
-                # 执行评估
-                if task_id == '31':
-                   continue
-                else:
-                    metrics = meaeval(data, task_id, jsonl_path=jsonl_path)
-                    if 'error' in metrics:
-                        print(f"Skipped {model_name}@{task_id}: {metrics['error']}")
-                        continue
-
-                    all_results.append({
-                        'task_id': task_id,
-                        'model': model_name,
-                        **metrics
-                    })
-                    print(f"Success to process {jsonl_path}")
-            # except Exception as e:
-            #     print(f"Failed to process {jsonl_path}: {str(e)}")
+        all_pairs.extend((task_id, jsonl_path, tsv_path) for jsonl_path, tsv_path in task_pairs)
+    
+    # 所有 (任务, 模型) 互相独立，统一调度执行；结果库中未过期的结果直接复用
+    all_results = run_pairs_incremental('qwen_measure', all_pairs, evaluate_pair, EVAL_VERSION,
+                                        workers=workers, prepare=_prepare_ground_truth, rescore=rescore,
+                                        kind='measure')
+    all_results = [res for res in all_results if res is not None]
     
     # 保存结果
     save_results(all_results, output_file)
@@ -269,4 +268,9 @@ def save_results(results, output_file):
 
 
 if __name__ == "__main__":
-    batch_evaluate_all_tasks()
+    parser = argparse.ArgumentParser(description='测量任务批量评估（Qwen输出）')
+    parser.add_argument('--workers', type=int, default=1, help='并行评估的进程数')
+    parser.add_argument('--rescore', action='store_true', help='忽略结果库，重新评估所有结果文件')
+    args = parser.parse_args()
+
+    batch_evaluate_all_tasks(workers=args.workers, rescore=args.rescore)
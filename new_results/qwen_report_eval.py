@@ -1,23 +1,31 @@
 import os
 import json
+import argparse
 import pandas as pd
 import numpy as np
 from datetime import datetime
-from pycocoevalcap.bleu.bleu import Bleu 
-from pycocoevalcap.rouge.rouge import Rouge 
-from transformers import AutoTokenizer, AutoModel
-import torch
+from dataset_manifest import tsv_paths
+from gt_loader import load_ground_truth
+from jsonl_loader import read_jsonl_columns
+from result_store import run_pairs_incremental
+from report_scoring import CachedBleu, CachedRouge
 #5月13日更新
 # 配置参数
 HAVE_LOCAL_BERTSCORE_MODEL = False
 LOCAL_MODEL_DIR = "/path/to/models"
 BERTSCORE_MODEL_NAME = "bert-base-multilingual-cased"
-TSV_PATH = {
-    '10': '/media/ps/data-ssd/json_processing/ale_tsv_output/10.tsv',
-    '11': '/media/ps/data-ssd/json_processing/ale_tsv_output/11.Thyroid_US_Images.tsv',
-    '39': '/media/ps/data-ssd/json_processing/ale_tsv_output/39_translated.tsv',
-    # '44': '/media/ps/data-ssd/json_processing/ale_tsv_output/44.COVID-BLUES-frames.tsv',
-}
+# BERTScore取第几层的输出（bert_score 对 bert-base-multilingual-cased 的默认值），之后的层不加载
+BERTSCORE_NUM_LAYERS = 9
+# CPU推理线程数，0 表示使用 torch 的默认值；也可通过环境变量 BERTSCORE_NUM_THREADS 或 --threads 设置
+BERTSCORE_NUM_THREADS = int(os.environ.get('BERTSCORE_NUM_THREADS', '0'))
+# TSV路径由数据集清单 datasets.json 生成（44在清单中标记为不评估）
+TSV_PATH = tsv_paths('report')
+
+# 报告任务只需要TSV中的参考报告列
+REPORT_GT_COLUMNS = ('caption',)
+
+# 评估程序版本，评分逻辑变化时递增，使结果库中的旧结果全部失效
+EVAL_VERSION = 1
 
 # 单例模型缓存
 class BertModelCache:
@@ -37,18 +45,24 @@ class BertModelCache:
         return cls._instance
 
     def load_bert_model(self):
-        """优化后的模型加载方法"""
+        """加载常驻的BERTScore编码器：只保留前 BERTSCORE_NUM_LAYERS 层，每个进程只加载一次"""
         try:
+            # torch/transformers 导入耗时数秒，只在第一次计算BERTScore时导入
+            import torch
+            from bert_score.utils import get_model, get_tokenizer
+            if BERTSCORE_NUM_THREADS > 0:
+                torch.set_num_threads(BERTSCORE_NUM_THREADS)
+
             if HAVE_LOCAL_BERTSCORE_MODEL:
                 model_path = f"{LOCAL_MODEL_DIR}/{BERTSCORE_MODEL_NAME}"
-                tokenizer = AutoTokenizer.from_pretrained(model_path)
-                model = AutoModel.from_pretrained(model_path)
             else:
-                tokenizer = AutoTokenizer.from_pretrained("bert-base-multilingual-cased")
-                model = AutoModel.from_pretrained("bert-base-multilingual-cased")
+                model_path = BERTSCORE_MODEL_NAME
+            tokenizer = get_tokenizer(model_path)
+            model = get_model(model_path, BERTSCORE_NUM_LAYERS)
 
             device = "cuda" if torch.cuda.is_available() else "cpu"
             model = model.to(device)
+            print(f"BERTScore模型已加载: {model_path}（前{BERTSCORE_NUM_LAYERS}层，{device}，{torch.get_num_threads()}线程）")
             return tokenizer, model, device
         except Exception as e:
             print(f"模型加载失败: {str(e)}")
@@ -56,6 +70,10 @@ class BertModelCache:
 
     @classmethod
     def clear_cache(cls):
+        # 没有加载过模型时不需要导入torch
+        if cls._instance is None:
+            return
+        import torch
         if torch.cuda.is_available():
             torch.cuda.empty_cache()
 
@@ -65,13 +83,9 @@ def batch_bertscore(refs_dict, hyps_dict):
     scores = {}
     
     try:
-        import bert_score
-        calc_params = {
-            "model_type": "bert-base-multilingual-cased",
-            "lang": "en",
-            "device": cache.device,
-            "batch_size": 8  
-        }
+        from bertscore_cache import cached_bertscore
+        if cache.model is None:
+            raise RuntimeError("BERTScore模型未加载")
 
         # 构建输入列表
         all_hyp, all_ref = [], []
@@ -83,9 +97,11 @@ def batch_bertscore(refs_dict, hyps_dict):
 
         # 批量计算
         if len(all_hyp) > 0:
-            _, _, F1 = bert_score.score(
-                all_hyp, all_ref,
-                **calc_params
+            # 使用常驻的编码器，按长度动态分批；参考报告的向量按文本哈希缓存在磁盘上，
+            # 同一任务的其他模型只需编码各自的生成报告
+            _, _, F1 = cached_bertscore(
+                all_hyp, all_ref, cache.model, cache.tokenizer, cache.device,
+                model_tag=f"{BERTSCORE_MODEL_NAME}_L{BERTSCORE_NUM_LAYERS}"
             )
             
             # 按案例聚合分数
@@ -97,8 +113,6 @@ def batch_bertscore(refs_dict, hyps_dict):
                     idx += len(refs)
     except Exception as e:
         print(f"BERTScore批量计算失败: {str(e)}")
-    finally:
-        BertModelCache.clear_cache()
     
     return scores
 
@@ -106,9 +120,10 @@ class MedicalReportScorer:
     def __init__(self, refs, hyps):
         self.refs = refs
         self.hyps = hyps
+        # 参考报告的分词和n-gram统计在同一任务的各模型间缓存复用，结果与 pycocoevalcap 一致
         self.scorers = [
-            (Bleu(4), 'Bleu'),
-            (Rouge(), 'Rouge')
+            (CachedBleu(4), 'Bleu'),
+            (CachedRouge(), 'Rouge')
         ]
 
     def evaluate(self):
@@ -185,11 +200,9 @@ def find_model_files(base_dir, task_id):
 def read_jsonl_with_tsv(jsonl_path, tsv_path):
     """读取JSONL文件并合并TSV中的参考报告"""
     # 读取生成报告
-    with open(jsonl_path, 'r') as f:
-        jsonl_data = [json.loads(line) for line in f]
-    df_jsonl = pd.DataFrame(jsonl_data)
+    df_jsonl, _ = read_jsonl_columns(jsonl_path)
 
-    df_tsv = pd.read_csv(tsv_path, sep='\t')
+    df_tsv = load_ground_truth(tsv_path, REPORT_GT_COLUMNS)
     
     # 打印调试信息
     print(f"JSONL文件行数: {len(df_jsonl)}")
@@ -257,8 +270,7 @@ def model_eval(data, jsonl_path=None):
             print(f"生成: {hyp[:100]}...")
             print(f"参考: {ref[:100]}...\n")
         # 计算单个样本的BLEU-1分数
-        from pycocoevalcap.bleu.bleu import Bleu
-        bleu_scorer = Bleu(4)
+        bleu_scorer = CachedBleu(4)
         sample_score, _ = bleu_scorer.compute_score({str(i): refs[str(i)]}, {str(i): hyps[str(i)]})
         print(f"单样本BLEU-1分数: {sample_score[0]*100:.4f}\n")
 
@@ -270,9 +282,39 @@ def model_eval(data, jsonl_path=None):
     # except Exception as e:
     #     return {'error': f"Evaluation failed: {str(e)}"}}
 
-def batch_evaluate_all_tasks(base_dir='data/report', output_file='results/report_results.txt'):
+def _prepare_ground_truth(tsv_path):
+    """启动进程池前在主进程中预先加载参考答案"""
+    load_ground_truth(tsv_path, REPORT_GT_COLUMNS)
+
+def evaluate_pair(task_id, jsonl_path, tsv_path):
+    """评估单个模型结果文件，跳过时返回None"""
+    # 读取数据
+    data = read_jsonl_with_tsv(jsonl_path, tsv_path)
+    if data.empty:
+        print(f"Skipped {jsonl_path}: empty data")
+        return None
+    
+    # 从路径解析模型名称
+    model_name = os.path.basename(os.path.dirname(jsonl_path))
     
-    all_results = []
+    # 执行评估
+    metrics = model_eval(data, jsonl_path=jsonl_path)
+    if 'error' in metrics:
+        print(f"Skipped {model_name}@{task_id}: {metrics['error']}")
+        return None
+    
+    print(f"Success to process {jsonl_path}")
+    # 记录结果
+    return {
+        'task_id': task_id,
+        'model': model_name,
+        'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        **metrics
+    }
+
+def batch_evaluate_all_tasks(base_dir='data/report', output_file='results/report_results.txt', workers=1, rescore=False):
+    
+    all_pairs = []
     
     for task_id in TSV_PATH:
         task_pairs = find_model_files(base_dir, task_id)
@@ -280,34 +322,15 @@ def batch_evaluate_all_tasks(base_dir='data/report', output_file='results/report
             print(f"Task {task_id} skipped: no files found")
             continue
         
-        for jsonl_path, tsv_path in task_pairs:
-            # try:
-            # 读取数据
-            data = read_jsonl_with_tsv(jsonl_path, tsv_path)
-            if data.empty:
-                print(f"Skipped {jsonl_path}: empty data")
-                continue
-            
-            # 从路径解析模型名称
-            model_name = os.path.basename(os.path.dirname(jsonl_path))
-            
-            # 执行评估
-            metrics = model_eval(data, jsonl_path=jsonl_path)
-            
-            if 'error' in metrics:
-                print(f"Skipped {model_name}@{task_id}: {metrics['error']}")
-                continue
-            
-            # 记录结果
-            all_results.append({
-                'task_id': task_id,
-                'model': model_name,
-                'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                **metrics
-            })
-            print(f"Success to process {jsonl_path}")
-            # except Exception as e:
-            #     print(f"Failed to process {jsonl_path}: {str(e)}")
+        all_pairs.extend((task_id, jsonl_path, tsv_path) for jsonl_path, tsv_path in task_pairs)
+    
+    # 所有 (任务, 模型) 互相独立，统一调度执行；结果库中未过期的结果直接复用
+    all_results = run_pairs_incremental('qwen_report', all_pairs, evaluate_pair, EVAL_VERSION,
+                                        workers=workers, prepare=_prepare_ground_truth, rescore=rescore,
+                                        kind='report')
+    all_results = [res for res in all_results if res is not None]
+    # 所有结果文件评估完后再释放显存缓存，评估过程中编码器一直常驻
+    BertModelCache.clear_cache()
     
     # 保存结果
     os.makedirs(os.path.dirname(output_file), exist_ok=True)
@@ -342,4 +365,12 @@ def save_results(results, output_file):
             f.write('\t'.join(row) + '\n')
 
 if __name__ == "__main__":
-    batch_evaluate_all_tasks()
+    parser = argparse.ArgumentParser(description='报告生成任务批量评估（Qwen输出）')
+    parser.add_argument('--workers', type=int, default=1, help='并行评估的进程数')
+    parser.add_argument('--rescore', action='store_true', help='忽略结果库，重新评估所有结果文件')
+    parser.add_argument('--threads', type=int, default=None, help='BERTScore在CPU上推理的线程数（默认使用torch的设置）')
+    args = parser.parse_args()
+    if args.threads is not None:
+        BERTSCORE_NUM_THREADS = args.threads
+
+    batch_evaluate_all_tasks(workers=args.workers, rescore=args.rescore)
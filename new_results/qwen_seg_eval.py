@@ -1,34 +1,22 @@
 import os
 import json
+import argparse
 import pandas as pd
 import numpy as np
-from sklearn.metrics import precision_score, recall_score, f1_score
 from datetime import datetime
+from dataset_manifest import tsv_paths
+from gt_loader import load_ground_truth, merge_ground_truth, extract_coordinates
+from jsonl_loader import read_jsonl_columns
+from result_store import run_pairs_incremental
 #5月13日更新
-# 预定义的TSV路径映射
-TSV_PATH = {
-        '04': '/media/ps/data-ssd/json_processing/ale_tsv_output/04.tsv',
-        '17': '/media/ps/data-ssd/json_processing/ale_tsv_output/17_1.tsv',
-        '23': '/media/ps/data-ssd/json_processing/ale_tsv_output/23.tsv',
-        '32': '/media/ps/data-ssd/json_processing/ale_tsv_output/32_image.tsv',
-        '64': '/media/ps/data-ssd/json_processing/ale_tsv_output/64.BrEaST-Lesions_USG-images_and_masks-Dec-15-2023.tsv',
+# TSV路径由数据集清单 datasets.json 生成（有精简参考答案文件时使用精简文件）
+TSV_PATH = tsv_paths('seg')
 
-        '09': '/media/ps/data-ssd/json_processing/ale_tsv_output/single_channel_seg/09.tsv',
-        '13': '/media/ps/data-ssd/json_processing/ale_tsv_output/single_channel_seg/13.tsv',
-        '16': '/media/ps/data-ssd/json_processing/ale_tsv_output/single_channel_seg/16.tsv',
-        '18': '/media/ps/data-ssd/json_processing/ale_tsv_output/single_channel_seg/18_1.Ultrasound_Heart_Segmentation_Dataset.tsv',
-        '31': '/media/ps/data-ssd/json_processing/ale_tsv_output/31.tsv',
-        '37': '/media/ps/data-ssd/json_processing/ale_tsv_output/single_channel_seg/37.tsv',
-        '38': '/media/ps/data-ssd/json_processing/ale_tsv_output/38.tsv',
-        '47': '/media/ps/data-ssd/json_processing/ale_tsv_output/47.tsv',
-        '49': '/media/ps/data-ssd/json_processing/ale_tsv_output/49.tsv',
-        '50': '/media/ps/data-ssd/json_processing/ale_tsv_output/50.tsv',
-        '52': '/media/ps/data-ssd/json_processing/ale_tsv_output/single_channel_seg/52.tsv',
-        '53': '/media/ps/data-ssd/json_processing/ale_tsv_output/single_channel_seg/53.tsv',
-        '67': '/media/ps/data-ssd/json_processing/ale_tsv_output/single_channel_seg/67.tsv',
+# 分割任务只需要TSV中的坐标列
+SEG_GT_COLUMNS = ('id', 'seg_ans', 'keypoints', 'gt_bbox')
 
-        '48': '/media/ps/data-ssd/json_processing/ale_tsv_output/single_keypoint/48.tsv'
-    }
+# 评估程序版本，评分逻辑变化时递增，使结果库中的旧结果全部失效
+EVAL_VERSION = 1
 
 def find_model_files(base_dir, task_id):
     """自动发现指定任务下的所有模型结果文件"""
@@ -59,25 +47,16 @@ def find_model_files(base_dir, task_id):
 
 def read_jsonl_with_tsv(jsonl_path, tsv_path):
     """读取JSONL文件并合并TSV中的seg_ans"""
-    def extract_coordinates(keypoints_str):
-        try:
-            fixed_str = keypoints_str.replace("'", '"')
-            data = json.loads(fixed_str)
-            if isinstance(data, dict):
-                return list(data.values())[0] # 这种情况下，默认只有一对坐标需要提取
-            else:
-                return list(data[0].values())[0] # 只取第一个
-        except:
-            return 'nan' 
-    with open(jsonl_path, 'r') as f:
-        jsonl_data = [json.loads(line) for line in f]
-    df_jsonl = pd.DataFrame(jsonl_data)
+    df_jsonl, _ = read_jsonl_columns(jsonl_path)
 
-    df_tsv = pd.read_csv(tsv_path, sep='\t')
-    
-    # 按ID匹配或行号匹配
+    df_tsv = load_ground_truth(tsv_path, SEG_GT_COLUMNS)
+
+    # 按ID匹配（参考答案文件中原样保存了seg_ans列）或行号匹配
     if 'id' in df_jsonl.columns and 'id' in df_tsv.columns:
         df_merged = pd.merge(df_jsonl, df_tsv[['id', 'seg_ans']], on='id', how='left')
+    elif 'seg_location' in df_tsv.columns:
+        # 参考答案文件中位置类别已预先算好，不再逐行解析坐标
+        df_merged = merge_ground_truth(df_jsonl, df_tsv, {'seg_location': 'seg_location'})
     else:
         if 'keypoints' in df_tsv.columns:
             df_merged = df_jsonl.assign(seg_ans=df_tsv['keypoints'].apply(extract_coordinates))
@@ -130,7 +109,6 @@ def get_bounding_box_location_v1(gt_bbox):
     
 
 def new_seg_eval(data, jsonl_path=None):
-    from sklearn.metrics import precision_score, recall_score, f1_score
     gt_list = []
     pred_list = []
     failed_items = 0
@@ -139,8 +117,11 @@ def new_seg_eval(data, jsonl_path=None):
     model_name = os.path.basename(os.path.dirname(jsonl_path)) if jsonl_path else None
     
     for _, row in data.iterrows():
-        gt_bbox = row['seg_ans']
-        gt = get_bounding_box_location_v1(gt_bbox)
+        # 使用参考答案文件时位置类别已预先算好
+        if 'seg_location' in data.columns:
+            gt = row['seg_location']
+        else:
+            gt = get_bounding_box_location_v1(row['seg_ans'])
         
         # 检查是否有 'model' 字段，如果没有，使用从路径中提取的模型名称
         if 'model' in data.columns and len(data['model']) > 0:
@@ -223,10 +204,37 @@ def new_seg_eval(data, jsonl_path=None):
         # 'f1': f1_score(gt_list, pred_list, average='macro')
     }
 
-def batch_evaluate_all_tasks(base_dir='data/seg', output_file='results/seg_results.txt'):
+def _prepare_ground_truth(tsv_path):
+    """启动进程池前在主进程中预先加载参考答案"""
+    load_ground_truth(tsv_path, SEG_GT_COLUMNS)
+
+def evaluate_pair(task_id, jsonl_path, tsv_path):
+    """评估单个模型结果文件，跳过时返回None"""
+    # 读取数据
+    data = read_jsonl_with_tsv(jsonl_path, tsv_path)
+
+    # 执行评估
+    metrics = new_seg_eval(data, jsonl_path=jsonl_path)
+    
+    # 从路径解析模型名称
+    model_name = jsonl_path.split('/')[-2]  # 根据实际路径结构调整
+    
+    if 'error' in metrics:
+        print(f"Skipped {model_name}@{task_id}: {metrics['error']}")
+        return None
+    
+    print(f"Success to process {jsonl_path}")
+    # 记录结果
+    return {
+        'task_id': task_id,
+        'model': model_name,
+        **metrics
+    }
+
+def batch_evaluate_all_tasks(base_dir='data/seg', output_file='results/seg_results.txt', workers=1, rescore=False):
     """批量处理所有任务的主函数"""
     
-    all_results = []
+    all_pairs = []
     
     for task_id in TSV_PATH:
         task_pairs = find_model_files(base_dir, task_id)
@@ -234,30 +242,13 @@ def batch_evaluate_all_tasks(base_dir='data/seg', output_file='results/seg_resul
             print(f"Task {task_id} skipped: no files found")
             continue
         
-        for jsonl_path, tsv_path in task_pairs:
-            try:
-                # 读取数据
-                data = read_jsonl_with_tsv(jsonl_path, tsv_path)
-
-                # 执行评估
-                metrics = new_seg_eval(data, jsonl_path=jsonl_path)
-                
-                # 从路径解析模型名称
-                model_name = jsonl_path.split('/')[-2]  # 根据实际路径结构调整
-                
-                if 'error' in metrics:
-                    print(f"Skipped {model_name}@{task_id}: {metrics['error']}")
-                    continue
-                
-                # 记录结果
-                all_results.append({
-                    'task_id': task_id,
-                    'model': model_name,
-                    **metrics
-                })
-                print(f"Success to process {jsonl_path}")
-            except Exception as e:
-                print(f"Failed to process {jsonl_path}: {str(e)}")
+        all_pairs.extend((task_id, jsonl_path, tsv_path) for jsonl_path, tsv_path in task_pairs)
+    
+    # 所有 (任务, 模型) 互相独立，统一调度执行；结果库中未过期的结果直接复用
+    all_results = run_pairs_incremental('qwen_seg', all_pairs, evaluate_pair, EVAL_VERSION,
+                                        workers=workers, prepare=_prepare_ground_truth, rescore=rescore,
+                                        kind='seg')
+    all_results = [res for res in all_results if res is not None]
     
     # 保存结果
     os.makedirs(os.path.dirname(output_file), exist_ok=True)
@@ -284,4 +275,9 @@ def save_results(results, output_file):
 # 保留原有的find_model_files等辅助函数
 
 if __name__ == "__main__":
-    batch_evaluate_all_tasks()
+    parser = argparse.ArgumentParser(description='分割任务批量评估（Qwen输出）')
+    parser.add_argument('--workers', type=int, default=1, help='并行评估的进程数')
+    parser.add_argument('--rescore', action='store_true', help='忽略结果库，重新评估所有结果文件')
+    args = parser.parse_args()
+
+    batch_evaluate_all_tasks(workers=args.workers, rescore=args.rescore)
@@ -0,0 +1,229 @@
+import math
+from collections import defaultdict
+import numpy as np
+
+# 与 pycocoevalcap 的 Bleu(4) / Rouge() 逐项等价的报告评分实现。
+# 同一任务的所有模型共用同一组参考报告，参考报告的分词、n-gram计数和LCS匹配位图只计算一次并缓存，
+# 之后每个模型只需处理自己的生成报告。评分公式、分词方式和浮点运算顺序与 pycocoevalcap 保持一致。
+
+# 缓存的参考报告条数上限，超过后清空重建，避免长时间运行的进程内存持续增长
+REFERENCE_CACHE_SIZE = 50000
+
+_BLEU_REF_CACHE = {}
+_ROUGE_REF_CACHE = {}
+_CACHE_STATS = {'hits': 0, 'misses': 0}
+
+
+def _cache_lookup(cache, key, build):
+    cooked = cache.get(key)
+    if cooked is not None:
+        _CACHE_STATS['hits'] += 1
+        return cooked
+    _CACHE_STATS['misses'] += 1
+    cooked = build()
+    if len(cache) >= REFERENCE_CACHE_SIZE:
+        cache.clear()
+    cache[key] = cooked
+    return cooked
+
+
+def reference_cache_stats():
+    """参考报告缓存的命中统计"""
+    return {
+        'hits': _CACHE_STATS['hits'],
+        'misses': _CACHE_STATS['misses'],
+        'bleu_refs': len(_BLEU_REF_CACHE),
+        'rouge_refs': len(_ROUGE_REF_CACHE),
+    }
+
+
+def clear_reference_cache():
+    _BLEU_REF_CACHE.clear()
+    _ROUGE_REF_CACHE.clear()
+    _CACHE_STATS['hits'] = 0
+    _CACHE_STATS['misses'] = 0
+
+
+def precook(s, n=4):
+    """空白分词并统计1~n阶n-gram，返回 (词数, n-gram计数)"""
+    words = s.split()
+    counts = defaultdict(int)
+    for k in range(1, n + 1):
+        for i in range(len(words) - k + 1):
+            counts[tuple(words[i:i + k])] += 1
+    return (len(words), counts)
+
+
+def _cook_refs(refs, n):
+    reflen = []
+    maxcounts = {}
+    for ref in refs:
+        rl, counts = precook(ref, n)
+        reflen.append(rl)
+        for ngram, count in counts.items():
+            maxcounts[ngram] = max(maxcounts.get(ngram, 0), count)
+    return (reflen, maxcounts)
+
+
+def cooked_refs(refs, n=4):
+    """一组参考报告的 (各参考词数, n-gram最大计数)，按参考内容缓存"""
+    key = (n, tuple(refs))
+    return _cache_lookup(_BLEU_REF_CACHE, key, lambda: _cook_refs(refs, n))
+
+
+def cook_test(test, refs, n=4):
+    """生成报告相对已处理参考的统计：最接近的参考长度、词数、各阶候选数和命中数"""
+    reflen, refmaxcounts = refs
+    testlen, counts = precook(test, n)
+
+    correct = [0] * n
+    for ngram, count in counts.items():
+        correct[len(ngram) - 1] += min(refmaxcounts.get(ngram, 0), count)
+
+    return {
+        'reflen': min((abs(l - testlen), l) for l in reflen)[1],
+        'testlen': testlen,
+        'guess': [max(0, testlen - k + 1) for k in range(1, n + 1)],
+        'correct': correct,
+    }
+
+
+class CachedBleu:
+    """与 pycocoevalcap Bleu(n).compute_score 接口和结果一致（closest参考长度）"""
+
+    def __init__(self, n=4):
+        self._n = n
+
+    def compute_score(self, gts, res, verbose=1):
+        assert(gts.keys() == res.keys())
+        n = self._n
+        small = 1e-9
+        tiny = 1e-15
+
+        ctest = []
+        for id in gts.keys():
+            hypo = res[id]
+            ref = gts[id]
+            assert(type(hypo) is list)
+            assert(len(hypo) == 1)
+            assert(type(ref) is list)
+            assert(len(ref) >= 1)
+            refs = cooked_refs(ref, n)
+            # 与 pycocoevalcap 相同：缺失的生成报告在汇总时才报错
+            ctest.append(None if hypo[0] is None else cook_test(hypo[0], refs, n))
+
+        bleu_list = [[] for _ in range(n)]
+        total_testlen = 0
+        total_reflen = 0
+        total_guess = [0] * n
+        total_correct = [0] * n
+
+        for comps in ctest:
+            testlen = comps['testlen']
+            reflen = comps['reflen']
+            total_testlen += testlen
+            total_reflen += reflen
+            for k in range(n):
+                total_guess[k] += comps['guess'][k]
+                total_correct[k] += comps['correct'][k]
+
+            bleu = 1.
+            for k in range(n):
+                bleu *= (float(comps['correct'][k]) + tiny) / (float(comps['guess'][k]) + small)
+                bleu_list[k].append(bleu ** (1. / (k + 1)))
+            ratio = (testlen + tiny) / (reflen + small)
+            if ratio < 1:
+                for k in range(n):
+                    bleu_list[k][-1] *= math.exp(1 - 1 / ratio)
+
+        bleus = []
+        bleu = 1.
+        for k in range(n):
+            bleu *= float(total_correct[k] + tiny) / (total_guess[k] + small)
+            bleus.append(bleu ** (1. / (k + 1)))
+        ratio = (total_testlen + tiny) / (total_reflen + small)
+        if ratio < 1:
+            for k in range(n):
+                bleus[k] *= math.exp(1 - 1 / ratio)
+
+        if verbose > 0:
+            print({'testlen': total_testlen, 'reflen': total_reflen, 'guess': total_guess, 'correct': total_correct})
+            print("ratio:", ratio)
+
+        return bleus, bleu_list
+
+    def method(self):
+        return "Bleu"
+
+
+def _rouge_ref(reference):
+    """参考报告按单个空格分词，并为每个词记录其出现位置的位图，供位并行LCS使用"""
+    tokens = reference.split(" ")
+    masks = {}
+    for i, token in enumerate(tokens):
+        masks[token] = masks.get(token, 0) | (1 << i)
+    return (len(tokens), masks)
+
+
+def lcs_length(ref_len, ref_masks, tokens):
+    """位并行求最长公共子序列长度（Allison-Dix），与动态规划 my_lcs 结果相同"""
+    full = (1 << ref_len) - 1
+    v = full
+    for token in tokens:
+        m = ref_masks.get(token)
+        if m is None:
+            continue
+        u = v & m
+        v = ((v + u) | (v - u)) & full
+    return ref_len - bin(v).count('1')
+
+
+class CachedRouge:
+    """与 pycocoevalcap Rouge().compute_score 接口和结果一致的ROUGE-L"""
+
+    def __init__(self):
+        self.beta = 1.2
+
+    def calc_score(self, candidate, refs):
+        assert(len(candidate) == 1)
+        assert(len(refs) > 0)
+        prec = []
+        rec = []
+
+        token_c = candidate[0].split(" ")
+
+        for reference in refs:
+            ref_len, ref_masks = _cache_lookup(_ROUGE_REF_CACHE, reference, lambda: _rouge_ref(reference))
+            lcs = lcs_length(ref_len, ref_masks, token_c)
+            prec.append(lcs / float(len(token_c)))
+            rec.append(lcs / float(ref_len))
+
+        prec_max = max(prec)
+        rec_max = max(rec)
+
+        if prec_max != 0 and rec_max != 0:
+            score = ((1 + self.beta ** 2) * prec_max * rec_max) / float(rec_max + self.beta ** 2 * prec_max)
+        else:
+            score = 0.0
+        return score
+
+    def compute_score(self, gts, res):
+        assert(gts.keys() == res.keys())
+
+        score = []
+        for id in gts.keys():
+            hypo = res[id]
+            ref = gts[id]
+
+            score.append(self.calc_score(hypo, ref))
+
+            assert(type(hypo) is list)
+            assert(len(hypo) == 1)
+            assert(type(ref) is list)
+            assert(len(ref) > 0)
+
+        average_score = np.mean(np.array(score))
+        return average_score, np.array(score)
+
+    def method(self):
+        return "Rouge"
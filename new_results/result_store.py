@@ -0,0 +1,117 @@
+import os
+import json
+import pickle
+from gt_loader import tsv_fingerprint
+from dataset_manifest import dataset_rule, parse_rule
+from parallel_eval import run_pairs
+
+# 评估结果持久化目录，可通过环境变量 RESULT_STORE_DIR 覆盖
+RESULT_STORE_DIR = os.environ.get(
+    'RESULT_STORE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.result_store')
+)
+
+
+def _store_path(name):
+    return os.path.join(RESULT_STORE_DIR, f'{name}.pkl')
+
+
+def load_store(name):
+    """读取某个评估程序的结果库：{(task_id, jsonl绝对路径): (签名, 结果记录)}"""
+    path = _store_path(name)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except Exception as e:
+        print(f"警告：读取结果库失败 {path}，全部重新评估，错误: {e}")
+        return {}
+
+
+def save_store(name, store):
+    """原子写入结果库，中途中断不会留下损坏的文件"""
+    path = _store_path(name)
+    try:
+        os.makedirs(RESULT_STORE_DIR, exist_ok=True)
+        tmp_file = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_file, 'wb') as f:
+            pickle.dump(store, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, path)
+    except Exception as e:
+        print(f"警告：写入结果库失败 {path}，错误: {e}")
+
+
+def task_rule_key(kind, task_id):
+    """数据集清单中该任务解析规则（measurement_key、first_item 等）的稳定表示；kind 为None或清单不可用时返回None"""
+    if kind is None:
+        return None
+    try:
+        return json.dumps(parse_rule(dataset_rule(kind, task_id)), sort_keys=True, ensure_ascii=False)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"警告：读取任务 {task_id} 的解析规则失败，错误: {e}")
+        return None
+
+
+def pair_signature(jsonl_path, tsv_path, eval_version, rule_key=None):
+    """结果签名：JSONL大小和修改时间 + TSV指纹 + 评估程序版本 + 解析规则，任一变化即视为过期"""
+    st = os.stat(jsonl_path)
+    return (st.st_size, st.st_mtime_ns, tsv_fingerprint(tsv_path), eval_version, rule_key)
+
+
+def plan_incremental(name, pairs, eval_version, rescore=False, kind=None):
+    """对照结果库把 pairs 分为可复用和需要重新评估两部分
+
+    kind 为数据集清单中的任务类型（cla/seg/measure/report），清单中该任务的解析规则变化时结果视为过期。
+    返回 (results, stale, signatures, store)：results 中可复用的位置已填好缓存结果，
+    stale 为需要重新评估的下标列表；评估完后把新结果交给 commit_incremental 写回结果库。
+    """
+    store = load_store(name)
+    results = [None] * len(pairs)
+    stale = []
+    signatures = {}
+    rule_keys = {}
+
+    for idx, (task_id, jsonl_path, tsv_path) in enumerate(pairs):
+        try:
+            if task_id not in rule_keys:
+                rule_keys[task_id] = task_rule_key(kind, task_id)
+            signature = pair_signature(jsonl_path, tsv_path, eval_version, rule_keys[task_id])
+        except OSError:
+            signature = None
+        signatures[idx] = signature
+        cached = store.get((task_id, os.path.abspath(jsonl_path)))
+        if not rescore and signature is not None and cached is not None and cached[0] == signature:
+            results[idx] = cached[1]
+        else:
+            stale.append(idx)
+
+    print(f"结果库 {name}: 共 {len(pairs)} 个结果文件，复用 {len(pairs) - len(stale)} 个，重新评估 {len(stale)} 个")
+    return results, stale, signatures, store
+
+
+def commit_incremental(name, pairs, results, stale, signatures, store, fresh):
+    """把 stale 对应的新结果 fresh 填入 results 并写回结果库（返回None的不写入）"""
+    for idx, res in zip(stale, fresh):
+        results[idx] = res
+        if res is not None and signatures[idx] is not None:
+            task_id, jsonl_path, _ = pairs[idx]
+            store[(task_id, os.path.abspath(jsonl_path))] = (signatures[idx], res)
+    if stale:
+        save_store(name, store)
+    return results
+
+
+def run_pairs_incremental(name, pairs, worker, eval_version, workers=1, prepare=None, rescore=False, kind=None):
+    """只重新评估结果库中过期或缺失的 (task_id, jsonl_path, tsv_path)，与缓存结果合并后按输入顺序返回
+
+    name 区分不同评估程序的结果库（如 'cla'、'qwen_seg'）；eval_version 为评估程序的版本号，
+    评分逻辑变化时递增即可让所有旧结果失效；kind 为数据集清单中的任务类型，用于把解析规则计入签名。rescore=True 时忽略结果库全部重新评估。
+    失败或被跳过（返回None）的文件不写入结果库，下次运行会再次尝试。
+    """
+    results, stale, signatures, store = plan_incremental(name, pairs, eval_version, rescore, kind)
+    if not stale:
+        return results
+
+    fresh = run_pairs([pairs[idx] for idx in stale], worker, workers=workers, prepare=prepare)
+    return commit_incremental(name, pairs, results, stale, signatures, store, fresh)
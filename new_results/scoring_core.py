@@ -0,0 +1,154 @@
+import os
+import math
+import numpy as np
+import pandas as pd
+
+# 回复开头带多余空格、需要去掉第一个空格的模型
+LLAVA_MODEL_NAME = 'LLaVA-1.5-13B-HF'
+
+LOW_THRESHOLD = 0.45
+HIGH_THRESHOLD = 0.55
+
+# 按 (纵向档位, 横向档位) 查表得到位置描述，档位 0/1/2 分别对应 < LOW、< HIGH、>= HIGH
+LOCATION_TABLE = np.array([
+    ['upper left', 'upper center', 'upper right'],
+    ['middle left', 'center', 'middle right'],
+    ['lower left', 'lower center', 'lower right'],
+], dtype=object)
+
+
+def resolve_model_name(data, jsonl_path=None):
+    """确定当前结果文件的模型名：优先取model列第一行，否则取文件所在目录名"""
+    if 'model' in data.columns and len(data['model']) > 0:
+        return data['model'][0]
+    return os.path.basename(os.path.dirname(jsonl_path)) if jsonl_path else None
+
+
+def raw_responses(data, jsonl_path=None):
+    """整列取出模型回复，LLaVA模型去掉第一个空格"""
+    responses = data['response']
+    if resolve_model_name(data, jsonl_path) == LLAVA_MODEL_NAME:
+        responses = responses.str.replace(' ', '', n=1, regex=False)
+    return responses
+
+
+def _object_values(series):
+    """取出与 iterrows 逐行访问时相同的Python对象（int64列得到int，float64列得到float）"""
+    return series.astype(object).to_numpy()
+
+
+def classification_pairs(data, jsonl_path=None):
+    """按列清洗分类任务的参考答案和预测值，返回 (y_true, y_pred, failed_items)
+
+    与原逐行逻辑一致：字符串答案去掉方括号、统一小写并去除首尾空格和引号；
+    整数答案要求预测值能转成整数，否则计为失败样本；其余类型原样比较。
+    """
+    preds = raw_responses(data, jsonl_path).str.strip().str.strip("'\"")
+    answers = _object_values(data['cla_ans'])
+    pred_values = _object_values(preds)
+
+    is_str = np.fromiter((isinstance(v, str) for v in answers), dtype=bool, count=len(answers))
+    is_int = np.fromiter((isinstance(v, int) for v in answers), dtype=bool, count=len(answers))
+    is_int &= ~is_str
+
+    y_true = answers.copy()
+    y_pred = pred_values.copy()
+    keep = np.ones(len(answers), dtype=bool)
+
+    if is_str.any():
+        true_str = pd.Series(answers[is_str], dtype=object)
+        has_bracket = true_str.str.contains('[', regex=False)
+        true_str = true_str.where(
+            ~has_bracket,
+            true_str.str.replace('[', '', regex=False).str.replace(']', '', regex=False)
+        )
+        true_str = true_str.str.lower().str.strip().str.strip("'\"")
+        y_true[is_str] = true_str.to_numpy(dtype=object)
+        y_pred[is_str] = pd.Series(pred_values[is_str], dtype=object).str.lower().to_numpy(dtype=object)
+
+    for idx in np.flatnonzero(is_int):
+        try:
+            y_pred[idx] = int(pred_values[idx])
+        except Exception:
+            keep[idx] = False
+
+    failed_items = int((~keep).sum())
+    return y_true[keep].tolist(), y_pred[keep].tolist(), failed_items
+
+
+def _bbox_center(gt_bbox):
+    """取出边界框中心坐标，无效时返回 (nan, nan)"""
+    if not isinstance(gt_bbox, (list, tuple)) or len(gt_bbox) < 2:
+        return math.nan, math.nan
+    try:
+        return float(gt_bbox[0]), float(gt_bbox[1])
+    except (ValueError, TypeError):
+        return math.nan, math.nan
+
+
+def bbox_centers(seg_ans):
+    """整列取出边界框中心坐标，返回 (n, 2) 数组，无效坐标为 nan"""
+    values = _object_values(pd.Series(seg_ans))
+    return np.array([_bbox_center(v) for v in values], dtype=float).reshape(-1, 2)
+
+
+def center_locations(centers):
+    """按中心坐标查表得到位置类别，坐标为 nan 时为 'not visible'"""
+    center_x, center_y = centers[:, 0], centers[:, 1]
+
+    y_level = (center_y >= LOW_THRESHOLD).astype(int) + (center_y >= HIGH_THRESHOLD).astype(int)
+    x_level = (center_x >= LOW_THRESHOLD).astype(int) + (center_x >= HIGH_THRESHOLD).astype(int)
+    locations = LOCATION_TABLE[y_level, x_level]
+    locations[np.isnan(center_x) | np.isnan(center_y)] = 'not visible'
+    return locations
+
+
+def bbox_locations(seg_ans):
+    """整列计算边界框的位置类别，结果与 get_bounding_box_location_v1 逐个计算一致"""
+    return center_locations(bbox_centers(seg_ans))
+
+
+def segmentation_pairs(data, jsonl_path=None):
+    """按列计算分割任务的位置类别和预测值，返回 (gt, pred, failed_items)
+
+    回复为空或为 'failed' 的样本计为失败样本并被剔除。
+    """
+    # 使用参考答案文件时位置类别已预先算好
+    if 'seg_location' in data.columns:
+        gt = data['seg_location'].to_numpy(dtype=object)
+    else:
+        gt = bbox_locations(data['seg_ans'])
+    preds = raw_responses(data, jsonl_path).str.lower()
+    failed = (preds.isna() | (preds == 'failed')).to_numpy(dtype=bool)
+    keep = ~failed
+    return gt[keep], preds.to_numpy(dtype=object)[keep], int(failed.sum())
+
+
+def _to_float(values):
+    """逐个按 float() 转换，返回 (数值数组, 是否转换成功)"""
+    out = np.full(len(values), np.nan)
+    ok = np.ones(len(values), dtype=bool)
+    for idx, v in enumerate(values):
+        try:
+            out[idx] = float(v)
+        except Exception:
+            ok[idx] = False
+    return out, ok
+
+
+def measurement_pairs(data, jsonl_path=None):
+    """按列取出测量任务的参考值和预测值，返回 (y_true, y_pred, failed_items)
+
+    参考值为列表时取第一个元素，为 'nan' 的样本直接跳过（不计为失败）；
+    预测值无法转换为浮点数的样本计为失败样本。
+    """
+    answers = [v[0] if isinstance(v, list) else v for v in _object_values(data['measurement_ans'])]
+    skip = np.fromiter((isinstance(v, str) and v == 'nan' for v in answers), dtype=bool, count=len(answers))
+
+    pred_values = _object_values(raw_responses(data, jsonl_path))[~skip]
+    y_pred, ok = _to_float(pred_values)
+
+    kept_answers = np.empty(int((~skip).sum()), dtype=object)
+    kept_answers[:] = [v for v, s in zip(answers, skip) if not s]
+    y_true = kept_answers[ok].astype(float)
+    return y_true, y_pred[ok], int((~ok).sum())
@@ -7,139 +7,289 @@ import re
 import logging
 from pathlib import Path
 import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from shard_utils import plan_shards, iter_shard_lines, merge_parts, remove_part_files
 
-# 设置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    filename='extract_measurement_values_improved.log'
-)
+# 每个任务的数值提取模式，按顺序尝试，第一个命中的模式生效；每个模式只有一个捕获组
+EXTRACTOR_PATTERNS = {
+    # 针对任务ID 57的特殊处理（肝脏脂肪含量评估）
+    '57': [
+        r'around (\d+)',
+        r'value of (\d+)',
+        r'value around (\d+)',
+        r'indicative of (\d+)',
+        r'justify a fat value of (\d+)',
+        r'fat value (?:of |around |about )?(\d+)',
+        r'fat content (?:of |around |about )?(\d+)',
+        r'fat percentage (?:of |around |about )?(\d+)',
+        r'(\d+)%',  # 百分比格式
+        r'(\d+)'    # 最后尝试匹配任何整数
+    ],
+    # 针对任务ID 50的特殊处理（IMT测量）
+    '50': [
+        r'imt (?:of |is |value |measurement |measures |approximately |about |around |)(\d+\.?\d*)',
+        r'imt (?:of |is |value |measurement |measures |approximately |about |around |)(\d+)',
+        r'(\d+\.?\d*)\s*(?:mm|millimeters|millimeter)',
+        r'(\d+\.?\d*)',  # 匹配任何数字（整数或浮点数）
+        r'(\d+)'         # 匹配任何整数
+    ],
+    # 通用处理逻辑，适用于其他任务ID
+    'default': [
+        # 带单位的测量值
+        r'(\d+\.?\d*)\s*(?:mm|cm|ml|g|kg|%)',
+        # 带描述的测量值
+        r'(?:value|measurement|result|reading) (?:of |is |approximately |about |around |)(\d+\.?\d*)',
+        # 任何浮点数
+        r'(\d+\.\d+)',
+        # 任何整数
+        r'(\d+)'
+    ],
+}
 
-def extract_number_from_response(response, task_id):
-    """从响应中提取数值，根据任务ID使用不同的提取策略"""
+NUMERIC_RE = re.compile(r'^\d+\.?\d*$')
+DIGIT_RE = re.compile(r'\d')
+
+# 每个文件每类提取结果写入日志的样例条数，其余只计数
+LOG_SAMPLES_PER_KIND = 3
+
+# 多进程模式下每个分片的目标大小(MB)
+SHARD_MB = 32
+
+
+def compile_extractor_plan(patterns):
+    """把按顺序尝试的模式列表合并为一个正则，返回 (合并后的正则, 捕获组序号 -> 模式序号)
+
+    每个模式放进从开头出发的前瞻 (?=[\s\S]*?(...)) 中，交替分支按顺序尝试，
+    因此命中的一定是列表中第一个能在回复中任意位置匹配的模式，匹配位置与单独 re.search 相同。
+    """
+    branches = []
+    group_to_pattern = {}
+    group_index = 0
+    for pattern_idx, pattern in enumerate(patterns):
+        group_index += 1
+        group_to_pattern[group_index] = pattern_idx
+        group_index += re.compile(pattern).groups - 1
+        branches.append(r'(?=[\s\S]*?' + pattern + ')')
+    return re.compile('^(?:' + '|'.join(branches) + ')'), group_to_pattern
+
+
+# 按任务ID预先编译好的提取计划
+EXTRACTOR_PLANS = {task_id: compile_extractor_plan(patterns) for task_id, patterns in EXTRACTOR_PATTERNS.items()}
+
+
+def extract_number_with_source(response, task_id):
+    """从响应中提取数值，返回 (数值或'null', 提取方式)
+
+    提取方式为 'empty'、'numeric'（原样就是数字）、'no_digit'、'no_match'，
+    或 '模式N'（命中当前任务的第N个模式）。
+    """
     if not response or response.lower() == 'null':
-        return 'null'
+        return 'null', 'empty'
     
     # 检查响应是否已经是一个纯数字（整数或浮点数）
     clean_response = response.strip()
-    if re.match(r'^\d+\.?\d*$', clean_response):
-        return clean_response
+    if NUMERIC_RE.match(clean_response):
+        return clean_response, 'numeric'
     
     # 检查响应中是否包含任何数字
-    if not re.search(r'\d', response):
-        logging.info(f"响应中不包含数字，返回null (任务ID: {task_id}): '{response}'")
-        return 'null'
+    if not DIGIT_RE.search(response):
+        return 'null', 'no_digit'
     
     # 标准化响应文本
     response = response.lower().strip()
     
-    # 针对不同任务ID使用不同的提取策略
-    if task_id == '57':
-        # 针对任务ID 57的特殊处理（肝脏脂肪含量评估）
-        patterns = [
-            r'around (\d+)',
-            r'value of (\d+)',
-            r'value around (\d+)',
-            r'indicative of (\d+)',
-            r'justify a fat value of (\d+)',
-            r'fat value (?:of |around |about )?(\d+)',
-            r'fat content (?:of |around |about )?(\d+)',
-            r'fat percentage (?:of |around |about )?(\d+)',
-            r'(\d+)%',  # 百分比格式
-            r'(\d+)'    # 最后尝试匹配任何整数
-        ]
-    elif task_id == '50':
-        # 针对任务ID 50的特殊处理（IMT测量）
-        patterns = [
-            r'imt (?:of |is |value |measurement |measures |approximately |about |around |)(\d+\.?\d*)',
-            r'imt (?:of |is |value |measurement |measures |approximately |about |around |)(\d+)',
-            r'(\d+\.?\d*)\s*(?:mm|millimeters|millimeter)',
-            r'(\d+\.?\d*)',  # 匹配任何数字（整数或浮点数）
-            r'(\d+)'         # 匹配任何整数
-        ]
-    else:
-        # 通用处理逻辑，适用于其他任务ID
-        patterns = [
-            # 带单位的测量值
-            r'(\d+\.?\d*)\s*(?:mm|cm|ml|g|kg|%)',
-            # 带描述的测量值
-            r'(?:value|measurement|result|reading) (?:of |is |approximately |about |around |)(\d+\.?\d*)',
-            # 任何浮点数
-            r'(\d+\.\d+)',
-            # 任何整数
-            r'(\d+)'
-        ]
-    
-    # 尝试所有模式匹配
-    for pattern in patterns:
-        match = re.search(pattern, response)
-        if match:
-            return match.group(1)
-    
-    # 如果没有找到数值，记录并返回null
-    logging.warning(f"未能提取数值，返回null (任务ID: {task_id}): '{response}'")
-    return 'null'
-
-def process_jsonl_file(input_file, output_file, task_id):
-    """处理单个JSONL文件，提取数值"""
-    processed_entries = 0
-    extracted_values = 0
-    failed_extractions = 0
+    # 针对不同任务ID使用不同的提取计划，一次匹配同时得到命中的模式
+    plan, group_to_pattern = EXTRACTOR_PLANS.get(task_id, EXTRACTOR_PLANS['default'])
+    match = plan.match(response)
+    if match:
+        group = match.lastindex
+        return match.group(group), f'模式{group_to_pattern[group] + 1}'
     
+    return 'null', 'no_match'
+
+def extract_number_from_response(response, task_id):
+    """从响应中提取数值，根据任务ID使用不同的提取策略"""
+    return extract_number_with_source(response, task_id)[0]
+
+def clean_measurement_record(data, task_id):
+    """从一条模型结果中提取数值，原地更新 response 并保存 original_response
+
+    返回 (原始响应, 提取值, 提取方式)。
+    """
+    original_response = data['response']
+    
+    # 提取数值
+    extracted_value, source = extract_number_with_source(original_response, task_id)
+    
+    # 更新响应
+    data['original_response'] = original_response
+    data['response'] = extracted_value
+    return original_response, extracted_value, source
+
+def new_stats():
+    """单个文件（或分片）的提取统计"""
+    return {
+        'entries': 0,       # 处理的行数
+        'extracted': 0,     # 成功提取为数值
+        'null': 0,          # 提取结果为null
+        'failed': 0,        # 其他无法识别的结果
+        'errors': 0,        # JSON解析或处理出错的行
+        'sources': {},      # 各提取方式的条数
+        'samples': {},      # 各提取方式的样例 [(原始响应, 提取值)]
+        'error_samples': [],
+    }
+
+def merge_stats(total, part):
+    """把分片或文件的统计合并到total中（样例只保留前几条）"""
+    for key in ('entries', 'extracted', 'null', 'failed', 'errors'):
+        total[key] += part[key]
+    for source, count in part['sources'].items():
+        total['sources'][source] = total['sources'].get(source, 0) + count
+    for source, kind_samples in part['samples'].items():
+        merged = total['samples'].setdefault(source, [])
+        merged.extend(kind_samples[:LOG_SAMPLES_PER_KIND - len(merged)])
+    total['error_samples'].extend(part['error_samples'][:LOG_SAMPLES_PER_KIND - len(total['error_samples'])])
+    return total
+
+def process_lines(lines, f_out, task_id, stats):
+    """逐行提取数值并写入f_out，统计信息累加到stats中"""
+    for line in lines:
+        stats['entries'] += 1
+        try:
+            data = json.loads(line.strip())
+            original_response, extracted_value, source = clean_measurement_record(data, task_id)
+            
+            # 检查是否成功提取数值
+            # 如果提取的值是纯数字，则视为成功提取
+            if NUMERIC_RE.match(str(extracted_value)):
+                stats['extracted'] += 1
+            elif extracted_value == 'null':
+                stats['null'] += 1
+            else:
+                stats['failed'] += 1
+            
+            stats['sources'][source] = stats['sources'].get(source, 0) + 1
+            kind_samples = stats['samples'].setdefault(source, [])
+            if len(kind_samples) < LOG_SAMPLES_PER_KIND:
+                kind_samples.append((original_response, extracted_value))
+            
+            # 写入处理后的数据
+            f_out.write(json.dumps(data, ensure_ascii=False) + '\n')
+            
+        except json.JSONDecodeError:
+            stats['errors'] += 1
+            if len(stats['error_samples']) < LOG_SAMPLES_PER_KIND:
+                stats['error_samples'].append(f"JSON解析错误: {line}")
+        except Exception as e:
+            stats['errors'] += 1
+            if len(stats['error_samples']) < LOG_SAMPLES_PER_KIND:
+                stats['error_samples'].append(f"处理行时出错: {str(e)}, 行内容: {line}")
+    return stats
+
+def log_file_stats(input_file, task_id, stats):
+    """每个文件写一条汇总日志，每种提取方式附少量样例"""
+    for message in stats['error_samples']:
+        logging.error(message)
+    logging.info(f"文件 {input_file} (任务ID: {task_id}): 共 {stats['entries']} 条, 成功提取 {stats['extracted']}, "
+                 f"null {stats['null']}, 失败 {stats['failed']}, 出错 {stats['errors']}, 提取方式统计: {stats['sources']}")
+    for source, kind_samples in stats['samples'].items():
+        for original_response, extracted_value in kind_samples:
+            level = logging.WARNING if extracted_value == 'null' and source != 'empty' else logging.INFO
+            logging.log(level, f"样例 [{source}] (任务ID: {task_id}): '{original_response}' -> '{extracted_value}'")
+
+def process_jsonl_file(input_file, output_file, task_id, return_stats=False):
+    """处理单个JSONL文件，提取数值
+
+    日志中每个文件只写一条汇总（各提取方式的条数），每种提取方式附少量样例，不再逐行记录。
+    """
     # 确保输出目录存在
-    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    if os.path.dirname(output_file):
+        os.makedirs(os.path.dirname(output_file), exist_ok=True)
     
     with open(input_file, 'r', encoding='utf-8') as f_in, \
          open(output_file, 'w', encoding='utf-8') as f_out:
-        
-        for line in f_in:
-            processed_entries += 1
+        stats = process_lines(f_in, f_out, task_id, new_stats())
+    
+    log_file_stats(input_file, task_id, stats)
+    if return_stats:
+        return stats
+    return stats['entries'], stats['extracted'], stats['null'] + stats['failed']
+
+def process_shard(input_file, part_file, task_id, start, end):
+    """处理文件中 [start, end) 字节范围内的行，写入临时分片文件，返回统计信息"""
+    lines = (line.decode('utf-8') for line in iter_shard_lines(input_file, start, end))
+    with open(part_file, 'w', encoding='utf-8') as f_out:
+        return process_lines(lines, f_out, task_id, new_stats())
+
+def process_files_parallel(jobs, workers, shard_mb=SHARD_MB):
+    """并行处理 [(task_id, 输入文件, 输出文件)]，返回每个文件的统计信息（与jobs顺序一致）
+
+    文件按换行对齐切成字节分片，所有分片交给进程池；每个分片写入各自的临时文件，
+    完成后按原顺序拼接并原子替换为输出文件，结果与串行处理相同。
+    某个分片整体失败（如读取或解码出错）时只跳过该文件（统计为空），记录错误并删除它的分片临时文件。
+    """
+    shard_bytes = int(shard_mb * 1024 * 1024)
+    shards = []
+    for file_idx, (task_id, input_file, output_file) in enumerate(jobs):
+        if os.path.dirname(output_file):
+            os.makedirs(os.path.dirname(output_file), exist_ok=True)
+        for shard_idx, (start, end) in enumerate(plan_shards(input_file, shard_bytes)):
+            part_file = f"{output_file}.part{shard_idx:05d}.{os.getpid()}.tmp"
+            shards.append((file_idx, shard_idx, task_id, input_file, part_file, start, end))
+    print(f"共 {len(jobs)} 个文件，切分为 {len(shards)} 个分片，使用 {workers} 个进程")
+
+    shard_stats = {}
+    failed = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # 大分片先提交，避免最后才开始的大分片拖慢整体
+        futures = {
+            executor.submit(process_shard, input_file, part_file, task_id, start, end): (file_idx, shard_idx)
+            for file_idx, shard_idx, task_id, input_file, part_file, start, end
+            in sorted(shards, key=lambda shard: shard[6] - shard[5], reverse=True)
+        }
+        for future in as_completed(futures):
+            file_idx, shard_idx = futures[future]
             try:
-                data = json.loads(line.strip())
-                original_response = data['response']
-                
-                # 提取数值
-                extracted_value = extract_number_from_response(original_response, task_id)
-                
-                # 检查是否成功提取数值
-                # 如果提取的值是纯数字，则视为成功提取
-                if re.match(r'^\d+\.?\d*$', str(extracted_value)):
-                    extracted_values += 1
-                    if extracted_value != original_response:
-                        logging.info(f"成功提取 (任务ID: {task_id}): '{original_response}' -> '{extracted_value}'")
-                    else:
-                        logging.info(f"原始响应已是数值 (任务ID: {task_id}): '{original_response}'")
-                elif extracted_value == 'null':
-                    failed_extractions += 1
-                    # 日志已在extract_number_from_response函数中记录
-                else:
-                    failed_extractions += 1
-                    logging.warning(f"未能提取数值 (任务ID: {task_id}): '{original_response}'")
-                
-                # 更新响应
-                data['original_response'] = original_response
-                data['response'] = extracted_value
-                
-                # 写入处理后的数据
-                f_out.write(json.dumps(data, ensure_ascii=False) + '\n')
-                
-            except json.JSONDecodeError:
-                logging.error(f"JSON解析错误: {line}")
+                shard_stats[(file_idx, shard_idx)] = future.result()
             except Exception as e:
-                logging.error(f"处理行时出错: {str(e)}, 行内容: {line}")
-    
-    return processed_entries, extracted_values, failed_extractions
+                failed.setdefault(file_idx, f"分片 {shard_idx}: {e}")
+
+    file_stats = []
+    for file_idx, (task_id, input_file, output_file) in enumerate(jobs):
+        file_shards = [shard for shard in shards if shard[0] == file_idx]
+        stats = new_stats()
+        try:
+            if file_idx in failed:
+                raise RuntimeError(failed[file_idx])
+            for shard in file_shards:
+                merge_stats(stats, shard_stats[(file_idx, shard[1])])
+            merge_parts([shard[4] for shard in file_shards], output_file)
+            log_file_stats(input_file, task_id, stats)
+        except Exception as e:
+            stats = new_stats()
+            message = f"处理文件 {input_file} 失败，未写出 {output_file}: {e}"
+            logging.error(message)
+            print(message)
+        finally:
+            remove_part_files([shard[4] for shard in file_shards])
+        file_stats.append(stats)
+    return file_stats
+
+def print_task_summary(task_stats):
+    """打印并记录每个任务汇总后的提取统计"""
+    for task_id in sorted(task_stats):
+        stats = task_stats[task_id]
+        message = (f"任务 {task_id}: 共 {stats['entries']} 条, 成功提取 {stats['extracted']}, "
+                   f"null {stats['null']}, 失败 {stats['failed']}, 出错 {stats['errors']}")
+        logging.info(message)
+        print(message)
 
-def process_directory(input_dir, output_dir):
+def process_directory(input_dir, output_dir, workers=1, shard_mb=SHARD_MB):
     """处理目录中的所有测量结果文件"""
-    processed_files = 0
-    total_processed_entries = 0
-    total_extracted_values = 0
-    total_failed_extractions = 0
-    
     # 确保输出目录存在
     os.makedirs(output_dir, exist_ok=True)
     
+    jobs = []
     # 遍历源目录
     for task_id in os.listdir(input_dir):
         task_path = os.path.join(input_dir, task_id)
@@ -159,26 +309,40 @@ def process_directory(input_dir, output_dir):
                     
                 input_file = os.path.join(model_path, filename)
                 output_file = os.path.join(output_dir, task_id, model_name, filename)
-                
-                logging.info(f"处理文件: {input_file}")
-                entries, extracted, failed = process_jsonl_file(input_file, output_file, task_id)
-                
-                processed_files += 1
-                total_processed_entries += entries
-                total_extracted_values += extracted
-                total_failed_extractions += failed
-    
-    logging.info(f"处理完成! 共处理 {processed_files} 个文件, {total_processed_entries} 条记录")
-    logging.info(f"成功提取 {total_extracted_values} 个数值, 失败 {total_failed_extractions} 个")
-    print(f"处理完成! 共处理 {processed_files} 个文件, {total_processed_entries} 条记录")
-    print(f"成功提取 {total_extracted_values} 个数值, 失败 {total_failed_extractions} 个")
+                jobs.append((task_id, input_file, output_file))
+    
+    if workers <= 1:
+        file_stats = []
+        for task_id, input_file, output_file in jobs:
+            logging.info(f"处理文件: {input_file}")
+            file_stats.append(process_jsonl_file(input_file, output_file, task_id, return_stats=True))
+    else:
+        file_stats = process_files_parallel(jobs, workers, shard_mb)
+    
+    # 按任务汇总各文件（各进程）的统计
+    task_stats = {}
+    for (task_id, _, _), stats in zip(jobs, file_stats):
+        merge_stats(task_stats.setdefault(task_id, new_stats()), stats)
+    total = new_stats()
+    for stats in task_stats.values():
+        merge_stats(total, stats)
+    
+    print_task_summary(task_stats)
+    logging.info(f"处理完成! 共处理 {len(jobs)} 个文件, {total['entries']} 条记录")
+    logging.info(f"成功提取 {total['extracted']} 个数值, 失败 {total['null'] + total['failed']} 个")
+    print(f"处理完成! 共处理 {len(jobs)} 个文件, {total['entries']} 条记录")
+    print(f"成功提取 {total['extracted']} 个数值, 失败 {total['null'] + total['failed']} 个")
     print(f"处理后的文件保存在: {output_dir}")
     print(f"详细日志保存在: extract_measurement_values_improved.log")
 
-def process_single_file(input_file, output_file, task_id):
-    """处理单个文件"""
+def process_single_file(input_file, output_file, task_id, workers=1, shard_mb=SHARD_MB):
+    """处理单个文件（多进程时按分片并行）"""
     logging.info(f"处理文件: {input_file}")
-    entries, extracted, failed = process_jsonl_file(input_file, output_file, task_id)
+    if workers <= 1:
+        entries, extracted, failed = process_jsonl_file(input_file, output_file, task_id)
+    else:
+        stats = process_files_parallel([(task_id, input_file, output_file)], workers, shard_mb)[0]
+        entries, extracted, failed = stats['entries'], stats['extracted'], stats['null'] + stats['failed']
     
     logging.info(f"处理完成! 共处理 {entries} 条记录")
     logging.info(f"成功提取 {extracted} 个数值, 失败 {failed} 个")
@@ -189,10 +353,19 @@ def process_single_file(input_file, output_file, task_id):
 
 def main():
     """主函数"""
+    # 设置日志（放在main中，被其他程序导入时不创建日志文件）
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        filename='extract_measurement_values_improved.log'
+    )
+    
     parser = argparse.ArgumentParser(description='从JSONL文件中提取测量值')
     parser.add_argument('--input', type=str, required=True, help='输入JSONL文件或目录')
     parser.add_argument('--output', type=str, required=True, help='输出JSONL文件或目录')
     parser.add_argument('--task-id', type=str, help='任务ID，处理单个文件时必须提供')
+    parser.add_argument('--workers', type=int, default=1, help='并行处理的进程数')
+    parser.add_argument('--shard-mb', type=float, default=SHARD_MB, help='多进程时大文件按此大小(MB)切分为分片')
     args = parser.parse_args()
     
     # 检查输入是文件还是目录
@@ -201,10 +374,10 @@ def main():
         if not args.task_id:
             print("错误: 处理单个文件时必须提供任务ID (--task-id)")
             return
-        process_single_file(args.input, args.output, args.task_id)
+        process_single_file(args.input, args.output, args.task_id, workers=args.workers, shard_mb=args.shard_mb)
     elif os.path.isdir(args.input):
         # 处理目录
-        process_directory(args.input, args.output)
+        process_directory(args.input, args.output, workers=args.workers, shard_mb=args.shard_mb)
     else:
         print(f"错误: 输入路径 {args.input} 不存在")
 
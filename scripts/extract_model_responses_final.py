@@ -7,6 +7,15 @@ import argparse
 from pathlib import Path
 import os
 import glob
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from shard_utils import plan_shards, iter_shard_lines, merge_parts, remove_part_files
+
+# 多进程模式下每个分片的目标大小(MB)
+SHARD_MB = 32
+
+# 选项提取缓存的最大条目数（不同的问题文本数）
+OPTIONS_CACHE_SIZE = 1024
 
 def normalize_text(text):
     """标准化文本，处理空格、换行符和大小写"""
@@ -103,14 +112,10 @@ def normalize_text(text):
 #                     else:
 #                         options = [loc.strip() for loc in locations.split()]
 #                     return options
-def extract_options_from_question(question):
-    """从问题中提取选项列表"""
+def _extract_options_from_texts(texts):
+    """从问题的文本部分中提取选项列表"""
     options = []
-    for item in question:
-        if item.get('type') != 'text':
-            continue
-        text = item.get('value', '')
-
+    for text in texts:
         # BI-RADS 特殊处理
         if 'bi-rads' in text.lower():
             birads_options = ['2', '3', '4A', '4B', '4C', '5']
@@ -184,6 +189,24 @@ def extract_options_from_question(question):
                 else:
                     options = [loc.strip().rstrip('.').strip() for loc in locations.split()]
     return options
+
+@lru_cache(maxsize=OPTIONS_CACHE_SIZE)
+def _cached_options(texts):
+    return tuple(_extract_options_from_texts(texts))
+
+def extract_options_from_question(question):
+    """从问题中提取选项列表
+
+    同一任务的问题通常共用同一个模板和选项列表，因此按问题中所有文本项缓存解析结果（有界LRU），
+    图像等非文本项不影响选项，不参与缓存键。
+    """
+    texts = tuple(item.get('value', '') for item in question if item.get('type') == 'text')
+    return list(_cached_options(texts))
+
+def options_cache_stats():
+    """选项提取缓存的命中/未命中统计"""
+    info = _cached_options.cache_info()
+    return f"选项提取缓存: 命中 {info.hits}, 未命中 {info.misses}, 当前条目 {info.currsize}/{info.maxsize}"
 #         # 通用 Options 提取
 #         if 'options:' in text.lower() or 'options：' in text.lower():
 #             python_list_match = re.search(r'options:?\s*\[(.*?)\]', text, re.IGNORECASE)
@@ -233,155 +256,276 @@ def extract_options_from_question(question):
 
 
 
-def extract_prediction_from_response(response, options):
-    """从模型回复中提取预测值"""
-    if not response or not options:
-        return ""
-        
-    # 标准化回复文本
-    response_normalized = normalize_text(response)
-    
-    # 标准化选项文本
-    normalized_options = [normalize_text(opt) for opt in options]
-    
-    # 1. 首先尝试直接匹配原始回复（不区分大小写）
-    for i, opt in enumerate(options):
-        if opt.lower() == response.lower().strip():
-            return opt
-   
-    
-    # 3. 检查多词选项的匹配
-    multi_word_options = [(opt, norm) for opt, norm in zip(options, normalized_options) if ' ' in norm]
-    if multi_word_options:
-        for opt, opt_norm in multi_word_options:
-            # 使用正则表达式匹配完整的短语（考虑词边界）
-            pattern = r'\b' + re.escape(opt_norm) + r'\b'
-            if re.search(pattern, response_normalized):
+# 多词选项常见的上下文模式，{opt} 处替换为转义后的选项文本
+CONTEXT_PATTERN_TEMPLATES = [
+    r"is (?:a |an |the |)(?:typical for |indicative of |suggestive of |consistent with |compatible with |showing |demonstrates |revealing |)['\"]?{opt}['\"]?",
+    r"(?:appears to be|identified as|classified as|recognized as|interpreted as|diagnosed as|confirmed as|representing|shows|demonstrates) (?:a |an |the |)['\"]?{opt}['\"]?",
+    r"(?:the |)(?:image|ultrasound|scan|examination|visualization|assessment|analysis|interpretation|finding|result|picture|sonogram|sonographic features) (?:is |shows |demonstrates |reveals |indicates |suggests |points to |confirms |indicate |)(?:a |an |the |)['\"]?{opt}['\"]?"
+]
+
+# 选项无法匹配时的常见关键词映射
+COMMON_MAPPINGS = {
+    'maternal': 'maternal cervix',
+    'cervix': 'maternal cervix',
+    'maternal cervical': 'maternal cervix',
+    'fetal': 'fetal brain',  # 默认映射，如果没有更具体的匹配
+    'abdomen': 'fetal abdomen',
+    'femur': 'fetal femur',
+    'thorax': 'fetal thorax',
+    'brain': 'fetal brain'
+}
+
+
+class OptionMatcher:
+    """针对一组选项预先编译好的匹配器
+
+    同一任务的所有回复共用同一组选项，因此选项的标准化、re.escape 和正则编译只做一次。
+    每个多词选项的词边界、引号和三类上下文模式合并为一个交替正则；匹配前先用子串判断过滤，
+    选项文本不在回复中时所有模式都不可能命中。匹配顺序与逐个 re.search 完全相同。
+    """
+
+    def __init__(self, options):
+        self.options = list(options)
+        self.normalized_options = [normalize_text(opt) for opt in self.options]
+
+        # 1. 原始回复直接匹配：小写文本 -> 第一个对应的选项
+        self.exact_lookup = {}
+        for opt in self.options:
+            self.exact_lookup.setdefault(opt.lower(), opt)
+
+        # 3. 多词选项：每个选项一个合并后的正则
+        self.multi_word_options = []
+        for opt, opt_norm in zip(self.options, self.normalized_options):
+            if ' ' not in opt_norm:
+                continue
+            escaped = re.escape(opt_norm)
+            alternatives = [r'\b' + escaped + r'\b', r"['\"]" + escaped + r"['\"]"]
+            alternatives += [template.replace('{opt}', escaped) for template in CONTEXT_PATTERN_TEMPLATES]
+            self.multi_word_options.append((opt, opt_norm, re.compile('|'.join(alternatives))))
+
+        # 4. 单词选项，以及“回复中是否出现任一完整的多词选项”
+        self.single_word_options = [
+            (opt, opt_norm, re.compile(r'\b' + re.escape(opt_norm) + r'\b'))
+            for opt, opt_norm in zip(self.options, self.normalized_options) if ' ' not in opt_norm
+        ]
+        self.multi_words = set()
+        for _, multi_opt_norm, _ in self.multi_word_options:
+            self.multi_words.update(multi_opt_norm.split())
+        self.any_multi_word_pattern = None
+        if self.multi_word_options:
+            self.any_multi_word_pattern = re.compile('|'.join(
+                r'\b' + re.escape(m_norm) + r'\b' for _, m_norm, _ in self.multi_word_options
+            ))
+
+        # 6. 逐词匹配用到的小写选项和分词
+        self.lower_options = [(opt, opt.lower(), opt.lower().split()) for opt in self.options]
+
+    def match(self, response):
+        """从模型回复中提取预测值，结果与原逐个正则匹配的实现一致"""
+        if not response or not self.options:
+            return ""
+
+        # 1. 首先尝试直接匹配原始回复（不区分大小写）
+        exact = self.exact_lookup.get(response.lower().strip())
+        if exact is not None:
+            return exact
+
+        # 标准化回复文本
+        response_normalized = normalize_text(response)
+
+        # 3. 检查多词选项的匹配（词边界、引号、上下文模式都要求选项文本出现在回复中）
+        for opt, opt_norm, pattern in self.multi_word_options:
+            if opt_norm in response_normalized and pattern.search(response_normalized):
                 return opt
-            
-            # 检查引号中的选项
-            quote_pattern = r"['\"]" + re.escape(opt_norm) + r"['\"]"  
-            if re.search(quote_pattern, response_normalized):
+
+        # 4. 检查单词选项的匹配（只有在没有多词选项匹配的情况下）
+        any_multi_word = None
+        for opt, opt_norm, pattern in self.single_word_options:
+            if opt_norm not in response_normalized or not pattern.search(response_normalized):
+                continue
+            # 检查这个单词选项是否是多词选项的一部分，且回复中包含完整的多词选项
+            if opt_norm in self.multi_words:
+                if any_multi_word is None:
+                    any_multi_word = bool(self.any_multi_word_pattern.search(response_normalized))
+                if any_multi_word:
+                    continue
+            return opt
+
+        # 5. 如果以上都没有匹配到，尝试部分匹配
+        for opt, opt_norm in zip(self.options, self.normalized_options):
+            if opt_norm in response_normalized:
                 return opt
-            
-            # 检查常见的上下文模式
-            context_patterns = [
-                r"is (?:a |an |the |)(?:typical for |indicative of |suggestive of |consistent with |compatible with |showing |demonstrates |revealing |)['\"]?" + re.escape(opt_norm) + r"['\"]?",
-                r"(?:appears to be|identified as|classified as|recognized as|interpreted as|diagnosed as|confirmed as|representing|shows|demonstrates) (?:a |an |the |)['\"]?" + re.escape(opt_norm) + r"['\"]?",
-                r"(?:the |)(?:image|ultrasound|scan|examination|visualization|assessment|analysis|interpretation|finding|result|picture|sonogram|sonographic features) (?:is |shows |demonstrates |reveals |indicates |suggests |points to |confirms |indicate |)(?:a |an |the |)['\"]?" + re.escape(opt_norm) + r"['\"]?"
-            ]
-            
-            for pattern in context_patterns:
-                if re.search(pattern, response_normalized):
+
+        # 6. 特殊处理：检查首字母大写的情况
+        response_words = response.split()
+        for word in response_words:
+            word_lower = word.lower().strip(".,;:!?'\"")
+            for opt, opt_lower, opt_parts in self.lower_options:
+                if word_lower == opt_lower:
                     return opt
-    
-    # 4. 检查单词选项的匹配（只有在没有多词选项匹配的情况下）
-    single_word_options = [(opt, norm) for opt, norm in zip(options, normalized_options) if ' ' not in norm]
-    for opt, opt_norm in single_word_options:
-        pattern = r'\b' + re.escape(opt_norm) + r'\b'
-        if re.search(pattern, response_normalized):
-            # 检查这个单词选项是否是多词选项的一部分
-            is_part_of_multi_word = False
-            for _, multi_opt_norm in multi_word_options:
-                if opt_norm in multi_opt_norm.split():
-                    # 检查回复中是否包含完整的多词选项
-                    if any(re.search(r'\b' + re.escape(m_norm) + r'\b', response_normalized) for _, m_norm in multi_word_options):
-                        is_part_of_multi_word = True
+                # 检查多词选项的第一个词
+                if opt_parts and word_lower == opt_parts[0]:
+                    # 检查是否后续词也匹配
+                    start = response_words.index(word)
+                    if len(response_words) > start + len(opt_parts) - 1:
+                        match = True
+                        for j, part in enumerate(opt_parts[1:], 1):
+                            next_word = response_words[start + j].lower().strip(".,;:!?'\"")
+                            if next_word != part:
+                                match = False
+                                break
+                        if match:
+                            return opt
+
+        # 7. 特殊处理：maternal cervix 和其他常见选项
+        for key, value in COMMON_MAPPINGS.items():
+            if key in response_normalized and value in self.options:
+                # 检查是否有更具体的匹配
+                more_specific = False
+                for opt, opt_lower, _ in self.lower_options:
+                    if key in opt_lower and opt_lower != value.lower() and opt_lower in response_normalized:
+                        more_specific = True
                         break
-            
-            if not is_part_of_multi_word:
-                return opt
-    
-    # 5. 如果以上都没有匹配到，尝试部分匹配
-    for i, opt_norm in enumerate(normalized_options):
-        if opt_norm in response_normalized:
-            return options[i]
+                if not more_specific:
+                    return value
+
+        return ""
+
+
+@lru_cache(maxsize=256)
+def _cached_matcher(options):
+    return OptionMatcher(options)
+
+
+def get_option_matcher(options):
+    """按选项集合缓存匹配器，同一组选项只编译一次"""
+    return _cached_matcher(tuple(options))
 
+
+def extract_prediction_from_response(response, options):
+    """从模型回复中提取预测值"""
+    if not response or not options:
+        return ""
+    return get_option_matcher(options).match(response)
+
+def clean_record(data, debug=False, line_num=0):
+    """从一条模型结果中提取预测值，原地更新 response 并保存 original_response，返回该记录"""
+    question = data.get('question', [])
+    response = data.get('response', '')
     
-    # 6. 特殊处理：检查首字母大写的情况
-    response_words = response.split()
-    for word in response_words:
-        word_lower = word.lower().strip(".,;:!?'\"")
-        for i, opt in enumerate(options):
-            if word_lower == opt.lower():
-                return opt
-            # 检查多词选项的第一个词
-            opt_parts = opt.lower().split()
-            if opt_parts and word_lower == opt_parts[0]:
-                # 检查是否后续词也匹配
-                if len(response_words) > response_words.index(word) + len(opt_parts) - 1:
-                    match = True
-                    for j, part in enumerate(opt_parts[1:], 1):
-                        next_word = response_words[response_words.index(word) + j].lower().strip(".,;:!?'\"")
-                        if next_word != part:
-                            match = False
-                            break
-                    if match:
-                        return opt
+    # 提取选项列表
+    options = extract_options_from_question(question)
     
-    # 7. 特殊处理：maternal cervix 和其他常见选项
-    common_mappings = {
-        'maternal': 'maternal cervix',
-        'cervix': 'maternal cervix',
-        'maternal cervical': 'maternal cervix',
-        'fetal': 'fetal brain',  # 默认映射，如果没有更具体的匹配
-        'abdomen': 'fetal abdomen',
-        'femur': 'fetal femur',
-        'thorax': 'fetal thorax',
-        'brain': 'fetal brain'
-    }
+    if debug:
+        print(f"\n行 {line_num+1}:")
+        print(f"选项: {options}")
+        print(f"回复: {response}")
     
-    for key, value in common_mappings.items():
-        if key in response_normalized and value in options:
-            # 检查是否有更具体的匹配
-            more_specific = False
-            for opt in options:
-                if key in opt.lower() and opt.lower() != value.lower() and opt.lower() in response_normalized:
-                    more_specific = True
-                    break
-            if not more_specific:
-                return value
+    # 如果有选项，尝试从回复中提取预测值
+    prediction = ""
+    if options:
+        prediction = extract_prediction_from_response(response, options)
+        if debug:
+            print(f"提取的预测值: {prediction}")
+        
+        # 更新数据中的回复
+        data['response'] = prediction
+        # 保存原始回复
+        data['original_response'] = response
+    else:
+        if debug:
+            print("警告: 未找到选项")
     
-    return ""
+    return data
+
+def process_record(line, debug=False, line_num=0):
+    """处理JSONL中的一行，返回写入输出文件的内容"""
+    data = clean_record(json.loads(line.strip()), debug, line_num)
+    return json.dumps(data, ensure_ascii=False) + '\n'
 
 def process_single_file(input_file, output_file, debug=False):
     """处理单个JSONL文件并将结果写入输出文件"""
     with open(input_file, 'r', encoding='utf-8') as f_in, open(output_file, 'w', encoding='utf-8') as f_out:
         for line_num, line in enumerate(f_in):
             try:
-                data = json.loads(line.strip())
-                question = data.get('question', [])
-                response = data.get('response', '')
-                
-                # 提取选项列表
-                options = extract_options_from_question(question)
-                
-                if debug:
-                    print(f"\n行 {line_num+1}:")
-                    print(f"选项: {options}")
-                    print(f"回复: {response}")
-                
-                # 如果有选项，尝试从回复中提取预测值
-                prediction = ""
-                if options:
-                    prediction = extract_prediction_from_response(response, options)
-                    if debug:
-                        print(f"提取的预测值: {prediction}")
-                    
-                    # 更新数据中的回复
-                    data['response'] = prediction
-                    # 保存原始回复
-                    data['original_response'] = response
-                else:
-                    if debug:
-                        print("警告: 未找到选项")
-                
                 # 写入输出文件
-                f_out.write(json.dumps(data, ensure_ascii=False) + '\n')
+                f_out.write(process_record(line, debug, line_num))
             except Exception as e:
                 print(f"处理文件 {input_file} 行 {line_num+1} 时出错: {str(e)}")
+    if debug:
+        print(options_cache_stats())
+
+def process_shard(input_file, part_file, start, end):
+    """处理文件中 [start, end) 字节范围内的行，返回 (行数, [(分片内行号, 错误信息)])"""
+    line_count = 0
+    errors = []
+    with open(part_file, 'w', encoding='utf-8') as f_out:
+        for local_num, line in enumerate(iter_shard_lines(input_file, start, end)):
+            line_count += 1
+            try:
+                f_out.write(process_record(line.decode('utf-8')))
+            except Exception as e:
+                errors.append((local_num, str(e)))
+    return line_count, errors
 
-def process_directory(input_dir, output_dir, debug=False):
+def process_files(file_pairs, workers=1, shard_mb=SHARD_MB, debug=False):
+    """处理多个 (输入文件, 输出文件)
+
+    workers > 1 时所有文件切成按换行对齐的字节分片，分片交给进程池并行处理，
+    每个文件的分片输出按原顺序合并，结果与逐个文件串行处理相同；调试模式下始终串行。
+    某个分片整体失败（如读取或解码出错）时只跳过该文件，报告错误并删除它的分片临时文件。
+    """
+    if workers <= 1 or debug:
+        for input_file, output_file in file_pairs:
+            process_single_file(input_file, output_file, debug)
+            print(f"已处理: {input_file} -> {output_file}")
+        return
+
+    shard_bytes = int(shard_mb * 1024 * 1024)
+    jobs = []
+    for file_idx, (input_file, output_file) in enumerate(file_pairs):
+        for shard_idx, (start, end) in enumerate(plan_shards(input_file, shard_bytes)):
+            part_file = f"{output_file}.part{shard_idx:05d}.{os.getpid()}.tmp"
+            jobs.append((file_idx, shard_idx, input_file, part_file, start, end))
+    print(f"共 {len(file_pairs)} 个文件，切分为 {len(jobs)} 个分片，使用 {workers} 个进程")
+
+    # 大分片先提交，避免最后才开始的大分片拖慢整体
+    shard_results = {}
+    failed = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(process_shard, input_file, part_file, start, end): (file_idx, shard_idx)
+            for file_idx, shard_idx, input_file, part_file, start, end
+            in sorted(jobs, key=lambda job: job[5] - job[4], reverse=True)
+        }
+        for future in as_completed(futures):
+            file_idx, shard_idx = futures[future]
+            try:
+                shard_results[(file_idx, shard_idx)] = future.result()
+            except Exception as e:
+                failed.setdefault(file_idx, f"分片 {shard_idx}: {e}")
+
+    for file_idx, (input_file, output_file) in enumerate(file_pairs):
+        file_jobs = [job for job in jobs if job[0] == file_idx]
+        try:
+            if file_idx in failed:
+                print(f"处理文件 {input_file} 失败，未写出 {output_file}: {failed[file_idx]}")
+                continue
+            # 分片内行号加上前面分片的行数，得到与串行处理相同的行号
+            line_offset = 0
+            for job in file_jobs:
+                line_count, errors = shard_results[(file_idx, job[1])]
+                for local_num, message in errors:
+                    print(f"处理文件 {input_file} 行 {line_offset + local_num + 1} 时出错: {message}")
+                line_offset += line_count
+            merge_parts([job[3] for job in file_jobs], output_file)
+            print(f"已处理: {input_file} -> {output_file}")
+        except Exception as e:
+            print(f"处理文件 {input_file} 失败，未写出 {output_file}: {e}")
+        finally:
+            remove_part_files([job[3] for job in file_jobs])
+
+def process_directory(input_dir, output_dir, debug=False, workers=1, shard_mb=SHARD_MB):
     """处理目录中的所有JSONL文件"""
     # 确保输出目录存在
     os.makedirs(output_dir, exist_ok=True)
@@ -393,34 +537,35 @@ def process_directory(input_dir, output_dir, debug=False):
             if file.endswith('.jsonl'):
                 jsonl_files.append(os.path.join(root, file))
     
-    # 处理每个文件
+    # 构建输出文件路径，保持相对路径结构
+    file_pairs = []
     for input_file in jsonl_files:
-        # 构建输出文件路径，保持相对路径结构
         rel_path = os.path.relpath(input_file, input_dir)
         output_file = os.path.join(output_dir, rel_path)
         
         # 确保输出文件的目录存在
         os.makedirs(os.path.dirname(output_file), exist_ok=True)
-        
-        # 处理文件
-        process_single_file(input_file, output_file, debug)
-        print(f"已处理: {input_file} -> {output_file}")
+        file_pairs.append((input_file, output_file))
+    
+    # 处理文件
+    process_files(file_pairs, workers=workers, shard_mb=shard_mb, debug=debug)
 
 def main():
     parser = argparse.ArgumentParser(description='从JSONL文件中提取模型回复')
     parser.add_argument('--input', type=str, required=True, help='输入JSONL文件或目录')
     parser.add_argument('--output', type=str, required=True, help='输出JSONL文件或目录')
     parser.add_argument('--debug', action='store_true', help='启用调试模式，打印详细信息')
+    parser.add_argument('--workers', type=int, default=1, help='并行处理的进程数')
+    parser.add_argument('--shard-mb', type=float, default=SHARD_MB, help='多进程时大文件按此大小(MB)切分为分片')
     args = parser.parse_args()
     
     # 检查输入是文件还是目录
     if os.path.isfile(args.input):
-        # 处理单个文件
-        process_single_file(args.input, args.output, args.debug)
-        print(f"已处理: {args.input} -> {args.output}")
+        # 处理单个文件（多进程时大文件按分片并行）
+        process_files([(args.input, args.output)], workers=args.workers, shard_mb=args.shard_mb, debug=args.debug)
     elif os.path.isdir(args.input):
         # 处理目录
-        process_directory(args.input, args.output, args.debug)
+        process_directory(args.input, args.output, args.debug, workers=args.workers, shard_mb=args.shard_mb)
     else:
         print(f"错误: 输入路径 {args.input} 不存在")
 
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""大JSONL文件的分片工具：按字节范围切分（边界对齐到换行符）、按片读取行、按顺序合并输出"""
+
+import os
+import shutil
+
+
+def plan_shards(path, shard_bytes):
+    """把文件切成若干 (起始字节, 结束字节) 范围，每个边界都紧跟在换行符之后
+
+    相邻范围首尾相接并覆盖整个文件，因此每一行恰好属于一个分片。文件不超过 shard_bytes 时只有一个分片。
+    """
+    size = os.path.getsize(path)
+    if shard_bytes <= 0 or size <= shard_bytes:
+        return [(0, size)]
+
+    bounds = [0]
+    with open(path, 'rb') as f:
+        pos = shard_bytes
+        while pos < size:
+            f.seek(pos)
+            f.readline()  # 跳到下一行的开头
+            boundary = f.tell()
+            if boundary >= size:
+                break
+            if boundary > bounds[-1]:
+                bounds.append(boundary)
+            pos = boundary + shard_bytes
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def iter_shard_lines(path, start, end):
+    """逐行读取 [start, end) 范围内的内容（字节串，包含换行符）"""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            yield line
+
+
+def merge_parts(part_files, output_file, remove_parts=True):
+    """按顺序拼接各分片的输出，先写临时文件再原子替换，中途失败不会留下不完整的输出文件"""
+    tmp_file = f"{output_file}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_file, 'wb') as f_out:
+            for part_file in part_files:
+                with open(part_file, 'rb') as f_in:
+                    shutil.copyfileobj(f_in, f_out, 1024 * 1024)
+        os.replace(tmp_file, output_file)
+    finally:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+    if remove_parts:
+        remove_part_files(part_files)
+
+
+def remove_part_files(part_files):
+    """删除分片的临时输出（不存在的跳过），用于合并之后或处理失败时清理"""
+    for part_file in part_files:
+        try:
+            os.remove(part_file)
+        except OSError:
+            pass
@@ -0,0 +1,69 @@
+import os
+import sys
+import json
+import importlib
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'new_results'))
+import gt_loader
+import evaluate
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(gt_loader, 'GT_CACHE_DIR', str(tmp_path / 'gt_cache'))
+    gt_loader.clear_memory_cache()
+    yield
+    gt_loader.clear_memory_cache()
+
+
+CASES = {
+    'cla': ('04', {'id': [1, 2, 3], 'class': ['benign', 'malignant', 'benign'], 'classes': ['[benign, malignant]'] * 3},
+            ['benign', 'Malignant.', 'malignant']),
+    'seg': ('04', {'id': [1, 2, 3], 'seg_ans': ['[0.1, 0.1]', '[0.5, 0.5]', '[0.9, 0.9]']},
+            ['upper left', 'The center', 'lower right']),
+    'measure': ('57', {'id': [1, 2, 3], 'measurement_ans': [12.0, 20.0, 31.0]},
+                ['12.5', 'about 19 mm', 'n/a']),
+}
+
+
+def _write_pair(tmp_path, kind):
+    task_id, tsv_columns, responses = CASES[kind]
+    tsv_path = str(tmp_path / f'{kind}.tsv')
+    pd.DataFrame(tsv_columns).to_csv(tsv_path, sep='\t', index=False)
+    model_dir = tmp_path / kind / task_id / 'ModelA'
+    model_dir.mkdir(parents=True)
+    jsonl_path = str(model_dir / 'result.jsonl')
+    with open(jsonl_path, 'w') as f:
+        for i, response in enumerate(responses):
+            record = {'id': i + 1, 'response': response, 'model': 'ModelA'}
+            if kind == 'cla':
+                record['class'] = tsv_columns['class'][i]
+            f.write(json.dumps(record) + '\n')
+    return task_id, jsonl_path, tsv_path
+
+
+def _without_timestamp(result):
+    return {key: value for key, value in result.items() if key != 'timestamp'}
+
+
+@pytest.mark.parametrize('profile', ['default', 'qwen'])
+@pytest.mark.parametrize('kind', ['cla', 'seg', 'measure'])
+def test_registry_matches_module_evaluator(tmp_path, kind, profile):
+    task_id, jsonl_path, tsv_path = _write_pair(tmp_path, kind)
+    spec = evaluate.evaluator_spec(profile, kind)
+    module = importlib.import_module(spec['module'])
+
+    expected = module.evaluate_pair(task_id, jsonl_path, tsv_path)
+    result = evaluate.evaluate_pair(spec, task_id, jsonl_path, tsv_path)
+    assert _without_timestamp(result) == _without_timestamp(expected)
+    assert ('timestamp' in result) == ('timestamp' in expected)
+
+    # 注册表中的列定义与评估脚本自己的写结果函数输出一致
+    result['timestamp'] = expected.get('timestamp')
+    writer = 'write_combined_results' if kind == 'cla' else 'save_results'
+    getattr(module, writer)([expected], str(tmp_path / 'module.txt'))
+    evaluate.write_results([result], str(tmp_path / 'registry.txt'), spec['columns'])
+    assert (tmp_path / 'registry.txt').read_text() == (tmp_path / 'module.txt').read_text()
@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'new_results'))
+import fused_eval
+
+
+def test_failed_cleaning_removes_partial_side_output(tmp_path):
+    raw_dir = tmp_path / 'raw'
+    model_dir = raw_dir / '04' / 'ModelA'
+    model_dir.mkdir(parents=True)
+    jsonl_path = model_dir / 'result.jsonl'
+    # 第二行不是合法的UTF-8，逐行读取时抛出异常，中断清洗
+    jsonl_path.write_bytes(b'{"id": 1, "response": "A"}\n\xff\xfe\n')
+    cleaned_dir = tmp_path / 'cleaned'
+
+    with pytest.raises(UnicodeDecodeError):
+        fused_eval.fused_evaluate_pair('cla', str(raw_dir), str(cleaned_dir), '04', str(jsonl_path), None)
+    assert os.listdir(cleaned_dir / '04' / 'ModelA') == []
@@ -0,0 +1,118 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'new_results'))
+import gt_loader
+import cla_eval
+import seg_eval
+import measure_eval
+from dataset_manifest import dataset_rule, parse_rule
+from scoring_core import classification_pairs, segmentation_pairs, measurement_pairs
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(gt_loader, 'GT_CACHE_DIR', str(tmp_path / 'gt_cache'))
+    gt_loader.clear_memory_cache()
+    yield
+    gt_loader.clear_memory_cache()
+
+
+def _write_tsv(path, columns):
+    pd.DataFrame(columns).to_csv(path, sep='\t', index=False)
+    return str(path)
+
+
+def _raw_and_artifact(tmp_path, tsv_path, kind, task_id, read):
+    """同一份TSV分别按原始TSV和参考答案文件读取并合并，返回两个合并结果"""
+    raw = read(tsv_path)
+    artifact = str(tmp_path / 'artifact')
+    gt_loader.build_gt_artifact(tsv_path, artifact, kind, parse_rule(dataset_rule(kind, task_id)))
+    return raw, read(artifact)
+
+
+def _assert_same_pairs(pairs, raw, artifact):
+    (true_raw, pred_raw, failed_raw), (true_art, pred_art, failed_art) = pairs(raw), pairs(artifact)
+    assert list(true_art) == list(true_raw)
+    assert list(pred_art) == list(pred_raw)
+    assert failed_art == failed_raw
+
+
+@pytest.mark.parametrize('with_id', [True, False])
+def test_measure_artifact_matches_raw(tmp_path, with_id):
+    columns = {
+        'measurement_ans': [12.0, 20.0, 31.0],
+        'measurement': ["{'fat value': 13.0}", "{'fat value': 21.0}", 'broken'],
+        'image': ['x' * 50] * 3,
+    }
+    jsonl = {'response': ['12.5', '19', 'n/a']}
+    if with_id:
+        columns['id'] = [3, 1, 2]
+        jsonl['id'] = [1, 2, 3]
+    tsv_path = _write_tsv(tmp_path / 'mea.tsv', columns)
+    df_jsonl = pd.DataFrame(jsonl)
+
+    raw, artifact = _raw_and_artifact(
+        tmp_path, tsv_path, 'measure', '57',
+        lambda path: measure_eval.read_jsonl_with_tsv(None, path, '57', df_jsonl=df_jsonl.copy()))
+    _assert_same_pairs(measurement_pairs, raw, artifact)
+    if with_id:
+        # 按id取TSV中的 measurement_ans，而不是重新解析 measurement 列
+        assert list(measurement_pairs(artifact)[0]) == [20.0, 31.0]
+
+
+@pytest.mark.parametrize('with_id', [True, False])
+def test_seg_artifact_matches_raw(tmp_path, with_id):
+    columns = {
+        'seg_ans': ['[0.1, 0.1]', '[0.9, 0.9]', '[0.5, 0.5]'],
+        'keypoints': ["{'a': [0.1, 0.9]}", "{'a': [0.5, 0.5]}", 'broken'],
+    }
+    jsonl = {'response': ['upper left', 'center', 'failed']}
+    if with_id:
+        columns['id'] = [1, 2, 3]
+        jsonl['id'] = [2, 3, 1]
+    tsv_path = _write_tsv(tmp_path / 'seg.tsv', columns)
+    df_jsonl = pd.DataFrame(jsonl)
+
+    raw, artifact = _raw_and_artifact(
+        tmp_path, tsv_path, 'seg', '04',
+        lambda path: seg_eval.read_jsonl_with_tsv(None, path, df_jsonl=df_jsonl.copy()))
+    _assert_same_pairs(segmentation_pairs, raw, artifact)
+
+
+@pytest.mark.parametrize('task_id', ['04', 'anatomy'])
+@pytest.mark.parametrize('with_id', [True, False])
+def test_cla_artifact_matches_raw(tmp_path, task_id, with_id):
+    columns = {
+        'class': ['benign', 'malignant', 'benign'],
+        'classes': ["{'Anatomy': 'Liver'}", "{'Anatomy': 'Kidney'}", "[Heart]"],
+    }
+    jsonl = {'response': ['benign', 'liver', 'heart'], 'class': ['malignant', 'benign', 'benign']}
+    if with_id:
+        columns['id'] = [1, 2, 3]
+        jsonl['id'] = [3, 2, 1]
+    tsv_path = _write_tsv(tmp_path / 'cla.tsv', columns)
+    df_jsonl = pd.DataFrame(jsonl)
+
+    raw, artifact = _raw_and_artifact(
+        tmp_path, tsv_path, 'cla', task_id,
+        lambda path: cla_eval.read_jsonl_with_tsv(None, path, task_id, df_jsonl=df_jsonl.copy()))
+    _assert_same_pairs(classification_pairs, raw, artifact)
+
+
+def test_merge_ground_truth_rejects_row_count_mismatch():
+    df_jsonl = pd.DataFrame({'response': ['a', 'b', 'c']})
+    df_gt = pd.DataFrame({'cla_label': np.array(['a', 'b'], dtype=object)})
+    with pytest.raises(ValueError):
+        gt_loader.merge_ground_truth(df_jsonl, df_gt, {'cla_label': 'cla_ans'})
+
+
+def test_read_tsv_columns_counts_kept_bytes(tmp_path):
+    tsv_path = _write_tsv(tmp_path / 'report.tsv', {'caption': ['肝脏未见异常', 'normal'], 'image': ['x' * 20] * 2})
+    _, stats = gt_loader.read_tsv_columns(tsv_path, ['caption'], verbose=False)
+    assert stats['bytes_kept'] == len('肝脏未见异常'.encode('utf-8')) + len('normal')
+    assert stats['bytes_skipped'] == os.path.getsize(tsv_path) - stats['bytes_kept']
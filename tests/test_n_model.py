@@ -0,0 +1,27 @@
+import io
+import os
+import sys
+import contextlib
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'Model_Comparison_Toolkit'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+# 逐对运行两模型对比和一次计算所有模型对的两种方式都在基准脚本中
+from bench_n_model import make_results, pairwise_runs, n_model_run, summary_change_pcts
+
+
+def test_n_model_deltas_match_two_model_reports(tmp_path):
+    model_dirs = make_results(str(tmp_path), models=4, tasks=6)
+    with contextlib.redirect_stdout(io.StringIO()):
+        reports = pairwise_runs(model_dirs)
+        results, _ = n_model_run(model_dirs)
+
+    assert len(reports) == 6 * len(results)
+    for (i, j, task_type), report in reports.items():
+        change_pct = results[task_type][1]['change_pct'][i, j]
+        reported = summary_change_pcts(report)
+        assert len(reported) == len(change_pct)
+        # 两模型报告中的变化百分比保留两位小数
+        assert np.allclose(reported, np.round(change_pct, 2), atol=0.011)
@@ -0,0 +1,54 @@
+import os
+import sys
+import json
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'new_results'))
+import dataset_manifest
+import result_store
+
+CALLS = []
+
+
+def _record_worker(task_id, jsonl_path, tsv_path):
+    CALLS.append(task_id)
+    rule = dataset_manifest.dataset_rule('measure', task_id)
+    return {'task_id': task_id, 'measurement_key': rule['measurement_key']}
+
+
+def _write_manifest(path, measurement_key):
+    manifest = {
+        'tsv_root': os.path.dirname(path),
+        'kinds': {
+            'measure': {
+                'answer_column': 'measurement_ans',
+                'parse': 'extract_mea',
+                'measurement_key': 'fat value',
+                'datasets': {'57': {'tsv': 'task57.tsv', 'measurement_key': measurement_key}},
+            },
+        },
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    # 清单在进程内只读一次，模拟下一次运行
+    dataset_manifest._MANIFESTS.clear()
+
+
+def test_changed_parse_rule_is_rescored(tmp_path, monkeypatch):
+    manifest_path = str(tmp_path / 'datasets.json')
+    monkeypatch.setattr(dataset_manifest, 'DATASET_MANIFEST', manifest_path)
+    monkeypatch.setattr(result_store, 'RESULT_STORE_DIR', str(tmp_path / 'store'))
+    (tmp_path / 'task57.tsv').write_text('index\tmeasurement_ans\n0\t1.0\n')
+    (tmp_path / 'model.jsonl').write_text('{"index": 0}\n')
+    pairs = [('57', str(tmp_path / 'model.jsonl'), str(tmp_path / 'task57.tsv'))]
+    CALLS.clear()
+
+    _write_manifest(manifest_path, 'fat value')
+    first = result_store.run_pairs_incremental('test_measure', pairs, _record_worker, 1, kind='measure')
+    reused = result_store.run_pairs_incremental('test_measure', pairs, _record_worker, 1, kind='measure')
+    assert CALLS == ['57']
+    assert reused == first
+
+    _write_manifest(manifest_path, 'hc value')
+    rescored = result_store.run_pairs_incremental('test_measure', pairs, _record_worker, 1, kind='measure')
+    assert CALLS == ['57', '57']
+    assert rescored[0]['measurement_key'] == 'hc value'
@@ -0,0 +1,48 @@
+import os
+import sys
+import warnings
+
+import numpy as np
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'new_results'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+from scoring_core import classification_pairs, segmentation_pairs, measurement_pairs
+# 原逐行评分逻辑保留在基准脚本中，作为按列实现的参照
+from bench_scoring_core import (make_frames, legacy_classification_pairs, legacy_segmentation_acc,
+                                legacy_measurement_pairs, classification_metrics, measurement_metrics,
+                                same_metrics)
+
+MODELS = ['SomeModel', 'LLaVA-1.5-13B-HF']
+
+
+@pytest.fixture(autouse=True)
+def quiet_sklearn():
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        yield
+
+
+@pytest.mark.parametrize('model', MODELS)
+@pytest.mark.parametrize('frame_idx', [0, 1], ids=['str_answers', 'int_answers'])
+def test_classification_matches_row_loop(model, frame_idx):
+    frame = make_frames(500, model)[frame_idx]
+    old = classification_metrics(*legacy_classification_pairs(frame, model), len(frame))
+    new = classification_metrics(*classification_pairs(frame), len(frame))
+    assert same_metrics(old, new)
+
+
+@pytest.mark.parametrize('model', MODELS)
+def test_segmentation_matches_row_loop(model):
+    frame = make_frames(500, model)[2]
+    gt, pred, failed = segmentation_pairs(frame)
+    assert int(np.sum(gt == pred)) / (len(frame) - failed) == legacy_segmentation_acc(frame, model)
+
+
+@pytest.mark.parametrize('model', MODELS)
+def test_measurement_matches_row_loop(model):
+    frame = make_frames(500, model)[3]
+    old = measurement_metrics(*legacy_measurement_pairs(frame, model))
+    new = measurement_metrics(*measurement_pairs(frame))
+    assert same_metrics(old, new)
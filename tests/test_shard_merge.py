@@ -0,0 +1,82 @@
+import os
+import sys
+import json
+import random
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+import shard_utils
+import extract_model_responses_final as choice_script
+import extract_measurement_values_improved as measure_script
+
+# 约0.5KB一个分片，几十行的文件就会切成多个分片
+SHARD_MB = 0.0005
+
+OPTION_SETS = [
+    ['fetal brain', 'fetal abdomen', 'maternal cervix', 'other'],
+    ['benign', 'malignant'],
+]
+
+
+def _write_choice_jsonl(path, rows, seed=0):
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(rows):
+            options = rng.choice(OPTION_SETS)
+            question = [{'type': 'image', 'value': 'x' * 40},
+                        {'type': 'text', 'value': f"Which one? options: {options}"}]
+            response = rng.choice([f"The answer is {rng.choice(options)}.", rng.choice(options).upper(), '无法判断'])
+            f.write(json.dumps({'id': i, 'question': question, 'response': response}, ensure_ascii=False) + '\n')
+            if i == 17:
+                f.write('{not json\n')
+
+
+def _write_measure_jsonl(path, rows, seed=0):
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(rows):
+            response = rng.choice([f"{rng.uniform(0, 80):.1f}", f"约 {rng.randint(1, 80)} mm", 'null', 'unknown'])
+            f.write(json.dumps({'id': i, 'response': response}, ensure_ascii=False) + '\n')
+            if i == 23:
+                f.write('{not json\n')
+
+
+def test_plan_shards_covers_every_line_once(tmp_path):
+    path = str(tmp_path / 'in.jsonl')
+    _write_measure_jsonl(path, 60)
+    shards = shard_utils.plan_shards(path, int(SHARD_MB * 1024 * 1024))
+    assert len(shards) > 1
+    lines = [line for start, end in shards for line in shard_utils.iter_shard_lines(path, start, end)]
+    with open(path, 'rb') as f:
+        assert lines == f.readlines()
+
+
+def test_choice_shards_match_single_process(tmp_path, capsys):
+    input_file = str(tmp_path / 'in.jsonl')
+    _write_choice_jsonl(input_file, 60)
+
+    choice_script.process_files([(input_file, str(tmp_path / 'serial.jsonl'))], workers=1)
+    serial_log = capsys.readouterr().out
+    choice_script.process_files([(input_file, str(tmp_path / 'sharded.jsonl'))], workers=2, shard_mb=SHARD_MB)
+    sharded_log = capsys.readouterr().out
+
+    assert (tmp_path / 'sharded.jsonl').read_bytes() == (tmp_path / 'serial.jsonl').read_bytes()
+    # 出错行的行号与串行处理相同
+    errors = [line for line in serial_log.splitlines() if '出错' in line]
+    assert errors and errors == [line for line in sharded_log.splitlines() if '出错' in line]
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
+
+
+def test_measure_shards_match_single_process(tmp_path):
+    input_file = str(tmp_path / 'in.jsonl')
+    _write_measure_jsonl(input_file, 60)
+
+    serial = measure_script.process_jsonl_file(input_file, str(tmp_path / 'serial.jsonl'), '57', return_stats=True)
+    sharded = measure_script.process_files_parallel([('57', input_file, str(tmp_path / 'sharded.jsonl'))], 2,
+                                                    shard_mb=SHARD_MB)[0]
+
+    assert (tmp_path / 'sharded.jsonl').read_bytes() == (tmp_path / 'serial.jsonl').read_bytes()
+    for key in ('entries', 'extracted', 'null', 'failed', 'errors', 'sources'):
+        assert sharded[key] == serial[key]
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
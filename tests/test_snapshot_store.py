@@ -0,0 +1,61 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Model_Comparison_Toolkit'))
+import snapshot_store
+
+
+@pytest.fixture
+def sources(tmp_path):
+    source_dir = tmp_path / 'results'
+    source_dir.mkdir()
+    (source_dir / 'cla_results.txt').write_text('task_id\tmodel\tacc\n01\tA\t0.5000\n')
+    (source_dir / 'seg_results.txt').write_text('task_id\tmodel\tacc\n02\tA\t0.7000\n')
+    return [(str(source_dir), 'model1_standard')], ['cla_results.txt', 'seg_results.txt']
+
+
+@pytest.fixture
+def digest_calls(monkeypatch):
+    calls = []
+    file_digest = snapshot_store.file_digest
+
+    def counting_digest(path, *args, **kwargs):
+        calls.append(path)
+        return file_digest(path, *args, **kwargs)
+
+    monkeypatch.setattr(snapshot_store, 'file_digest', counting_digest)
+    return calls
+
+
+@pytest.mark.parametrize('hardlink', [False, True])
+def test_unchanged_snapshot_skips_hashing(tmp_path, sources, digest_calls, hardlink):
+    data_sources, file_names = sources
+    store_dir = str(tmp_path / 'store')
+    first = snapshot_store.snapshot_files(data_sources, str(tmp_path / 'run1'), file_names, store_dir, hardlink=hardlink)
+    assert len(digest_calls) == 2
+    assert all((entry['method'] == 'hardlink') == hardlink for entry in first['files'])
+
+    digest_calls.clear()
+    second = snapshot_store.snapshot_files(data_sources, str(tmp_path / 'run2'), file_names, store_dir, hardlink=hardlink)
+    assert digest_calls == []
+    assert [entry['sha256'] for entry in second['files']] == [entry['sha256'] for entry in first['files']]
+    assert snapshot_store.verify_manifest(str(tmp_path / 'run2')) == []
+
+
+def test_modified_hardlinked_snapshot_rewrites_object(tmp_path, sources):
+    data_sources, file_names = sources
+    store_dir = str(tmp_path / 'store')
+    snapshot_store.snapshot_files(data_sources, str(tmp_path / 'run1'), file_names, store_dir, hardlink=True)
+
+    # 改写硬链接的快照会连带改写库中的对象
+    snapshot = tmp_path / 'run1' / 'model1_standard' / 'cla_results.txt'
+    os.chmod(snapshot, 0o644)
+    snapshot.write_text('tampered\n')
+
+    manifest = snapshot_store.snapshot_files(data_sources, str(tmp_path / 'run2'), file_names, store_dir, hardlink=True)
+    assert snapshot_store.verify_manifest(str(tmp_path / 'run2')) == []
+    entry = manifest['files'][0]
+    assert snapshot_store.file_digest(snapshot_store.object_path(entry['sha256'], store_dir)) == entry['sha256']
+    assert snapshot_store.verify_manifest(str(tmp_path / 'run1')) == [str(tmp_path / 'run1' / 'model1_standard' / 'cla_results.txt')]